@@ -6,11 +6,9 @@ import base64
 import json
 import re
 from datetime import datetime
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 import hashlib
 from streamlit_option_menu import option_menu
-import subprocess
-import sys
 from pathlib import Path
 from dotenv import load_dotenv
 import streamlit.components.v1 as components
@@ -18,7 +16,10 @@ from streamlit_echarts import st_pyecharts, st_echarts
 
 # Importar los nuevos módulos de gráficos
 from notebooks.generar_graficas import generate_analysis_charts
-from notebooks.predicciones_script import get_prediction_charts_and_update_db
+from notebooks.carga_archivo_script import ingest_buffer
+from notebooks.consultas import (ANIOS_HISTORICO, ANIOS_PREDICCION, HISTORICO_RECIENTE, PREDICCIONES_TIPO,
+                                 PREDICCIONES_VEHICULO, anios_prediccion, rango_anio)
+from notebooks.pipeline import create_db_engine, db_config_from_env, solicitar_pipeline
 
 # Cargar variables de entorno
 load_dotenv()
@@ -31,12 +32,14 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configuración de la base de datos
+# Configuración de la base de datos: un solo engine con pool para toda la app y el pipeline
+@st.cache_resource
+def _get_shared_engine():
+    return create_db_engine(db_config_from_env())
+
 def get_db_engine():
     try:
-        db_url = f"mysql+mysqlconnector://{os.getenv('DB_USER')}:{os.getenv('DB_PASSWORD')}@{os.getenv('DB_HOST')}:{os.getenv('DB_PORT')}/{os.getenv('DB_NAME')}"
-        engine = create_engine(db_url)
-        return engine
+        return _get_shared_engine()
     except Exception as e:
         st.error(f"Error al crear la conexión con la base de datos: {e}")
         return None
@@ -168,13 +171,61 @@ def upload_file(uploaded_file, file_type):
         return True
     return False
 
+# Función para cargar a staging un archivo subido, directamente desde memoria
+def ingest_uploaded_file(uploaded_file, file_type, chunk_size=5000):
+    engine = get_db_engine()
+    if not engine:
+        return None
+
+    progress_bar = st.progress(0.0, text=f"Cargando {uploaded_file.name} en staging...")
+
+    # Se lee por bloques para acotar la memoria con libros muy grandes
+    def on_progress(archivo, leidas, total):
+        if total:
+            progress_bar.progress(min(leidas / total, 1.0), text=f"{archivo}: {leidas:,} de ~{total:,} filas")
+        else:
+            progress_bar.progress(0.0, text=f"{archivo}: {leidas:,} filas")
+
+    # Conexión DBAPI (mysql-connector) del pool del engine, la misma que usa el script de carga
+    conn = engine.raw_connection()
+    try:
+        return ingest_buffer(conn, uploaded_file.getvalue(), f"{file_type}/{uploaded_file.name}",
+                             chunk_size=chunk_size, on_progress=on_progress)
+    finally:
+        conn.close()
+        progress_bar.empty()
+
+# Ejecuta pasos del pipeline en este proceso y muestra la salida y los tiempos por paso
+def run_pipeline_steps(pasos, titulo, reentrenar=False):
+    engine = get_db_engine()
+    if not engine:
+        return None
+    # Una sola ejecución a la vez: si otro usuario ya lanzó estos pasos se comparte su resultado
+    future, estado = solicitar_pipeline(engine=engine, db_config=db_config_from_env(), pasos=pasos,
+                                        capturar_salida=True, reentrenar=reentrenar)
+    if estado == "en_curso":
+        st.info("Ya hay una ejecución en curso con estos pasos; se mostrará su resultado.")
+    elif estado == "encolada":
+        st.info("Hay otra ejecución en curso; esta solicitud se ejecutará a continuación, junto con las demás en espera.")
+    resultado = future.result()
+    st.text_area(titulo, resultado["salida"], height=200)
+    st.dataframe(pd.DataFrame(resultado["pasos"])[["paso", "estado", "segundos", "filas", "mensaje"]])
+    for registro in resultado["pasos"]:
+        if registro["estado"] == "ERROR":
+            st.error(f"Falló el paso {registro['paso']}: {registro['mensaje']}")
+    return resultado
+
 # Función para mostrar datos históricos
 def show_historical_data():
     engine = get_db_engine()
     if engine:
         try:
-            query = "SELECT * FROM Hechos_Mantenimiento ORDER BY MantenimientoID DESC LIMIT 1000"
-            df = pd.read_sql(query, engine)
+            anios = pd.read_sql(ANIOS_HISTORICO, engine)['Anio'].tolist()
+            if not anios:
+                st.info("No hay hechos cargados todavía.")
+                return
+            anio = st.selectbox("Año", anios, key='historico_anio')
+            df = pd.read_sql(HISTORICO_RECIENTE, engine, params={"anio": int(anio)})
             st.dataframe(df)
             
             if not df.empty:
@@ -245,9 +296,19 @@ def show_predictions():
         if not engine:
             return
 
+        try:
+            anios = anios_prediccion(pd.read_sql(ANIOS_PREDICCION, engine).iloc[0])
+        except Exception as e:
+            st.warning(f"No se pudieron consultar los años con predicciones: {e}")
+            return
+        if not anios:
+            st.info("No hay predicciones almacenadas.")
+            return
+        rango = rango_anio(st.selectbox("Año pronosticado", anios, key='prediccion_anio'))
+
         try:
             st.write("##### Predicciones por Vehiculo y Tipo")
-            df_pred_vehiculo = pd.read_sql("SELECT * FROM Predicciones_Vehiculo_Tipo ORDER BY NombreVehiculo, TipoMantenimiento, Fecha", engine)
+            df_pred_vehiculo = pd.read_sql(PREDICCIONES_VEHICULO, engine, params=rango)
             st.dataframe(df_pred_vehiculo)
             if not df_pred_vehiculo.empty:
                 csv = df_pred_vehiculo.to_csv(index=False).encode('utf-8')
@@ -257,7 +318,7 @@ def show_predictions():
 
         try:
             st.write("##### Predicciones por Tipo de Mantenimiento")
-            df_pred_tipo = pd.read_sql("SELECT * FROM Predicciones_Tipo_Mantenimiento ORDER BY TipoMantenimiento, Fecha", engine)
+            df_pred_tipo = pd.read_sql(PREDICCIONES_TIPO, engine, params=rango)
             st.dataframe(df_pred_tipo)
             if not df_pred_tipo.empty:
                 csv = df_pred_tipo.to_csv(index=False).encode('utf-8')
@@ -367,34 +428,19 @@ def main_page():
     if menu == "Panel de Procesos":
         st.title("⚙️ Panel de Procesos del Sistema")
         st.markdown("Ejecute los procesos clave del sistema de forma secuencial para asegurar la integridad de los datos y predicciones.")
+        reentrenar = st.checkbox("Forzar reentrenamiento de modelos", key='forzar_reentrenamiento',
+                                 help="Entrena de nuevo todas las series aunque sus datos no hayan cambiado desde la última ejecución.")
         st.subheader("Proceso Completo (Recomendado)")
         if st.button("Ejecutar Proceso Completo 🚀"):
             with st.expander("Ver Salida del Proceso Completo", expanded=True):
                 with st.spinner('Ejecutando todos los pasos... Esto puede tardar varios minutos.'):
-                    try:
-                        st.info("Paso 1: Cargando archivos de input...")
-                        command_carga = [sys.executable, str(Path("notebooks/carga_archivo_script.py"))]
-                        process_carga = subprocess.run(command_carga, capture_output=True, text=True, check=True, encoding='utf-8', errors='replace')
-                        st.text_area("Resultado de la Carga", process_carga.stdout, height=150)
-                        st.success("Carga de archivos completada.")
-
-                        st.info("Paso 2: Actualizando Hechos y Dimensiones...")
-                        command_update = [sys.executable, str(Path("notebooks/update_datos_script.py")), '--db-host', os.getenv('DB_HOST'), '--db-port', os.getenv('DB_PORT'), '--db-user', os.getenv('DB_USER'), '--db-password', os.getenv('DB_PASSWORD'), '--db-name', os.getenv('DB_NAME')]
-                        process_update = subprocess.run(command_update, capture_output=True, text=True, check=True, encoding='utf-8', errors='replace')
-                        st.text_area("Resultado de la Actualización", process_update.stdout, height=150)
-                        st.success("Actualización de datos completada.")
-
-                        st.info("Paso 3: Generando predicciones...")
-                        command_pred = [sys.executable, str(Path("notebooks/predicciones_script.py")), '--db-host', os.getenv('DB_HOST'), '--db-port', os.getenv('DB_PORT'), '--db-user', os.getenv('DB_USER'), '--db-password', os.getenv('DB_PASSWORD'), '--db-name', os.getenv('DB_NAME'), '--output-dir-graphs', 'output/images', '--output-dir-excel', 'output/excel']
-                        process_pred = subprocess.run(command_pred, capture_output=True, text=True, check=True, encoding='utf-8', errors='replace')
-                        st.text_area("Resultado de la Predicción", process_pred.stdout, height=200)
-                        st.success("Generación de predicciones completada.")
+                    resultado = run_pipeline_steps(["carga", "dimensiones", "hechos", "predicciones"], "Resultado del Proceso Completo",
+                                                   reentrenar=reentrenar)
+                    if resultado and resultado["ok"]:
+                        st.session_state.prediction_charts = resultado["contexto"].get("prediction_charts")
+                        st.success("Proceso completo finalizado.")
                         st.balloons()
 
-                    except subprocess.CalledProcessError as e:
-                        st.error(f"Falló la ejecución de un script:")
-                        st.text_area("Detalles del Error", e.stderr, height=200)
-
         st.markdown("<hr>", unsafe_allow_html=True)
 
         st.subheader("Procesos Individuales")
@@ -404,44 +450,26 @@ def main_page():
             if st.button("1. Cargar Inputs"):
                 with st.expander("Ver Salida de la Carga", expanded=True):
                     with st.spinner('Cargando archivos...'):
-                        try:
-                            command_carga = [sys.executable, str(Path("notebooks/carga_archivo_script.py"))]
-                            process_carga = subprocess.run(command_carga, capture_output=True, text=True, check=True, encoding='utf-8', errors='replace')
-                            st.text_area("Resultado de la Carga", process_carga.stdout, height=150)
+                        resultado = run_pipeline_steps(["carga"], "Resultado de la Carga")
+                        if resultado and resultado["ok"]:
                             st.success("Carga de archivos completada.")
-                        except subprocess.CalledProcessError as e:
-                            st.error(f"Error durante la carga:")
-                            st.text_area("Detalles del Error", e.stderr, height=200)
 
         with col2:
             if st.button("2. Actualizar Datos"):
                 with st.expander("Ver Salida de la Actualización", expanded=True):
                     with st.spinner('Actualizando datos...'):
-                        try:
-                            command_update = [sys.executable, str(Path("notebooks/update_datos_script.py")), '--db-host', os.getenv('DB_HOST'), '--db-port', os.getenv('DB_PORT'), '--db-user', os.getenv('DB_USER'), '--db-password', os.getenv('DB_PASSWORD'), '--db-name', os.getenv('DB_NAME')]
-                            process_update = subprocess.run(command_update, capture_output=True, text=True, check=True, encoding='utf-8', errors='replace')
-                            st.text_area("Resultado de la Actualización", process_update.stdout, height=150)
+                        resultado = run_pipeline_steps(["dimensiones", "hechos"], "Resultado de la Actualización")
+                        if resultado and resultado["ok"]:
                             st.success("Actualización de datos completada.")
-                        except subprocess.CalledProcessError as e:
-                            st.error(f"Error durante la actualización:")
-                            st.text_area("Detalles del Error", e.stderr, height=200)
 
         with col3:
             if st.button("3. Ejecutar Predicciones"):
                 with st.spinner('Ejecutando predicciones y generando gráficos...'):
-                    try:
-                        db_config = {
-                            'host': os.getenv('DB_HOST'),
-                            'port': os.getenv('DB_PORT'),
-                            'user': os.getenv('DB_USER'),
-                            'password': os.getenv('DB_PASSWORD'),
-                            'database': os.getenv('DB_NAME')
-                        }
-                        st.session_state.prediction_charts = get_prediction_charts_and_update_db(db_config)
+                    resultado = run_pipeline_steps(["predicciones"], "Resultado de las Predicciones", reentrenar=reentrenar)
+                    if resultado and resultado["ok"]:
+                        st.session_state.prediction_charts = resultado["contexto"].get("prediction_charts")
                         st.success("Proceso de predicción completado y gráficos generados.")
                         st.info("Navegue a la página de 'Predicciones' para ver los resultados.")
-                    except Exception as e:
-                        st.error(f"Error durante el proceso de predicción: {e}")
 
         with col4:
             if st.button("4. Generar Gráficas de Análisis"):
@@ -454,7 +482,7 @@ def main_page():
                             'password': os.getenv('DB_PASSWORD'),
                             'database': os.getenv('DB_NAME')
                         }
-                        st.session_state.analysis_charts = generate_analysis_charts(db_config)
+                        st.session_state.analysis_charts = generate_analysis_charts(db_config, engine=get_db_engine())
                         st.success("Gráficos de análisis generados.")
                         st.info("Navegue a la página de 'Análisis Comparativo' para ver los resultados.")
                     except Exception as e:
@@ -462,12 +490,28 @@ def main_page():
     
     elif menu == "Subir Archivos":
         st.header("📂 Subir Archivos Excel")
-        st.info("Esta sección es para cargar manualmente los archivos Excel. El proceso 'Actualizar Datos Base' en el Panel de Procesos ya utiliza los archivos existentes en la carpeta 'input_files'.")
+        st.info("Los archivos subidos se guardan en 'input_files/mantenimiento' y se cargan de inmediato en staging. Los demás archivos no se vuelven a procesar; luego ejecute '2. Actualizar Datos' en el Panel de Procesos.")
         uploaded_files = st.file_uploader("Seleccionar archivos Excel", type=["xlsx", "xls"], accept_multiple_files=True)
         if uploaded_files:
+            resumen_carga = []
             for uploaded_file in uploaded_files:
                 upload_file(uploaded_file, "mantenimiento")
+                try:
+                    resumen = ingest_uploaded_file(uploaded_file, "mantenimiento")
+                except Exception as e:
+                    st.error(f"Error al cargar {uploaded_file.name} en staging: {e}")
+                    continue
+                if resumen:
+                    resumen_carga.append({
+                        "Archivo": resumen["archivo"],
+                        "Registros cargados": resumen["registros"],
+                        "Rechazados": 0 if resumen["rechazados"] is None else len(resumen["rechazados"]),
+                        "Mensaje": resumen["mensaje"],
+                    })
             st.success(f"{len(uploaded_files)} archivos subidos correctamente a 'input_files/mantenimiento'.")
+            if resumen_carga:
+                st.write("##### Carga en staging")
+                st.dataframe(pd.DataFrame(resumen_carga))
     
     elif menu == "Datos Históricos":
         st.header("Datos Históricos")
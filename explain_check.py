@@ -0,0 +1,85 @@
+import argparse
+import mysql.connector
+from mysql.connector import Error
+import os
+from dotenv import load_dotenv
+import sys
+
+from notebooks.consultas import CONSULTAS_VERIFICADAS, LECTURAS_COMPLETAS, PARAMETROS_EXPLAIN
+
+def explain_query(cursor, sql, params=PARAMETROS_EXPLAIN):
+    """Filas del plan (EXPLAIN tradicional) como diccionarios; incluye las particiones leídas."""
+    cursor.execute(f"EXPLAIN {sql}", params)
+    return cursor.fetchall()
+
+def full_scans(plan, ignore_below_rows=0, permitir_indice=False):
+    """
+    Pasos del plan que recorren la tabla completa (type = ALL) o un índice completo
+    (type = index, que lee todas sus entradas aunque no toque las filas).
+    Con permitir_indice solo se marcan los type = ALL.
+    """
+    tipos = {'ALL'} if permitir_indice else {'ALL', 'INDEX'}
+    return [paso for paso in plan
+            if (paso.get('type') or '').upper() in tipos and (paso.get('rows') or 0) >= ignore_below_rows]
+
+def check_queries(conn, consultas=CONSULTAS_VERIFICADAS, ignore_below_rows=0):
+    """
+    Ejecuta EXPLAIN sobre cada consulta e imprime su plan.
+    Devuelve {nombre: [pasos con recorrido completo]} para las consultas que fallan;
+    a las de LECTURAS_COMPLETAS se les permite recorrer un índice completo.
+    """
+    fallos = {}
+    cursor = conn.cursor(dictionary=True)
+    try:
+        for nombre, sql in consultas.items():
+            plan = explain_query(cursor, sql)
+            print(f"\n{nombre}:")
+            for paso in plan:
+                print(f"  {paso.get('table')}: type={paso.get('type')}, key={paso.get('key')}, "
+                      f"partitions={paso.get('partitions')}, rows={paso.get('rows')}, extra={paso.get('Extra')}")
+            escaneos = full_scans(plan, ignore_below_rows, permitir_indice=nombre in LECTURAS_COMPLETAS)
+            if escaneos:
+                fallos[nombre] = escaneos
+    finally:
+        cursor.close()
+    return fallos
+
+def main():
+    parser = argparse.ArgumentParser(description='Verifica con EXPLAIN que las consultas del tablero usan índices.')
+    parser.add_argument('--ignore-below-rows', type=int, default=0,
+                        help='Tolera recorridos completos de tablas o índices con menos filas estimadas (p. ej. dimensiones pequeñas).')
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_config = {
+        'host': os.getenv('DB_HOST'),
+        'port': os.getenv('DB_PORT'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME'),
+    }
+    if not all(db_config.values()):
+        print("Error: Faltan variables de entorno para la base de datos en el archivo .env", file=sys.stderr)
+        sys.exit(1)
+
+    conn = None
+    try:
+        conn = mysql.connector.connect(**db_config)
+        fallos = check_queries(conn, ignore_below_rows=args.ignore_below_rows)
+    except Error as e:
+        print(f"Error al ejecutar EXPLAIN: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+    if fallos:
+        print("\nConsultas con recorrido completo de tabla o de índice:", file=sys.stderr)
+        for nombre, escaneos in fallos.items():
+            tablas = ', '.join(f"{paso.get('table')} ({paso.get('type')})" for paso in escaneos)
+            print(f"  {nombre}: {tablas}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nLas {len(CONSULTAS_VERIFICADAS)} consultas usan índices.")
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,34 @@ import os
 from dotenv import load_dotenv
 import sys
 
+def split_sql_commands(sql_script):
+    """
+    Parser manual para manejar delimitadores (DELIMITER //) y separar el script
+    en comandos que se pueden ejecutar uno por uno.
+    """
+    sql_commands = []
+    current_command = ""
+    delimiter = ";"
+    for line in sql_script.splitlines():
+        line = line.strip()
+        if not line or line.startswith('--'):
+            continue
+
+        if line.lower().startswith('delimiter'):
+            delimiter = line.split()[1]
+            continue
+
+        current_command += line + " "
+        if line.endswith(delimiter):
+            # Quitamos el delimitador del final del comando
+            sql_commands.append(current_command.strip()[:-len(delimiter)].strip())
+            current_command = ""
+
+    # Añadir el último comando si no termina con delimitador (poco probable pero seguro)
+    if current_command.strip():
+        sql_commands.append(current_command.strip())
+    return sql_commands
+
 def initialize_database():
     """
     Se conecta a la base de datos y ejecuta el script schema.sql
@@ -35,49 +63,41 @@ def initialize_database():
         cursor = conn.cursor()
         print("Conexión exitosa.")
 
-        schema_file = 'schema.sql'
-        print(f"Leyendo el archivo de esquema: {schema_file}")
-        with open(schema_file, 'r', encoding='utf-8') as f:
-            sql_script = f.read()
-
-        print("Ejecutando el script SQL comando por comando...")
-        # Parser manual para manejar delimitadores y ejecutar comando por comando
-        sql_commands = []
-        current_command = ""
-        delimiter = ";"
-        for line in sql_script.splitlines():
-            line = line.strip()
-            if not line or line.startswith('--'):
-                continue
-
-            if line.lower().startswith('delimiter'):
-                delimiter = line.split()[1]
-                continue
+        # Esquema (tablas) y luego procedimientos almacenados
+        for schema_file in ('schema.sql', 'procedures.sql'):
+            print(f"Leyendo el archivo de esquema: {schema_file}")
+            with open(schema_file, 'r', encoding='utf-8') as f:
+                sql_script = f.read()
 
-            current_command += line + " "
-            if line.endswith(delimiter):
-                # Quitamos el delimitador del final del comando
-                sql_commands.append(current_command.strip()[:-len(delimiter)].strip())
-                current_command = ""
-        
-        # Añadir el último comando si no termina con delimitador (poco probable pero seguro)
-        if current_command.strip():
-            sql_commands.append(current_command.strip())
+            print("Ejecutando el script SQL comando por comando...")
+            sql_commands = split_sql_commands(sql_script)
 
-        for command in sql_commands:
-            if command:
-                try:
-                    print(f"  -> Ejecutando: {command[:80].replace('\n', ' ')}...")
-                    cursor.execute(command)
-                except Error as e:
-                    print(f"    ERROR al ejecutar comando: {e}")
-                    # Opcional: decidir si parar o continuar en caso de error
-                    # raise e # Descomentar para parar en el primer error
+            for command in sql_commands:
+                if command:
+                    try:
+                        preview = command[:80].replace('\n', ' ')
+                        print(f"  -> Ejecutando: {preview}...")
+                        cursor.execute(command)
+                    except Error as e:
+                        print(f"    ERROR al ejecutar comando: {e}")
+                        # Opcional: decidir si parar o continuar en caso de error
+                        # raise e # Descomentar para parar en el primer error
 
         conn.commit()
         print("\n¡Base de datos inicializada con éxito!")
         print("Todas las tablas han sido creadas.")
 
+        # schema.sql ya refleja todas las migraciones: se registran sin ejecutarlas
+        from migrate_schema import DEFAULT_CALENDAR_FROM, DEFAULT_CALENDAR_TO, apply_migrations, ensure_calendar
+        registradas = apply_migrations(conn, baseline=True)
+        print(f"Migraciones registradas como aplicadas: {', '.join(registradas) if registradas else 'ninguna'}")
+
+        # Calendario inicial de Dim_Tiempo (configurable con CALENDARIO_DESDE / CALENDARIO_HASTA)
+        desde = os.getenv('CALENDARIO_DESDE', DEFAULT_CALENDAR_FROM)
+        hasta = os.getenv('CALENDARIO_HASTA', DEFAULT_CALENDAR_TO)
+        dias = ensure_calendar(conn, desde, hasta)
+        print(f"Calendario Dim_Tiempo generado del {desde} al {hasta} ({dias} días).")
+
     except Error as e:
         print(f"\nError al inicializar la base de datos: {e}", file=sys.stderr)
         if conn:
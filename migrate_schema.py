@@ -0,0 +1,179 @@
+import argparse
+import mysql.connector
+from mysql.connector import Error
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+import sys
+
+from init_db import split_sql_commands
+
+ROOT_DIR = Path(__file__).resolve().parent
+MIGRATIONS_DIR = ROOT_DIR / "migrations"
+PROCEDURES_FILE = ROOT_DIR / "procedures.sql"
+
+CREATE_MIGRATIONS_TABLE = """
+CREATE TABLE IF NOT EXISTS `Schema_Migraciones` (
+    `Version` VARCHAR(255) PRIMARY KEY,
+    `FechaAplicacion` DATETIME NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# Rango inicial del calendario Dim_Tiempo (coincide con las particiones anuales de schema.sql);
+# sp_extender_calendario lo amplía por años completos si llegan fechas fuera de él
+DEFAULT_CALENDAR_FROM = "2020-01-01"
+DEFAULT_CALENDAR_TO = "2030-12-31"
+
+# Tablas particionadas por año: límite superior de la partición pAAAA
+PARTITIONED_TABLES = {
+    "Hechos_Mantenimiento": lambda anio: f"({anio + 1})",
+    "Predicciones_Vehiculo_Tipo": lambda anio: f"('{anio + 1}-01-01')",
+    "Predicciones_Tipo_Mantenimiento": lambda anio: f"('{anio + 1}-01-01')",
+}
+# Partición final que recibe los años todavía sin partición propia
+FUTURE_PARTITION = "p_futuro"
+# Versión anterior que deja publicar_predicciones (predicciones_script.py) para poder
+# restaurarla: debe tener las mismas particiones que la tabla publicada
+PREVIOUS_SUFFIX = "_anterior"
+
+def pending_migrations(cursor, migrations_dir=MIGRATIONS_DIR):
+    """Archivos .sql de migrations/ que aún no figuran en Schema_Migraciones, en orden de versión."""
+    cursor.execute(CREATE_MIGRATIONS_TABLE)
+    cursor.execute("SELECT Version FROM Schema_Migraciones")
+    aplicadas = {row[0] for row in cursor.fetchall()}
+    return [path for path in sorted(Path(migrations_dir).glob("*.sql")) if path.stem not in aplicadas]
+
+def apply_migrations(conn, migrations_dir=MIGRATIONS_DIR, baseline=False):
+    """
+    Aplica en orden las migraciones pendientes y registra cada una al terminar.
+    Se detiene en la primera que falle (en MySQL el DDL no es transaccional, así
+    que la migración fallida debe revisarse antes de reintentar).
+    Con baseline=True solo las registra: se usa tras crear la base desde schema.sql,
+    que ya incluye todos los cambios.
+    Devuelve la lista de versiones aplicadas.
+    """
+    cursor = conn.cursor()
+    aplicadas = []
+    try:
+        for path in pending_migrations(cursor, migrations_dir):
+            if not baseline:
+                print(f"Aplicando migración {path.name}...")
+                for command in split_sql_commands(path.read_text(encoding='utf-8')):
+                    if command:
+                        cursor.execute(command)
+            cursor.execute("INSERT INTO Schema_Migraciones (Version, FechaAplicacion) VALUES (%s, NOW())", (path.stem,))
+            conn.commit()
+            aplicadas.append(path.stem)
+    finally:
+        cursor.close()
+    return aplicadas
+
+def apply_procedures(conn, procedures_file=PROCEDURES_FILE):
+    """Vuelve a crear los procedimientos almacenados (procedures.sql es idempotente)."""
+    cursor = conn.cursor()
+    try:
+        for command in split_sql_commands(Path(procedures_file).read_text(encoding='utf-8')):
+            if command:
+                cursor.execute(command)
+        conn.commit()
+    finally:
+        cursor.close()
+
+def ensure_calendar(conn, desde=DEFAULT_CALENDAR_FROM, hasta=DEFAULT_CALENDAR_TO):
+    """Genera en Dim_Tiempo los días del rango que falten; devuelve cuántos se agregaron."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT COUNT(*) FROM Dim_Tiempo")
+        antes = cursor.fetchone()[0]
+        cursor.callproc("sp_generar_calendario", (desde, hasta))
+        conn.commit()
+        cursor.execute("SELECT COUNT(*) FROM Dim_Tiempo")
+        return cursor.fetchone()[0] - antes
+    finally:
+        cursor.close()
+
+def ensure_year_partitions(conn, through_year):
+    """
+    Divide la partición p_futuro de cada tabla particionada para que cada año hasta
+    through_year tenga su propia partición pAAAA (REORGANIZE PARTITION mueve las filas
+    que ya estuvieran en p_futuro). También la de su <tabla>_anterior, si existe, para
+    que restaurar_predicciones no publique una tabla sin los años nuevos.
+    Devuelve {tabla: [particiones creadas]}.
+    """
+    cursor = conn.cursor()
+    creadas = {}
+    try:
+        for base, limite in PARTITIONED_TABLES.items():
+            for tabla in (base, f"{base}{PREVIOUS_SUFFIX}"):
+                cursor.execute(
+                    "SELECT PARTITION_NAME FROM INFORMATION_SCHEMA.PARTITIONS "
+                    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL",
+                    (tabla,))
+                nombres = [row[0] for row in cursor.fetchall()]
+                anios = [int(nombre[1:]) for nombre in nombres if nombre[1:].isdigit()]
+                if FUTURE_PARTITION not in nombres or not anios:
+                    # La tabla anterior solo existe después de la primera publicación
+                    if tabla == base:
+                        print(f"{tabla} no tiene particiones anuales; se omite.")
+                    continue
+                nuevos = list(range(max(anios) + 1, through_year + 1))
+                if not nuevos:
+                    continue
+                definiciones = [f"PARTITION p{anio} VALUES LESS THAN {limite(anio)}" for anio in nuevos]
+                maximo = "MAXVALUE" if base == "Hechos_Mantenimiento" else "(MAXVALUE)"
+                definiciones.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN {maximo}")
+                cursor.execute(f"ALTER TABLE {tabla} REORGANIZE PARTITION {FUTURE_PARTITION} "
+                               f"INTO ({', '.join(definiciones)})")
+                creadas[tabla] = [f"p{anio}" for anio in nuevos]
+    finally:
+        cursor.close()
+    return creadas
+
+def main():
+    parser = argparse.ArgumentParser(description='Aplica las migraciones pendientes y recrea los procedimientos.')
+    parser.add_argument('--partitions-through', type=int, default=None,
+                        help='Crea particiones anuales hasta este año (inclusive) en las tablas particionadas.')
+    parser.add_argument('--calendar-from', default=None,
+                        help='Primera fecha (AAAA-MM-DD) a generar en el calendario Dim_Tiempo.')
+    parser.add_argument('--calendar-to', default=None,
+                        help='Última fecha (AAAA-MM-DD) a generar en el calendario Dim_Tiempo.')
+    args = parser.parse_args()
+
+    load_dotenv()
+
+    db_host = os.getenv('DB_HOST')
+    db_port = os.getenv('DB_PORT')
+    db_user = os.getenv('DB_USER')
+    db_password = os.getenv('DB_PASSWORD')
+    db_name = os.getenv('DB_NAME')
+
+    if not all([db_host, db_port, db_user, db_password, db_name]):
+        print("Error: Faltan variables de entorno para la base de datos en el archivo .env", file=sys.stderr)
+        sys.exit(1)
+
+    conn = None
+    try:
+        conn = mysql.connector.connect(host=db_host, port=db_port, user=db_user, password=db_password, database=db_name)
+        aplicadas = apply_migrations(conn)
+        if aplicadas:
+            print(f"Migraciones aplicadas: {', '.join(aplicadas)}")
+        else:
+            print("El esquema ya está al día; no hay migraciones pendientes.")
+        apply_procedures(conn)
+        print("Procedimientos almacenados actualizados.")
+        if args.calendar_from or args.calendar_to:
+            agregados = ensure_calendar(conn, args.calendar_from or DEFAULT_CALENDAR_FROM,
+                                        args.calendar_to or DEFAULT_CALENDAR_TO)
+            print(f"Calendario Dim_Tiempo: {agregados} días agregados.")
+        if args.partitions_through:
+            for tabla, particiones in ensure_year_partitions(conn, args.partitions_through).items():
+                print(f"{tabla}: particiones creadas {', '.join(particiones)}")
+    except Error as e:
+        print(f"\nError al aplicar migraciones: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+-- Esquema de staging y hechos que las migraciones siguientes dan por supuesto: columnas
+-- de negocio, ArchivoHash y HashFila en staging, Ingesta_Manifiesto, Control_Cargas y
+-- HashFila en hechos. Se crean tal como quedaron antes de 002 (Control_Cargas con
+-- UltimoId y Actualizados, que 008 y 009 eliminan).
+-- Cada cambio comprueba INFORMATION_SCHEMA: en bases que ya lo tienen no hace nada.
+-- Las filas de staging y hechos anteriores no tienen HashFila (se calcula al leer el
+-- Excel en notebooks/lectura_excel.py) ni archivo de origen: se eliminan y la siguiente
+-- carga las reconstruye desde input_files, ya que el manifiesto parte vacío.
+
+CREATE TABLE IF NOT EXISTS `Ingesta_Manifiesto` (
+    `HashContenido` CHAR(64) PRIMARY KEY,
+    `RutaArchivo` VARCHAR(512) NOT NULL,
+    `TamanoBytes` BIGINT,
+    `Registros` INT,
+    `FechaCarga` DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+CREATE TABLE IF NOT EXISTS `Control_Cargas` (
+    `Proceso` VARCHAR(50) PRIMARY KEY,
+    `UltimoId` INT NOT NULL DEFAULT 0,
+    `Insertados` INT,
+    `Actualizados` INT,
+    `SinCambios` INT,
+    `FechaEjecucion` DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+DROP PROCEDURE IF EXISTS `tmp_migracion_000`;
+
+DELIMITER //
+
+CREATE PROCEDURE `tmp_migracion_000`()
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+                   WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'STG_Mantenimientos'
+                     AND COLUMN_NAME = 'HashFila') THEN
+        DELETE FROM `STG_Mantenimientos`;
+        ALTER TABLE `STG_Mantenimientos`
+            ADD COLUMN `Codigo_contable` VARCHAR(50) AFTER `id`,
+            ADD COLUMN `Comprobante` VARCHAR(50) AFTER `NombreVehiculo`,
+            ADD COLUMN `Secuencia` VARCHAR(50) AFTER `Comprobante`,
+            ADD COLUMN `Descripcion` TEXT AFTER `Secuencia`,
+            ADD COLUMN `Matricula` VARCHAR(50) AFTER `Descripcion`,
+            ADD COLUMN `ArchivoHash` CHAR(64) AFTER `FechaCarga`,
+            ADD COLUMN `HashFila` BIGINT NOT NULL AFTER `ArchivoHash`,
+            ADD UNIQUE KEY `uq_stg_hash_fila` (`HashFila`),
+            ADD KEY `idx_stg_archivo_hash` (`ArchivoHash`);
+    END IF;
+
+    IF NOT EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.COLUMNS
+                   WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Hechos_Mantenimiento'
+                     AND COLUMN_NAME = 'HashFila') THEN
+        DELETE FROM `Hechos_Mantenimiento`;
+        ALTER TABLE `Hechos_Mantenimiento`
+            ADD COLUMN `HashFila` BIGINT NOT NULL AFTER `Debito`,
+            ADD UNIQUE KEY `uq_hechos_hash_fila` (`HashFila`);
+    END IF;
+END//
+
+DELIMITER ;
+
+CALL `tmp_migracion_000`();
+
+DROP PROCEDURE `tmp_migracion_000`;
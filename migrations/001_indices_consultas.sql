@@ -0,0 +1,17 @@
+-- Índices de cobertura para las consultas de notebooks/consultas.py
+-- (tablero en app.py, generar_graficas.py y predicciones_script.py).
+
+-- Análisis comparativo: filtro Debito > 0 con tipo y fecha en el propio índice
+CREATE INDEX `idx_hechos_debito_tipo` ON `Hechos_Mantenimiento` (`Debito`, `TipoMantenimiento`, `TiempoKey`);
+
+-- Lista de tipos de mantenimiento y agrupaciones por tipo
+CREATE INDEX `idx_hechos_tipo` ON `Hechos_Mantenimiento` (`TipoMantenimiento`, `TiempoKey`, `Debito`);
+
+-- Lectura de entrenamiento ordenada por serie vehículo/tipo/fecha, sin filesort
+CREATE INDEX `idx_hechos_serie` ON `Hechos_Mantenimiento` (`VehiculoKey`, `TipoMantenimiento`, `TiempoKey`, `TerceroKey`, `Debito`);
+
+-- Pestaña de datos de predicción: ORDER BY NombreVehiculo, TipoMantenimiento, Fecha
+CREATE INDEX `idx_pred_vehiculo_tipo_fecha` ON `Predicciones_Vehiculo_Tipo` (`NombreVehiculo`, `TipoMantenimiento`, `Fecha`, `Costo`, `Origen`);
+
+-- ORDER BY TipoMantenimiento, Fecha y lectura completa para el análisis
+CREATE INDEX `idx_pred_tipo_fecha` ON `Predicciones_Tipo_Mantenimiento` (`TipoMantenimiento`, `Fecha`, `Costo`, `Origen`);
@@ -0,0 +1,76 @@
+-- Particionado por año de la tabla de hechos (RANGE sobre Anio) y de las tablas de
+-- predicciones (RANGE COLUMNS sobre Fecha), para bases creadas antes de este cambio.
+-- Las tablas particionadas no admiten claves foráneas y toda clave única debe incluir
+-- la columna de partición.
+
+ALTER TABLE `Hechos_Mantenimiento`
+    DROP FOREIGN KEY `Hechos_Mantenimiento_ibfk_1`,
+    DROP FOREIGN KEY `Hechos_Mantenimiento_ibfk_2`,
+    DROP FOREIGN KEY `Hechos_Mantenimiento_ibfk_3`;
+
+ALTER TABLE `Hechos_Mantenimiento` ADD COLUMN `Anio` SMALLINT NOT NULL DEFAULT 0 AFTER `TiempoKey`;
+
+UPDATE `Hechos_Mantenimiento` h
+JOIN `Dim_Tiempo` ti ON ti.TiempoKey = h.TiempoKey
+SET h.Anio = ti.Anio;
+
+ALTER TABLE `Hechos_Mantenimiento`
+    ALTER COLUMN `Anio` DROP DEFAULT,
+    DROP PRIMARY KEY, ADD PRIMARY KEY (`HechoKey`, `Anio`),
+    DROP INDEX `uq_hechos_hash_fila`, ADD UNIQUE KEY `uq_hechos_hash_fila` (`HashFila`, `Anio`),
+    ADD KEY `idx_hechos_anio` (`Anio`);
+
+ALTER TABLE `Hechos_Mantenimiento`
+PARTITION BY RANGE (`Anio`) (
+    PARTITION `p_anterior` VALUES LESS THAN (2020),
+    PARTITION `p2020` VALUES LESS THAN (2021),
+    PARTITION `p2021` VALUES LESS THAN (2022),
+    PARTITION `p2022` VALUES LESS THAN (2023),
+    PARTITION `p2023` VALUES LESS THAN (2024),
+    PARTITION `p2024` VALUES LESS THAN (2025),
+    PARTITION `p2025` VALUES LESS THAN (2026),
+    PARTITION `p2026` VALUES LESS THAN (2027),
+    PARTITION `p2027` VALUES LESS THAN (2028),
+    PARTITION `p2028` VALUES LESS THAN (2029),
+    PARTITION `p2029` VALUES LESS THAN (2030),
+    PARTITION `p2030` VALUES LESS THAN (2031),
+    PARTITION `p_futuro` VALUES LESS THAN MAXVALUE
+);
+
+ALTER TABLE `Predicciones_Vehiculo_Tipo` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `Fecha`);
+
+ALTER TABLE `Predicciones_Vehiculo_Tipo`
+PARTITION BY RANGE COLUMNS (`Fecha`) (
+    PARTITION `p_anterior` VALUES LESS THAN ('2020-01-01'),
+    PARTITION `p2020` VALUES LESS THAN ('2021-01-01'),
+    PARTITION `p2021` VALUES LESS THAN ('2022-01-01'),
+    PARTITION `p2022` VALUES LESS THAN ('2023-01-01'),
+    PARTITION `p2023` VALUES LESS THAN ('2024-01-01'),
+    PARTITION `p2024` VALUES LESS THAN ('2025-01-01'),
+    PARTITION `p2025` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p2026` VALUES LESS THAN ('2027-01-01'),
+    PARTITION `p2027` VALUES LESS THAN ('2028-01-01'),
+    PARTITION `p2028` VALUES LESS THAN ('2029-01-01'),
+    PARTITION `p2029` VALUES LESS THAN ('2030-01-01'),
+    PARTITION `p2030` VALUES LESS THAN ('2031-01-01'),
+    PARTITION `p_futuro` VALUES LESS THAN (MAXVALUE)
+);
+
+ALTER TABLE `Predicciones_Tipo_Mantenimiento` DROP PRIMARY KEY, ADD PRIMARY KEY (`id`, `Fecha`);
+
+ALTER TABLE `Predicciones_Tipo_Mantenimiento`
+PARTITION BY RANGE COLUMNS (`Fecha`) (
+    PARTITION `p_anterior` VALUES LESS THAN ('2020-01-01'),
+    PARTITION `p2020` VALUES LESS THAN ('2021-01-01'),
+    PARTITION `p2021` VALUES LESS THAN ('2022-01-01'),
+    PARTITION `p2022` VALUES LESS THAN ('2023-01-01'),
+    PARTITION `p2023` VALUES LESS THAN ('2024-01-01'),
+    PARTITION `p2024` VALUES LESS THAN ('2025-01-01'),
+    PARTITION `p2025` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p2026` VALUES LESS THAN ('2027-01-01'),
+    PARTITION `p2027` VALUES LESS THAN ('2028-01-01'),
+    PARTITION `p2028` VALUES LESS THAN ('2029-01-01'),
+    PARTITION `p2029` VALUES LESS THAN ('2030-01-01'),
+    PARTITION `p2030` VALUES LESS THAN ('2031-01-01'),
+    PARTITION `p_futuro` VALUES LESS THAN (MAXVALUE)
+);
@@ -0,0 +1,9 @@
+-- Fecha sin hora precalculada en staging para unir con Dim_Tiempo por una columna
+-- indexada en lugar de DATE(FechaElaboracion). La carga la informa en cada fila nueva;
+-- aquí se completa para las filas que ya estaban en staging.
+
+ALTER TABLE `STG_Mantenimientos` ADD COLUMN `FechaDia` DATE AFTER `HashFila`;
+
+UPDATE `STG_Mantenimientos` SET `FechaDia` = DATE(`FechaElaboracion`) WHERE `FechaElaboracion` IS NOT NULL;
+
+CREATE INDEX `idx_stg_fecha_dia` ON `STG_Mantenimientos` (`FechaDia`);
@@ -0,0 +1,36 @@
+-- Dim_Tiempo pasa a ser un calendario con TiempoKey = AAAAMMDD (sin AUTO_INCREMENT),
+-- para que los procedimientos de hechos calculen la clave desde FechaDia sin unir
+-- con la dimensión. Se reescriben las claves existentes en hechos y dimensión.
+-- Las claves nuevas (>= 10000101) nunca coinciden con las antiguas, que eran secuenciales.
+
+UPDATE `Hechos_Mantenimiento` h
+JOIN `Dim_Tiempo` ti ON ti.TiempoKey = h.TiempoKey
+SET h.TiempoKey = YEAR(ti.Fecha) * 10000 + MONTH(ti.Fecha) * 100 + DAY(ti.Fecha);
+
+ALTER TABLE `Dim_Tiempo` MODIFY `TiempoKey` INT NOT NULL;
+
+UPDATE `Dim_Tiempo`
+SET TiempoKey = YEAR(Fecha) * 10000 + MONTH(Fecha) * 100 + DAY(Fecha)
+WHERE Fecha IS NOT NULL
+ORDER BY TiempoKey DESC;
+
+DELETE FROM `Dim_Tiempo` WHERE Fecha IS NULL;
+
+-- Antes solo existían los días presentes en staging: se completan los huecos para
+-- que el calendario sea continuo (sp_extender_calendario solo amplía sus extremos)
+SELECT MAKEDATE(YEAR(MIN(Fecha)), 1), MAKEDATE(YEAR(MAX(Fecha)) + 1, 1) - INTERVAL 1 DAY
+INTO @calendario_desde, @calendario_hasta
+FROM `Dim_Tiempo`;
+
+SET SESSION cte_max_recursion_depth = GREATEST(@@cte_max_recursion_depth,
+                                               COALESCE(DATEDIFF(@calendario_hasta, @calendario_desde), 0) + 1);
+
+INSERT IGNORE INTO `Dim_Tiempo` (TiempoKey, Fecha, Anio, Mes, Dia)
+WITH RECURSIVE dias (Fecha) AS (
+    SELECT CAST(@calendario_desde AS DATE)
+    UNION ALL
+    SELECT Fecha + INTERVAL 1 DAY FROM dias WHERE Fecha < @calendario_hasta
+)
+SELECT YEAR(Fecha) * 10000 + MONTH(Fecha) * 100 + DAY(Fecha), Fecha, YEAR(Fecha), MONTH(Fecha), DAY(Fecha)
+FROM dias
+WHERE Fecha IS NOT NULL;
@@ -0,0 +1,25 @@
+-- Tabla analítica de grano mensual con el join en estrella ya resuelto. Se llena aquí
+-- una vez; después la regenera sp_refrescar_hechos_analitica al final de cada carga.
+
+CREATE TABLE IF NOT EXISTS `Hechos_Analitica` (
+    `VehiculoKey` INT NOT NULL,
+    `TerceroKey` INT NOT NULL,
+    `NombreVehiculo` VARCHAR(255) NOT NULL,
+    `Categoria` VARCHAR(255),
+    `TipoMatricula` VARCHAR(255),
+    `IdentificacionTercero` VARCHAR(255) NOT NULL,
+    `TipoMantenimiento` VARCHAR(255) NOT NULL,
+    `Mes` DATE NOT NULL,
+    `Costo` DECIMAL(18, 2) NOT NULL,
+    `CostoPositivo` DECIMAL(18, 2) NOT NULL,
+    `Registros` INT NOT NULL,
+    PRIMARY KEY (`VehiculoKey`, `TipoMantenimiento`, `Mes`, `TerceroKey`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT INTO `Hechos_Analitica` (VehiculoKey, TerceroKey, NombreVehiculo, Categoria, TipoMatricula,
+                                IdentificacionTercero, TipoMantenimiento, Mes, Costo, CostoPositivo, Registros)
+SELECT r.VehiculoKey, r.TerceroKey, v.NombreVehiculo, v.Categoria, v.TipoMatricula,
+       t.IdentificacionTercero, r.TipoMantenimiento, r.Mes, r.Costo, r.CostoPositivo, r.Registros
+FROM `Resumen_Mensual` r
+JOIN `Dim_Vehiculos` v ON v.VehiculoKey = r.VehiculoKey
+JOIN `Dim_Terceros` t ON t.TerceroKey = r.TerceroKey;
@@ -0,0 +1,17 @@
+-- Vínculo archivo -> fila de staging. Con la clave única global de HashFila, una fila
+-- presente en dos archivos quedaba solo con el ArchivoHash del primero, y purgar ese
+-- archivo la borraba de staging y de hechos aunque el otro siguiera en el manifiesto.
+-- Se completa con el archivo actual de cada fila (las filas ya perdidas solo vuelven
+-- con una recarga completa).
+
+CREATE TABLE IF NOT EXISTS `STG_Archivo_Filas` (
+    `ArchivoHash` CHAR(64) NOT NULL,
+    `HashFila` BIGINT NOT NULL,
+    PRIMARY KEY (`ArchivoHash`, `HashFila`),
+    KEY `idx_archivo_filas_hash_fila` (`HashFila`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO `STG_Archivo_Filas` (ArchivoHash, HashFila)
+SELECT ArchivoHash, HashFila
+FROM `STG_Mantenimientos`
+WHERE ArchivoHash IS NOT NULL;
@@ -0,0 +1,9 @@
+-- Índices de 001 sobre Hechos_Mantenimiento que ya no usa ninguna consulta: el
+-- análisis comparativo y las agrupaciones por tipo leen Resumen_Mensual y
+-- Hechos_Analitica. Solo encarecían cada carga de hechos.
+-- idx_hechos_serie se conserva: sp_refrescar_resumen_mensual lo usa para unir cada
+-- grupo del resumen con sus hechos (VehiculoKey, TipoMantenimiento, TiempoKey, TerceroKey).
+
+ALTER TABLE `Hechos_Mantenimiento`
+    DROP INDEX `idx_hechos_debito_tipo`,
+    DROP INDEX `idx_hechos_tipo`;
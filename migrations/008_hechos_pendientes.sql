@@ -0,0 +1,20 @@
+-- Filas de staging sin dimensión que la marca de agua dejaba atrás para siempre:
+-- se guardan en STG_Hechos_Pendientes y la carga incremental las reintenta.
+-- Actualizados siempre valía 0 (HashFila cubre todas las columnas de negocio, así
+-- que una fila con el mismo hash no puede traer valores distintos) y se elimina.
+
+CREATE TABLE IF NOT EXISTS `STG_Hechos_Pendientes` (
+    `StgId` INT PRIMARY KEY
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Filas ya saltadas por cargas anteriores
+INSERT IGNORE INTO `STG_Hechos_Pendientes` (StgId)
+SELECT stg.id
+FROM `STG_Mantenimientos` stg
+LEFT JOIN `Dim_Vehiculos` v ON v.NombreVehiculo = stg.NombreVehiculo
+LEFT JOIN `Dim_Terceros` t ON t.IdentificacionTercero = stg.IdentificacionTercero
+WHERE stg.FechaDia IS NOT NULL
+  AND stg.NombreVehiculo IS NOT NULL AND stg.IdentificacionTercero IS NOT NULL
+  AND (v.VehiculoKey IS NULL OR t.TerceroKey IS NULL);
+
+ALTER TABLE `Control_Cargas` DROP COLUMN `Actualizados`;
@@ -0,0 +1,21 @@
+-- La carga incremental deja de usar el id máximo de staging como marca de agua: una
+-- carga aún sin confirmar puede tener ids menores que otra ya confirmada y esas filas
+-- quedaban saltadas. Ahora cada archivo del manifiesto indica si ya pasó a hechos.
+
+ALTER TABLE `Ingesta_Manifiesto`
+    ADD COLUMN `HechosCargados` TINYINT(1) NOT NULL DEFAULT 0,
+    ADD KEY `idx_manifiesto_hechos_cargados` (`HechosCargados`);
+
+-- Archivos cuyas filas quedaron todas por debajo de la marca de agua anterior. Los
+-- demás se reprocesan; las filas que ya estén en hechos solo cuentan como sin cambios.
+UPDATE `Ingesta_Manifiesto` m
+SET m.HechosCargados = 1
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM `STG_Archivo_Filas` af
+    JOIN `STG_Mantenimientos` stg ON stg.HashFila = af.HashFila
+    WHERE af.ArchivoHash = m.HashContenido
+      AND stg.id > COALESCE((SELECT UltimoId FROM `Control_Cargas` WHERE Proceso = 'hechos'), 0)
+);
+
+ALTER TABLE `Control_Cargas` DROP COLUMN `UltimoId`;
@@ -0,0 +1,29 @@
+-- Índice por Fecha en las tablas de predicciones: los años del selector de la pestaña
+-- de predicciones (ANIOS_PREDICCION en notebooks/consultas.py) salen de MIN/MAX(Fecha),
+-- que con este índice se resuelven leyendo un extremo en lugar de toda la tabla.
+-- También en las copias <tabla>_anterior, si existen, para que una restauración no
+-- publique una tabla sin el índice.
+
+DROP PROCEDURE IF EXISTS `tmp_migracion_010`;
+
+DELIMITER //
+
+CREATE PROCEDURE `tmp_migracion_010`()
+BEGIN
+    CREATE INDEX `idx_pred_fecha` ON `Predicciones_Vehiculo_Tipo` (`Fecha`);
+    CREATE INDEX `idx_pred_fecha` ON `Predicciones_Tipo_Mantenimiento` (`Fecha`);
+    IF EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Predicciones_Vehiculo_Tipo_anterior') THEN
+        CREATE INDEX `idx_pred_fecha` ON `Predicciones_Vehiculo_Tipo_anterior` (`Fecha`);
+    END IF;
+    IF EXISTS (SELECT 1 FROM INFORMATION_SCHEMA.TABLES
+               WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Predicciones_Tipo_Mantenimiento_anterior') THEN
+        CREATE INDEX `idx_pred_fecha` ON `Predicciones_Tipo_Mantenimiento_anterior` (`Fecha`);
+    END IF;
+END//
+
+DELIMITER ;
+
+CALL `tmp_migracion_010`();
+
+DROP PROCEDURE `tmp_migracion_010`;
@@ -0,0 +1,114 @@
+# Almacén en disco de los modelos de predicción ya entrenados (archivos joblib + índice)
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+import joblib
+import pandas as pd
+
+# Carpeta junto a notebooks/ (fuera de output/, que se regenera en cada ejecución)
+DEFAULT_MODELOS_DIR = Path(__file__).resolve().parent.parent / ".cache_modelos"
+DEFAULT_MODELOS_MAX_MB = 256
+INDICE = "indice.json"
+# Se incrementa cuando cambia el preprocesamiento o el formato de los modelos guardados
+MODELOS_VERSION = 1
+
+
+def huella_datos(frames, parametros):
+    """
+    Huella de los datos de entrada de una serie y de los hiperparámetros del modelo:
+    si no cambia ninguno, el modelo entrenado sería el mismo y puede reutilizarse.
+    """
+    sha = hashlib.sha1(f"{MODELOS_VERSION}|{json.dumps(parametros, sort_keys=True, default=str)}".encode("utf-8"))
+    for frame in frames:
+        frame = frame.to_frame() if isinstance(frame, pd.Series) else frame
+        sha.update("|".join(map(str, frame.columns)).encode("utf-8"))
+        sha.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+    return sha.hexdigest()
+
+
+class AlmacenModelos:
+    """
+    Modelos entrenados guardados con joblib, un archivo por huella de serie.
+
+    El índice (indice.json) guarda por huella el archivo, el R², la serie, el tamaño
+    y el último uso; el desalojo elimina los menos usados hasta quedar bajo max_bytes.
+    Solo lo usa el proceso principal de predicciones: los procesos de entrenamiento
+    devuelven los modelos y aquí se guardan.
+    """
+
+    def __init__(self, directorio=DEFAULT_MODELOS_DIR, max_bytes=DEFAULT_MODELOS_MAX_MB * 1024 * 1024, salida=None):
+        self.directorio = Path(directorio)
+        self.max_bytes = max_bytes
+        self.salida = salida
+        self.directorio.mkdir(parents=True, exist_ok=True)
+        self.indice = self._leer_indice()
+
+    def _leer_indice(self):
+        try:
+            indice = json.loads((self.directorio / INDICE).read_text(encoding="utf-8"))
+        except (FileNotFoundError, OSError, ValueError):
+            return {}
+        # Entradas cuyo archivo ya no existe (borrado a mano o desalojo interrumpido)
+        return {huella: entrada for huella, entrada in indice.items()
+                if (self.directorio / entrada["archivo"]).exists()}
+
+    def get(self, huella):
+        """Devuelve (modelo, r2) si hay un modelo guardado para la huella, o None."""
+        entrada = self.indice.get(huella)
+        if entrada is None:
+            return None
+        try:
+            modelo = joblib.load(self.directorio / entrada["archivo"])
+        except Exception as e:
+            print(f"No se pudo leer el modelo guardado de {entrada['serie']}: {e}", file=self.salida)
+            self.indice.pop(huella, None)
+            return None
+        entrada["ultimo_uso"] = time.time()
+        return modelo, entrada["r2"]
+
+    def put(self, huella, modelo, r2, serie, segundos=None):
+        archivo = f"{huella}.joblib"
+        ruta = self.directorio / archivo
+        tmp = ruta.with_name(f"{huella}.{os.getpid()}.tmp")
+        joblib.dump(modelo, tmp)
+        os.replace(tmp, ruta)
+        self.indice[huella] = {"archivo": archivo, "r2": float(r2), "serie": serie, "segundos": segundos,
+                               "bytes": ruta.stat().st_size, "ultimo_uso": time.time()}
+
+    def evict(self):
+        """Elimina los modelos menos usados hasta quedar bajo el tamaño máximo; devuelve cuántos."""
+        total = sum(entrada["bytes"] for entrada in self.indice.values())
+        eliminados = 0
+        for huella, entrada in sorted(self.indice.items(), key=lambda item: item[1]["ultimo_uso"]):
+            if total <= self.max_bytes:
+                break
+            try:
+                (self.directorio / entrada["archivo"]).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError:
+                continue
+            del self.indice[huella]
+            total -= entrada["bytes"]
+            eliminados += 1
+        return eliminados
+
+    def guardar(self):
+        """Aplica el desalojo y escribe el índice (reemplazo atómico)."""
+        eliminados = self.evict()
+        tmp = self.directorio / f"{INDICE}.{os.getpid()}.tmp"
+        tmp.write_text(json.dumps(self.indice, ensure_ascii=False, indent=1), encoding="utf-8")
+        os.replace(tmp, self.directorio / INDICE)
+        return eliminados
+
+    def clear(self):
+        for ruta in self.directorio.glob("*.joblib"):
+            try:
+                ruta.unlink()
+            except OSError:
+                pass
+        self.indice = {}
+        self.guardar()
@@ -0,0 +1,27 @@
+# Lectura única de la tabla analítica Hechos_Analitica: el join en estrella de los
+# hechos con sus dimensiones, materializado a grano mensual al final de cada carga.
+# La usan tanto las predicciones como los gráficos de análisis.
+import pandas as pd
+
+try:
+    from notebooks.consultas import COLUMNAS_ANALITICA, HECHOS_ANALITICA
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from consultas import COLUMNAS_ANALITICA, HECHOS_ANALITICA
+
+
+def leer_hechos_analitica(engine, columnas=COLUMNAS_ANALITICA):
+    """
+    Lee de Hechos_Analitica solo las columnas pedidas, ordenadas por serie
+    vehículo/tipo/mes. Mes se devuelve como fecha y los costos como números.
+    """
+    desconocidas = [columna for columna in columnas if columna not in COLUMNAS_ANALITICA]
+    if desconocidas:
+        raise ValueError(f"Columnas que no existen en Hechos_Analitica: {', '.join(desconocidas)}")
+
+    df = pd.read_sql(HECHOS_ANALITICA.format(columnas=", ".join(columnas)), engine)
+    if 'Mes' in df.columns:
+        df['Mes'] = pd.to_datetime(df['Mes'])
+    for columna in ('Costo', 'CostoPositivo'):
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors='coerce')
+    return df
@@ -0,0 +1,273 @@
+# Benchmark reproducible de la carga a staging con libros sintéticos
+import argparse
+import json
+import os
+import platform
+import random
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from openpyxl import Workbook
+
+try:
+    from notebooks.carga_archivo_script import (
+        DEFAULT_BATCH_SIZE, DEFAULT_DB_WRITERS, DEFAULT_QUEUE_SIZE, plan_ingestion, run_ingestion,
+    )
+    from notebooks.lectura_excel import HEADER_ROW
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from carga_archivo_script import (
+        DEFAULT_BATCH_SIZE, DEFAULT_DB_WRITERS, DEFAULT_QUEUE_SIZE, plan_ingestion, run_ingestion,
+    )
+    from lectura_excel import HEADER_ROW
+
+# Encabezados de la fila 8 en el mismo orden que los libros reales (15 columnas)
+HEADERS = [
+    "Código contable", "NOMBRE DEL VEHICULO", "Comprobante", "Secuencia", "Fecha elaboración",
+    "Identificación", "Nombre del tercero", "Descripción", "Débito", "CORRECTIVO", "PREVENTIVO",
+    "TIPO_MANTENIMIENTO", "CATEGORIA", "MATRICULA ", "TIPO_MATRICULA",
+]
+
+CATEGORIAS = ["TRANSPORTE PESADO", "TRANSPORTE LIVIANO", "MAQUINARIA AMARILLA"]
+DESCRIPCIONES = ["CAMBIO DE ACEITE", "COMPRA DE LLANTAS", "REPARACIÓN DE FRENOS", "ALINEACIÓN Y BALANCEO",
+                 "MANTENIMIENTO GENERAL", "COMPRA DE FILTROS"]
+
+# Tablas mínimas que usa la carga, en la sintaxis de SQLite
+SQLITE_SCHEMA = """
+CREATE TABLE STG_Mantenimientos (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    Codigo_contable TEXT, NombreVehiculo TEXT, Comprobante TEXT, Secuencia TEXT, FechaElaboracion TIMESTAMP,
+    IdentificacionTercero TEXT, NombreTercero TEXT, Descripcion TEXT, Debito REAL, TipoMantenimiento TEXT,
+    Categoria TEXT, Matricula TEXT, TipoMatricula TEXT, FechaCarga TIMESTAMP, ArchivoHash TEXT,
+    HashFila INTEGER NOT NULL UNIQUE, FechaDia DATE
+);
+CREATE TABLE STG_Archivo_Filas (
+    ArchivoHash TEXT NOT NULL, HashFila INTEGER NOT NULL, PRIMARY KEY (ArchivoHash, HashFila)
+);
+CREATE TABLE Ingesta_Manifiesto (
+    HashContenido TEXT PRIMARY KEY, RutaArchivo TEXT NOT NULL, TamanoBytes INTEGER, Registros INTEGER,
+    FechaCarga TIMESTAMP
+);
+"""
+
+
+def generate_workbooks(output_dir, vehiculos=8, anios=(2023, 2024), filas_por_archivo=500, seed=42):
+    """
+    Genera un libro por vehículo y año con la misma estructura que process_file espera:
+    títulos en las primeras filas, encabezado en la fila 8 y 15 columnas.
+    Devuelve la lista de rutas creadas.
+    """
+    rnd = random.Random(seed)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    rutas = []
+    for v in range(vehiculos):
+        placa = f"SYN{v:03d}"
+        nombre = f"VEHICULO SINTETICO {placa}"
+        categoria = CATEGORIAS[v % len(CATEGORIAS)]
+        for anio in anios:
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet()
+            ws.append([])
+            ws.append([f"Mantenimientos {nombre}"])
+            ws.append(["TRANSPORTE, CONSTRUCCIÓN Y LOGÍSTICA S.A.S"])
+            ws.append(["901514628-1"])
+            ws.append([f"De Enero 01 {anio} a Diciembre 31 {anio}"])
+            for _ in range(HEADER_ROW - 5):
+                ws.append([])
+            ws.append(HEADERS)
+            inicio_anio = date(anio, 1, 1)
+            for i in range(filas_por_archivo):
+                fecha = inicio_anio + timedelta(days=rnd.randrange(365))
+                tipo = "CORRECTIVO" if rnd.random() < 0.6 else "PREVENTIVO"
+                tercero = rnd.randrange(1000, 1050)
+                ws.append([
+                    "52450207", nombre, f"DS-1-{i + 1}", "1", fecha.strftime("%d/%m/%Y"),
+                    str(10_000_000 + tercero), f"TERCERO {tercero}", rnd.choice(DESCRIPCIONES),
+                    round(rnd.uniform(20_000, 3_000_000), 2),
+                    "X" if tipo == "CORRECTIVO" else None, "X" if tipo == "PREVENTIVO" else None,
+                    tipo, categoria, placa, "PLACA",
+                ])
+            ruta = output_dir / f"SINTETICO {placa} {anio}.xlsx"
+            wb.save(ruta)
+            rutas.append(str(ruta))
+    return rutas
+
+
+class _SQLiteCursor:
+    """Cursor que traduce el SQL de MySQL que usa la carga al dialecto de SQLite."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    @staticmethod
+    def _translate(sql):
+        sql = sql.replace("%s", "?").replace("NOW()", "CURRENT_TIMESTAMP")
+        if "ON DUPLICATE KEY UPDATE" in sql:
+            sql = sql.split("ON DUPLICATE KEY UPDATE")[0]
+            sql = re.sub(r"^\s*INSERT\s+INTO", "INSERT OR REPLACE INTO", sql, flags=re.IGNORECASE)
+        return re.sub(r"^\s*INSERT\s+IGNORE\s+INTO", "INSERT OR IGNORE INTO", sql, flags=re.IGNORECASE)
+
+    def execute(self, sql, params=()):
+        return self._cursor.execute(self._translate(sql), params)
+
+    def executemany(self, sql, rows):
+        return self._cursor.executemany(self._translate(sql), rows)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteStandIn:
+    """
+    Sustituto local de MySQL para el benchmark: una base SQLite en disco con las
+    tablas de staging. Cada llamada devuelve una conexión nueva, como un pool.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with sqlite3.connect(self.path) as conn:
+            conn.executescript(SQLITE_SCHEMA)
+
+    def __call__(self):
+        return _SQLiteConnection(sqlite3.connect(self.path, timeout=60))
+
+    def count(self, table):
+        with sqlite3.connect(self.path) as conn:
+            return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class _SQLiteConnection:
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _SQLiteCursor(self._conn.cursor())
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def _peak_rss_mb(who):
+    # En Linux ru_maxrss está en KB; en macOS, en bytes
+    maxrss = resource.getrusage(who).ru_maxrss
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return maxrss / divisor
+
+
+def _git_version():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=Path(__file__).resolve().parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(work_dir, vehiculos, anios, filas_por_archivo, batch_size, parse_workers, db_writers,
+                  queue_size, excel_engine=None, seed=42):
+    """Genera los libros, ejecuta la carga completa contra SQLite y devuelve las métricas."""
+    work_dir = Path(work_dir)
+    input_dir = work_dir / "input_files"
+
+    inicio = time.perf_counter()
+    file_paths = generate_workbooks(input_dir, vehiculos, anios, filas_por_archivo, seed)
+    segundos_generacion = time.perf_counter() - inicio
+
+    db = SQLiteStandIn(work_dir / "staging.sqlite")
+    por_cargar, _, _ = plan_ingestion(input_dir, sorted(file_paths), {})
+
+    inicio = time.perf_counter()
+    results = run_ingestion(por_cargar, db, batch_size=batch_size, excel_engine=excel_engine, cache=None,
+                            parse_workers=parse_workers, db_writers=db_writers, queue_size=queue_size)
+    segundos_carga = time.perf_counter() - inicio
+
+    registros = sum(res["registros"] for res in results)
+    etapas = {etapa: sum(res["tiempos"][etapa] for res in results) for etapa in ("lectura", "normalizacion", "escritura")}
+    errores = [f"{res['archivo']}: {res['mensaje']}" for res in results if not res["cumple"] or res["mensaje"]]
+
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "parametros": {
+            "vehiculos": vehiculos, "anios": list(anios), "filas_por_archivo": filas_por_archivo,
+            "batch_size": batch_size, "parse_workers": parse_workers, "db_writers": db_writers,
+            "queue_size": queue_size, "excel_engine": excel_engine or "auto", "seed": seed,
+        },
+        "archivos": len(file_paths),
+        "registros": registros,
+        "registros_en_staging": db.count("STG_Mantenimientos"),
+        "segundos_generacion": round(segundos_generacion, 3),
+        "segundos_carga": round(segundos_carga, 3),
+        "filas_por_segundo": round(registros / segundos_carga, 1) if segundos_carga > 0 else 0.0,
+        # Tiempos de etapa sumados sobre todos los archivos (trabajo total, no tiempo de reloj)
+        "segundos_por_etapa": {etapa: round(valor, 3) for etapa, valor in etapas.items()},
+        "pico_rss_mb": round(_peak_rss_mb(resource.RUSAGE_SELF), 1),
+        "pico_rss_procesos_lectura_mb": round(_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+        "errores": errores,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de la carga a staging con libros sintéticos.')
+    parser.add_argument('--vehiculos', type=int, default=8, help='Vehículos (un libro por vehículo y año).')
+    parser.add_argument('--anios', type=int, nargs='+', default=[2023, 2024], help='Años a generar.')
+    parser.add_argument('--filas', type=int, default=500, help='Filas por libro.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Filas por lote de INSERT.')
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1, help='Procesos de lectura.')
+    parser.add_argument('--db-writers', type=int, default=DEFAULT_DB_WRITERS, help='Hilos escritores.')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE, help='Tamaño de la cola entre etapas.')
+    parser.add_argument('--excel-engine', default=None, help='Motor de lectura de Excel (por defecto auto).')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla de los datos sintéticos.')
+    parser.add_argument('--work-dir', default=None, help='Carpeta de trabajo (por defecto, una temporal).')
+    parser.add_argument('--output', default='output/benchmarks/carga.json', help='Archivo JSON de resultados.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    with tempfile.TemporaryDirectory(prefix="bench_carga_") as tmp:
+        work_dir = args.work_dir or tmp
+        resultado = run_benchmark(work_dir, args.vehiculos, args.anios, args.filas, args.batch_size,
+                                  args.parse_workers, args.db_writers, args.queue_size, args.excel_engine, args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"\n--- Benchmark de carga ---")
+    print(f"Archivos: {resultado['archivos']}, registros: {resultado['registros']} "
+          f"(en staging: {resultado['registros_en_staging']})")
+    print(f"Carga: {resultado['segundos_carga']:.2f} s, {resultado['filas_por_segundo']:,.0f} filas/s")
+    for etapa, segundos in resultado["segundos_por_etapa"].items():
+        print(f"  {etapa}: {segundos:.2f} s")
+    print(f"Pico RSS: {resultado['pico_rss_mb']} MB (procesos de lectura: {resultado['pico_rss_procesos_lectura_mb']} MB)")
+    if resultado["errores"]:
+        print("Errores:", *resultado["errores"], sep="\n  ")
+    print(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
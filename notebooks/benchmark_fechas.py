@@ -0,0 +1,366 @@
+# Benchmark de la unión staging -> Dim_Tiempo: DATE(FechaElaboracion) frente a la
+# columna indexada FechaDia, sobre tablas sintéticas Bench_* de un millón de filas o más.
+# Por defecto en MySQL; con --sqlite, en una base SQLite local que no necesita servidor
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import sys
+import time
+from datetime import datetime
+
+import mysql.connector
+from dotenv import load_dotenv
+
+try:
+    from notebooks.benchmark_carga import _git_version
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from benchmark_carga import _git_version
+
+# Tablas de trabajo: mismas columnas e índices que intervienen en los procedimientos reales
+CREATE_TABLES_SQL = [
+    "DROP TABLE IF EXISTS Bench_STG",
+    "DROP TABLE IF EXISTS Bench_Dim_Tiempo",
+    "DROP TABLE IF EXISTS Bench_Digitos",
+    """
+    CREATE TABLE Bench_STG (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        FechaElaboracion DATETIME,
+        FechaDia DATE,
+        Debito DECIMAL(18, 2),
+        KEY idx_bench_fecha_dia (FechaDia)
+    ) ENGINE=InnoDB
+    """,
+    """
+    CREATE TABLE Bench_Dim_Tiempo (
+        TiempoKey INT AUTO_INCREMENT PRIMARY KEY,
+        Fecha DATE UNIQUE,
+        Anio INT,
+        Mes INT,
+        Dia INT
+    ) ENGINE=InnoDB
+    """,
+    "CREATE TABLE Bench_Digitos (d TINYINT PRIMARY KEY) ENGINE=InnoDB",
+    "INSERT INTO Bench_Digitos VALUES (0), (1), (2), (3), (4), (5), (6), (7), (8), (9)",
+]
+
+DROP_TABLES_SQL = ["DROP TABLE IF EXISTS Bench_STG", "DROP TABLE IF EXISTS Bench_Dim_Tiempo",
+                   "DROP TABLE IF EXISTS Bench_Digitos"]
+
+# Filas sintéticas a partir del producto de siete tablas de dígitos (hasta 10 millones).
+# FechaDia se escribe junto con la fila, como hace la carga real en prepare_rows.
+INSERT_STG_SQL = """
+INSERT INTO Bench_STG (FechaElaboracion, FechaDia, Debito)
+SELECT f.Fecha, DATE(f.Fecha), f.n MOD 3000000
+FROM (
+    SELECT n, %(inicio)s + INTERVAL (n MOD %(dias)s) DAY + INTERVAL (n MOD 86400) SECOND AS Fecha
+    FROM (
+        SELECT a.d + 10 * b.d + 100 * c.d + 1000 * e.d + 10000 * g.d + 100000 * h.d + 1000000 * i.d AS n
+        FROM Bench_Digitos a, Bench_Digitos b, Bench_Digitos c, Bench_Digitos e,
+             Bench_Digitos g, Bench_Digitos h, Bench_Digitos i
+    ) numeros
+    WHERE n < %(filas)s
+) f
+"""
+
+INSERT_DIM_TIEMPO_SQL = """
+INSERT INTO Bench_Dim_Tiempo (Fecha, Anio, Mes, Dia)
+SELECT f.FechaDia, YEAR(f.FechaDia), MONTH(f.FechaDia), DAY(f.FechaDia)
+FROM (SELECT DISTINCT FechaDia FROM Bench_STG WHERE FechaDia IS NOT NULL) f
+"""
+
+# Pares (antes, después) de cada operación de los procedimientos
+CASOS = {
+    "dim_tiempo_distinct": (
+        """
+        SELECT DISTINCT DATE(FechaElaboracion), YEAR(FechaElaboracion), MONTH(FechaElaboracion), DAY(FechaElaboracion)
+        FROM Bench_STG stg
+        WHERE stg.FechaElaboracion IS NOT NULL
+        """,
+        """
+        SELECT f.FechaDia, YEAR(f.FechaDia), MONTH(f.FechaDia), DAY(f.FechaDia)
+        FROM (SELECT DISTINCT FechaDia FROM Bench_STG WHERE FechaDia IS NOT NULL) f
+        """,
+    ),
+    "hechos_join_completo": (
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON DATE(stg.FechaElaboracion) = ti.Fecha
+        """,
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON stg.FechaDia = ti.Fecha
+        """,
+    ),
+    "hechos_join_anio": (
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON DATE(stg.FechaElaboracion) = ti.Fecha
+        WHERE YEAR(stg.FechaElaboracion) = %(anio)s
+        """,
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON stg.FechaDia = ti.Fecha
+        WHERE stg.FechaDia >= MAKEDATE(%(anio)s, 1) AND stg.FechaDia < MAKEDATE(%(anio)s + 1, 1)
+        """,
+    ),
+}
+
+# Mismas tablas, datos y pares de consultas en SQLite (--sqlite): date()/strftime() en
+# lugar de DATE()/YEAR() y el año como rango de fechas ISO
+CREATE_TABLES_SQLITE = [
+    "DROP TABLE IF EXISTS Bench_STG",
+    "DROP TABLE IF EXISTS Bench_Dim_Tiempo",
+    """
+    CREATE TABLE Bench_STG (
+        id INTEGER PRIMARY KEY,
+        FechaElaboracion TEXT,
+        FechaDia TEXT,
+        Debito REAL
+    )
+    """,
+    "CREATE INDEX idx_bench_fecha_dia ON Bench_STG (FechaDia)",
+    """
+    CREATE TABLE Bench_Dim_Tiempo (
+        TiempoKey INTEGER PRIMARY KEY,
+        Fecha TEXT UNIQUE,
+        Anio INTEGER,
+        Mes INTEGER,
+        Dia INTEGER
+    )
+    """,
+]
+
+INSERT_STG_SQLITE = """
+INSERT INTO Bench_STG (FechaElaboracion, FechaDia, Debito)
+WITH RECURSIVE numeros(n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM numeros WHERE n + 1 < :filas)
+SELECT f.Fecha, date(f.Fecha), f.n % 3000000
+FROM (
+    SELECT n, datetime(:inicio, '+' || (n % :dias) || ' days', '+' || (n % 86400) || ' seconds') AS Fecha
+    FROM numeros
+) f
+"""
+
+INSERT_DIM_TIEMPO_SQLITE = """
+INSERT INTO Bench_Dim_Tiempo (Fecha, Anio, Mes, Dia)
+SELECT f.FechaDia, CAST(strftime('%Y', f.FechaDia) AS INTEGER), CAST(strftime('%m', f.FechaDia) AS INTEGER),
+       CAST(strftime('%d', f.FechaDia) AS INTEGER)
+FROM (SELECT DISTINCT FechaDia FROM Bench_STG WHERE FechaDia IS NOT NULL) f
+"""
+
+CASOS_SQLITE = {
+    "dim_tiempo_distinct": (
+        """
+        SELECT DISTINCT date(FechaElaboracion), strftime('%Y', FechaElaboracion), strftime('%m', FechaElaboracion),
+               strftime('%d', FechaElaboracion)
+        FROM Bench_STG stg
+        WHERE stg.FechaElaboracion IS NOT NULL
+        """,
+        """
+        SELECT f.FechaDia, strftime('%Y', f.FechaDia), strftime('%m', f.FechaDia), strftime('%d', f.FechaDia)
+        FROM (SELECT DISTINCT FechaDia FROM Bench_STG WHERE FechaDia IS NOT NULL) f
+        """,
+    ),
+    "hechos_join_completo": (
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON date(stg.FechaElaboracion) = ti.Fecha
+        """,
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON stg.FechaDia = ti.Fecha
+        """,
+    ),
+    "hechos_join_anio": (
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON date(stg.FechaElaboracion) = ti.Fecha
+        WHERE CAST(strftime('%Y', stg.FechaElaboracion) AS INTEGER) = :anio
+        """,
+        """
+        SELECT COUNT(*), SUM(ti.TiempoKey)
+        FROM Bench_STG stg
+        JOIN Bench_Dim_Tiempo ti ON stg.FechaDia = ti.Fecha
+        WHERE stg.FechaDia >= :desde AND stg.FechaDia < :hasta
+        """,
+    ),
+}
+
+
+def prepare_tables(conn, filas, dias, inicio):
+    """Crea las tablas Bench_* y genera las filas de staging y el calendario."""
+    cursor = conn.cursor()
+    try:
+        for sql in CREATE_TABLES_SQL:
+            cursor.execute(sql)
+        cursor.execute(INSERT_STG_SQL, {"inicio": inicio, "dias": dias, "filas": filas})
+        cursor.execute(INSERT_DIM_TIEMPO_SQL)
+        conn.commit()
+        cursor.execute("ANALYZE TABLE Bench_STG, Bench_Dim_Tiempo")
+        cursor.fetchall()
+        cursor.execute("SELECT COUNT(*) FROM Bench_STG")
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def time_query(conn, sql, params, repeticiones):
+    """Mediana de segundos de varias ejecuciones, el plan de ejecución y el resultado."""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"EXPLAIN {sql}", params)
+        plan = [{"table": paso.get("table"), "type": paso.get("type"), "key": paso.get("key"),
+                 "rows": paso.get("rows")} for paso in cursor.fetchall()]
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            cursor.execute(sql, params)
+            filas = cursor.fetchall()
+            tiempos.append(time.perf_counter() - inicio)
+        return {"segundos": round(statistics.median(tiempos), 4), "filas": len(filas), "plan": plan}
+    finally:
+        cursor.close()
+
+
+def prepare_tables_sqlite(conn, filas, dias, inicio):
+    """Versión SQLite de prepare_tables."""
+    for sql in CREATE_TABLES_SQLITE:
+        conn.execute(sql)
+    conn.execute(INSERT_STG_SQLITE, {"inicio": inicio, "dias": dias, "filas": filas})
+    conn.execute(INSERT_DIM_TIEMPO_SQLITE)
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn.execute("SELECT COUNT(*) FROM Bench_STG").fetchone()[0]
+
+
+def time_query_sqlite(conn, sql, params, repeticiones):
+    """Versión SQLite de time_query; el plan es el de EXPLAIN QUERY PLAN."""
+    plan = [{"table": None, "type": None, "key": None, "rows": None, "detalle": fila[-1]}
+            for fila in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()]
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        filas = conn.execute(sql, params).fetchall()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"segundos": round(statistics.median(tiempos), 4), "filas": len(filas), "plan": plan}
+
+
+def run_benchmark(conn, filas, dias, inicio, repeticiones, motor="mysql"):
+    if motor == "sqlite":
+        preparar, medir, casos_sql = prepare_tables_sqlite, time_query_sqlite, CASOS_SQLITE
+    else:
+        preparar, medir, casos_sql = prepare_tables, time_query, CASOS
+    inicio_generacion = time.perf_counter()
+    filas_staging = preparar(conn, filas, dias, inicio)
+    segundos_generacion = time.perf_counter() - inicio_generacion
+
+    anio = int(inicio[:4])
+    params = {"anio": anio, "desde": f"{anio}-01-01", "hasta": f"{anio + 1}-01-01"}
+    casos = {}
+    for nombre, (antes, despues) in casos_sql.items():
+        resultado_antes = medir(conn, antes, params, repeticiones)
+        resultado_despues = medir(conn, despues, params, repeticiones)
+        casos[nombre] = {
+            "antes": resultado_antes,
+            "despues": resultado_despues,
+            "aceleracion": (round(resultado_antes["segundos"] / resultado_despues["segundos"], 2)
+                            if resultado_despues["segundos"] > 0 else None),
+        }
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _git_version(),
+        "motor": motor,
+        "parametros": {"filas": filas, "dias": dias, "inicio": inicio, "repeticiones": repeticiones},
+        "filas_staging": filas_staging,
+        "segundos_generacion": round(segundos_generacion, 3),
+        "casos": casos,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark de la unión staging -> Dim_Tiempo con DATE() frente a FechaDia indexada.')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Filas sintéticas de staging (máx. 10 millones).')
+    parser.add_argument('--dias', type=int, default=3650, help='Fechas distintas a repartir entre las filas.')
+    parser.add_argument('--inicio', default='2015-01-01', help='Primera fecha generada (AAAA-MM-DD).')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Ejecuciones por consulta (se usa la mediana).')
+    parser.add_argument('--keep-tables', action='store_true', help='No elimina las tablas Bench_* al terminar.')
+    parser.add_argument('--sqlite', nargs='?', const=':memory:', default=None, metavar='ARCHIVO',
+                        help='Ejecuta el benchmark en SQLite (en memoria, o en ARCHIVO) en lugar de MySQL.')
+    parser.add_argument('--output', default='output/benchmarks/fechas.json', help='Archivo JSON de resultados.')
+    return parser.parse_args(argv)
+
+
+def run_mysql(args):
+    load_dotenv()
+    db_config = {
+        'host': os.getenv('DB_HOST'),
+        'port': os.getenv('DB_PORT'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME'),
+    }
+    if not all(db_config.values()):
+        print("Error: Faltan variables de entorno para la base de datos en el archivo .env", file=sys.stderr)
+        sys.exit(1)
+
+    conn = None
+    try:
+        conn = mysql.connector.connect(**db_config)
+        resultado = run_benchmark(conn, args.filas, args.dias, args.inicio, args.repeticiones)
+        if not args.keep_tables:
+            cursor = conn.cursor()
+            for sql in DROP_TABLES_SQL:
+                cursor.execute(sql)
+            cursor.close()
+    except mysql.connector.Error as e:
+        print(f"Error durante el benchmark: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if conn:
+            conn.close()
+    return resultado
+
+
+def run_sqlite(args):
+    conn = sqlite3.connect(args.sqlite)
+    try:
+        resultado = run_benchmark(conn, args.filas, args.dias, args.inicio, args.repeticiones, motor="sqlite")
+        if not args.keep_tables:
+            for sql in DROP_TABLES_SQL:
+                conn.execute(sql)
+    finally:
+        conn.close()
+    return resultado
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resultado = run_sqlite(args) if args.sqlite else run_mysql(args)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"\n--- Benchmark de fechas en staging ({resultado['motor']}) ---")
+    print(f"Filas en staging: {resultado['filas_staging']:,} (generadas en {resultado['segundos_generacion']:.1f} s)")
+    for nombre, caso in resultado["casos"].items():
+        print(f"{nombre}: antes {caso['antes']['segundos']:.3f} s, después {caso['despues']['segundos']:.3f} s "
+              f"(x{caso['aceleracion']})")
+        for momento in ("antes", "despues"):
+            pasos = ", ".join(paso.get("detalle") or f"{paso['table']} type={paso['type']} key={paso['key']}"
+                              for paso in caso[momento]["plan"])
+            print(f"  {momento}: {pasos}")
+    print(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
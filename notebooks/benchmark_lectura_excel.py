@@ -0,0 +1,61 @@
+# Compara los motores de lectura de Excel sobre los archivos de input_files
+import argparse
+import time
+import tracemalloc
+
+import pandas as pd
+
+try:
+    from notebooks.carga_archivo_script import resolve_input_dir
+    from notebooks.lectura_excel import available_engines, read_workbook
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from carga_archivo_script import resolve_input_dir
+    from lectura_excel import available_engines, read_workbook
+
+
+def _read_full_legacy(file_path):
+    """Lectura original de process_file: todas las columnas y luego selección con iloc."""
+    df = pd.read_excel(file_path, header=7)
+    return df.iloc[:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14]]
+
+
+def benchmark_engine(nombre, lector, file_paths, repeticiones):
+    """Devuelve (segundos por pasada, filas leídas, pico de memoria en MB)."""
+    mejores = []
+    filas = 0
+    pico = 0
+    for _ in range(repeticiones):
+        tracemalloc.start()
+        inicio = time.perf_counter()
+        filas = sum(len(lector(path)) for path in file_paths)
+        mejores.append(time.perf_counter() - inicio)
+        pico = max(pico, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return min(mejores), filas, pico / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de motores de lectura de Excel.')
+    parser.add_argument('--repeticiones', type=int, default=3, help='Pasadas por motor (se reporta la mejor).')
+    args = parser.parse_args()
+
+    input_dir = resolve_input_dir()
+    file_paths = [str(path) for path in sorted(input_dir.rglob('*.xlsx'))]
+    if not file_paths:
+        print(f"No se encontraron archivos Excel en la ruta: {input_dir}")
+        return
+
+    lectores = {"legacy (read_excel completo)": _read_full_legacy}
+    for engine in available_engines():
+        lectores[engine] = lambda path, engine=engine: read_workbook(path, engine=engine)
+
+    print(f"Leyendo {len(file_paths)} archivos de {input_dir} ({args.repeticiones} pasadas por motor)\n")
+    print(f"{'Motor':<30}{'Segundos':>10}{'Filas':>10}{'Filas/s':>12}{'Pico MB':>10}")
+    for nombre, lector in lectores.items():
+        segundos, filas, pico_mb = benchmark_engine(nombre, lector, file_paths, max(1, args.repeticiones))
+        velocidad = filas / segundos if segundos > 0 else 0.0
+        print(f"{nombre:<30}{segundos:>10.3f}{filas:>10}{velocidad:>12,.0f}{pico_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# Micro-benchmark de la agrupación mensual de predicciones: moda por grupo con
+# lambda x: x.mode()[0] frente a la agregación vectorizada de moda_por_grupo
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+try:
+    from notebooks.benchmark_carga import _git_version
+    from notebooks.predicciones_script import SERIES, resumir_por_mes
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from benchmark_carga import _git_version
+    from predicciones_script import SERIES, resumir_por_mes
+
+TIPOS = ["CORRECTIVO", "PREVENTIVO", "OTRO"]
+CATEGORIAS = ["TRANSPORTE PESADO", "TRANSPORTE LIVIANO", "MAQUINARIA AMARILLA"]
+TIPOS_MATRICULA = ["PARTICULAR", "PUBLICO", "OFICIAL"]
+
+
+def generate_facts(filas, vehiculos, meses, terceros, seed=42):
+    """Filas sintéticas con las columnas de Hechos_Analitica que usan los modelos (Registros = 1)."""
+    rng = np.random.default_rng(seed)
+    inicio = pd.Timestamp("2020-01-01")
+    return pd.DataFrame({
+        "NombreVehiculo": pd.Categorical.from_codes(rng.integers(0, vehiculos, filas),
+                                                    [f"VEHICULO {i:04d}" for i in range(vehiculos)]),
+        "TipoMantenimiento": pd.Categorical.from_codes(rng.integers(0, len(TIPOS), filas), TIPOS),
+        "Mes": pd.date_range(inicio, periods=meses, freq="MS")[rng.integers(0, meses, filas)],
+        "Categoria": np.array(CATEGORIAS, dtype=object)[rng.integers(0, len(CATEGORIAS), filas)],
+        "TipoMatricula": np.array(TIPOS_MATRICULA, dtype=object)[rng.integers(0, len(TIPOS_MATRICULA), filas)],
+        "IdentificacionTercero": np.array([f"{900000000 + i}" for i in range(terceros)],
+                                          dtype=object)[rng.integers(0, terceros, filas)],
+        "Costo": rng.integers(10_000, 5_000_000, filas).astype(float),
+        "Registros": 1,
+    })
+
+
+def resumir_con_lambda(df, claves, atributos):
+    """Agrupación mensual anterior: una llamada a Series.mode por grupo y columna."""
+    agregaciones = {"Costo": "sum", "Registros": "sum", **{columna: lambda x: x.mode()[0] for columna in atributos}}
+    return df.groupby(claves + ["Mes"], observed=True).agg(agregaciones)
+
+
+def _mediana(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos), 4), resultado
+
+
+def run_benchmark(filas, vehiculos, meses, terceros, repeticiones, seed):
+    df = generate_facts(filas, vehiculos, meses, terceros, seed)
+    casos = {}
+    for nivel, (claves, atributos, _) in SERIES.items():
+        segundos_antes, antes = _mediana(lambda: resumir_con_lambda(df, claves, atributos), repeticiones)
+        segundos_despues, despues = _mediana(lambda: resumir_por_mes(df, claves, atributos), repeticiones)
+        # Con Registros = 1 la moda ponderada coincide con Series.mode()[0]
+        despues = despues.set_index(claves + ["FechaElaboracion"])[atributos]
+        coinciden = bool((antes[atributos].to_numpy() == despues.to_numpy()).all())
+        casos[nivel] = {
+            "grupos": len(antes),
+            "antes": segundos_antes,
+            "despues": segundos_despues,
+            "aceleracion": round(segundos_antes / segundos_despues, 2) if segundos_despues > 0 else None,
+            "coinciden": coinciden,
+        }
+    return {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "version": _git_version(),
+        "parametros": {"filas": filas, "vehiculos": vehiculos, "meses": meses, "terceros": terceros,
+                       "repeticiones": repeticiones, "seed": seed},
+        "casos": casos,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Benchmark de la moda mensual por grupo: lambda x.mode()[0] frente a la versión vectorizada.')
+    parser.add_argument('--filas', type=int, default=1_000_000, help='Filas sintéticas de hechos.')
+    parser.add_argument('--vehiculos', type=int, default=200, help='Vehículos distintos.')
+    parser.add_argument('--meses', type=int, default=60, help='Meses distintos.')
+    parser.add_argument('--terceros', type=int, default=500, help='Terceros distintos.')
+    parser.add_argument('--repeticiones', type=int, default=1, help='Ejecuciones por caso (se usa la mediana).')
+    parser.add_argument('--seed', type=int, default=42, help='Semilla de los datos sintéticos.')
+    parser.add_argument('--output', default='output/benchmarks/moda.json', help='Archivo JSON de resultados.')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    resultado = run_benchmark(args.filas, args.vehiculos, args.meses, args.terceros, args.repeticiones, args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+
+    print(f"\n--- Benchmark de moda mensual ({args.filas:,} filas) ---")
+    for nivel, caso in resultado["casos"].items():
+        print(f"{nivel}: {caso['grupos']:,} grupos, antes {caso['antes']:.2f} s, después {caso['despues']:.2f} s "
+              f"(x{caso['aceleracion']}), resultados {'coinciden' if caso['coinciden'] else 'NO coinciden'}")
+    print(f"Resultados guardados en: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+# Bloqueo con nombre de MySQL (GET_LOCK): una sola ejecución a la vez aunque haya
+# varios procesos (réplicas de la app, pipeline.py y los scripts de carga por línea de
+# comandos). Se libera solo si la conexión se cae.
+# Estas funciones trabajan sobre una conexión DB-API (mysql.connector o
+# engine.raw_connection); el bloqueo queda retenido por la sesión de esa conexión.
+
+PIPELINE_LOCK_NAME = "pipeline_mantenimientos"
+DEFAULT_LOCK_TIMEOUT = 3600
+
+
+def adquirir_bloqueo(conn, timeout=DEFAULT_LOCK_TIMEOUT):
+    """Espera hasta timeout segundos el bloqueo del pipeline; True si se obtuvo."""
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (PIPELINE_LOCK_NAME, timeout))
+        return cursor.fetchone()[0] == 1
+    finally:
+        cursor.close()
+
+
+def liberar_bloqueo(conn):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (PIPELINE_LOCK_NAME,))
+        cursor.fetchone()
+    finally:
+        cursor.close()
@@ -1,9 +1,33 @@
+import io
 import pandas as pd
 import mysql.connector
 import os
+import sys
+import time
+import hashlib
+import queue
+import argparse
+import threading
 import concurrent.futures
+import functools
+import mysql.connector.pooling
 from pathlib import Path
 
+try:
+    from notebooks.bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, adquirir_bloqueo
+    from notebooks.lectura_excel import (
+        DEFAULT_CACHE_MAX_MB, DEFAULT_CHUNK_SIZE, ENGINES, FormatoArchivoError, WorkbookCache,
+        default_cache_dir, estimate_data_rows, iter_workbook_chunks, normalize_frame, parquet_available,
+        read_workbook_normalized, row_hash,
+    )
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, adquirir_bloqueo
+    from lectura_excel import (
+        DEFAULT_CACHE_MAX_MB, DEFAULT_CHUNK_SIZE, ENGINES, FormatoArchivoError, WorkbookCache,
+        default_cache_dir, estimate_data_rows, iter_workbook_chunks, normalize_frame, parquet_available,
+        read_workbook_normalized, row_hash,
+    )
+
 # Configuración de la conexión a la base de datos MySQL
 DB_CONFIG = {
     "host": "roundhouse.proxy.rlwy.net",
@@ -13,6 +37,38 @@ DB_CONFIG = {
     "database": "railway"
 }
 
+# Tamaño por defecto de cada lote de INSERT multi-fila
+DEFAULT_BATCH_SIZE = 1000
+# Hilos escritores (y conexiones del pool) y libros leídos que pueden esperar en cola
+DEFAULT_DB_WRITERS = 2
+DEFAULT_QUEUE_SIZE = 4
+
+# Las filas repetidas (misma HashFila) se descartan en el servidor, sin excepciones por fila
+INSERT_STG_SQL = """
+INSERT IGNORE INTO STG_Mantenimientos 
+(Codigo_contable, NombreVehiculo, Comprobante, Secuencia, FechaElaboracion, 
+ IdentificacionTercero, NombreTercero, Descripcion, Debito, TipoMantenimiento, Categoria, Matricula, TipoMatricula,
+ ArchivoHash, HashFila, FechaDia) 
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# Vínculo de cada fila con el archivo que la trae, aunque la fila ya estuviera en staging
+# por otro archivo: la purga de un archivo solo borra las filas que nadie más contiene
+INSERT_ARCHIVO_FILAS_SQL = """
+INSERT IGNORE INTO STG_Archivo_Filas (ArchivoHash, HashFila) VALUES (%s, %s)
+"""
+
+INSERT_MANIFIESTO_SQL = """
+INSERT INTO Ingesta_Manifiesto (HashContenido, RutaArchivo, TamanoBytes, Registros, FechaCarga)
+VALUES (%s, %s, %s, %s, NOW())
+ON DUPLICATE KEY UPDATE
+    RutaArchivo = VALUES(RutaArchivo),
+    TamanoBytes = VALUES(TamanoBytes),
+    Registros = VALUES(Registros),
+    FechaCarga = VALUES(FechaCarga),
+    HechosCargados = 0
+"""
+
 def resolve_input_dir():
     """Resolve the location of the input_files folder for different deployments."""
     env_dir = os.getenv("INPUT_FILES_DIR")
@@ -50,111 +106,619 @@ def resolve_input_dir():
     return final_candidates[0]
 
 
-def process_file(file_path):
-    """Procesa un único archivo Excel y lo carga en la base de datos."""
-    archivo = os.path.basename(file_path)
-    resumen = {"archivo": archivo, "cumple": False, "registros": 0, "mensaje": ""}
-    conn = None
-    cursor = None
+def file_sha256(file_path, block_size=1024 * 1024):
+    """Hash SHA-256 del contenido del archivo, leído por bloques."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for bloque in iter(lambda: f.read(block_size), b""):
+            digest.update(bloque)
+    return digest.hexdigest()
 
-    try:
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
 
-        print(f"Procesando archivo en hilo: {archivo}")
-        df = pd.read_excel(file_path, header=7)
+def _frame_to_rows(df):
+    """Convierte el DataFrame en tuplas con tipos nativos de Python (NaN/NaT -> None)."""
+    df = df.copy()
+    # mysql-connector no sabe convertir pandas.Timestamp, solo datetime.datetime
+    for col in df.select_dtypes(include="datetime").columns:
+        df[col] = pd.Series(df[col].dt.to_pydatetime(), index=df.index, dtype=object)
+    df = df.astype(object).where(df.notna(), None)
+    return list(df.itertuples(index=False, name=None))
+
+
+def prepare_rows(df, archivo_hash):
+    """
+    Añade ArchivoHash, la clave natural HashFila y FechaDia (la fecha sin hora, para
+    que los procedimientos unan con Dim_Tiempo sin aplicar DATE() en cada fila) y
+    descarta de una vez las filas repetidas dentro del propio DataFrame.
+    Devuelve (filas, duplicados_descartados).
+    """
+    df = df.assign(ArchivoHash=archivo_hash, HashFila=row_hash(df), FechaDia=df["FechaElaboracion"].dt.date)
+    repetidas = df["HashFila"].duplicated()
+    return _frame_to_rows(df[~repetidas]), int(repetidas.sum())
+
+
+def insert_rows(cursor, rows, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Inserta las filas en lotes con INSERT IGNORE + executemany dentro de la transacción
+    abierta. Devuelve (insertados, duplicados): las filas cuya HashFila ya existía en
+    staging no se insertan y se cuentan como duplicadas a partir del rowcount de cada
+    lote, pero igual quedan vinculadas al archivo en STG_Archivo_Filas.
+    No hace commit: el llamador confirma una sola vez por archivo.
+    """
+    insertados = 0
+    for inicio in range(0, len(rows), batch_size):
+        lote = rows[inicio:inicio + batch_size]
+        cursor.executemany(INSERT_STG_SQL, lote)
+        insertados += max(cursor.rowcount, 0)
+        # ArchivoHash y HashFila son las columnas 14 y 15 de INSERT_STG_SQL
+        cursor.executemany(INSERT_ARCHIVO_FILAS_SQL, [(fila[13], fila[14]) for fila in lote])
+    return insertados, len(rows) - insertados
 
-        if df.shape[1] < 15:
-            resumen["mensaje"] = "No cumple con la cantidad requerida de columnas."
-            return resumen
 
-        df = df.iloc[:, [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14]]
-        df.columns = [
-            "Codigo_contable", "NombreVehiculo", "Comprobante", "Secuencia", "FechaElaboracion",
-            "IdentificacionTercero", "NombreTercero", "Descripcion", "Debito", "TipoMantenimiento",
-            "Categoria", "Matricula", "TipoMatricula"
-        ]
+def _nuevo_resumen(archivo):
+    return {"archivo": archivo, "cumple": False, "omitido": False, "registros": 0, "mensaje": "", "aviso": "",
+            "segundos": 0.0, "duplicados": 0, "rechazados": None, "df": None,
+            "tiempos": {"lectura": 0.0, "normalizacion": 0.0, "escritura": 0.0}}
+
+
+def parse_file(file_path, archivo=None, excel_engine=None, cache=None):
+    """
+    Etapa de lectura: lee y normaliza un libro sin tocar la base de datos.
+    Se ejecuta en un proceso del pool de lectura, por lo que solo devuelve datos
+    serializables: el resumen del archivo con el DataFrame listo para insertar. No
+    imprime: la salida de los procesos hijos no llegaría a la del llamador.
+    """
+    archivo = archivo or os.path.basename(file_path)
+    resumen = _nuevo_resumen(archivo)
+    tiempos = resumen["tiempos"]
+    inicio = time.perf_counter()
+    try:
+        # Toda la conversión de tipos se hace por columnas antes de tocar la base de datos
+        df, rechazados, aviso = read_workbook_normalized(file_path, cache=cache, engine=excel_engine, tiempos=tiempos)
+        resumen["aviso"] = aviso or ""
+        if not rechazados.empty:
+            rechazados.insert(0, "Archivo", archivo)
+            resumen["rechazados"] = rechazados
 
         resumen["cumple"] = True
-        registros_insertados = 0
+        resumen["df"] = df
+    except FormatoArchivoError as e:
+        resumen["mensaje"] = str(e)
+    except Exception as e:
+        resumen["mensaje"] = f"Error crítico al leer: {e}"
+    finally:
+        resumen["segundos"] = time.perf_counter() - inicio
+    return resumen
 
-        for _, row in df.iterrows():
-            try:
-                fecha_elaboracion = pd.to_datetime(row['FechaElaboracion'], dayfirst=True).strftime('%Y-%m-%d') if pd.notnull(row['FechaElaboracion']) else None
-                
-                sql = """
-                INSERT INTO STG_Mantenimientos 
-                (Codigo_contable, NombreVehiculo, Comprobante, Secuencia, FechaElaboracion, 
-                 IdentificacionTercero, NombreTercero, Descripcion, Debito, TipoMantenimiento, Categoria, Matricula, TipoMatricula) 
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """
-                val = (
-                    row['Codigo_contable'], row['NombreVehiculo'], row['Comprobante'], row['Secuencia'],
-                    fecha_elaboracion, row['IdentificacionTercero'], row['NombreTercero'], row['Descripcion'],
-                    row['Debito'], row['TipoMantenimiento'], row['Categoria'], row['Matricula'], row['TipoMatricula']
-                )
-                cursor.execute(sql, val)
-                conn.commit()
-                registros_insertados += 1
-            except mysql.connector.IntegrityError as e:
-                if "Duplicate entry" not in str(e):
-                    conn.rollback()
-            except Exception:
-                conn.rollback()
-
-        resumen["registros"] = registros_insertados
+
+def write_parsed(conn, resumen, archivo_hash, file_size, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Etapa de escritura: inserta el DataFrame ya normalizado en una sola transacción.
+    En la misma transacción se registra el archivo en Ingesta_Manifiesto, de modo que
+    un archivo queda marcado como cargado solo si todas sus filas se confirmaron.
+    """
+    df = resumen.pop("df", None)
+    if not resumen["cumple"] or df is None:
         return resumen
 
+    inicio = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        rows, resumen["duplicados"] = prepare_rows(df, archivo_hash)
+        resumen["registros"], duplicados = insert_rows(cursor, rows, batch_size)
+        resumen["duplicados"] += duplicados
+        cursor.execute(INSERT_MANIFIESTO_SQL, (archivo_hash, resumen["archivo"], file_size, resumen["registros"]))
+        conn.commit()
     except Exception as e:
+        conn.rollback()
+        resumen["registros"] = 0
+        resumen["mensaje"] = f"Error al insertar, archivo revertido: {e}"
+    finally:
+        cursor.close()
+        resumen["tiempos"]["escritura"] = time.perf_counter() - inicio
+        resumen["segundos"] += resumen["tiempos"]["escritura"]
+    return resumen
+
+
+def process_file(file_path, batch_size=DEFAULT_BATCH_SIZE, archivo_hash=None, archivo=None, excel_engine=None,
+                 cache=None):
+    """Procesa un único archivo Excel (lectura y escritura) con su propia conexión."""
+    archivo_hash = archivo_hash or file_sha256(file_path)
+    print(f"Leyendo archivo: {archivo or os.path.basename(file_path)}", flush=True)
+    resumen = parse_file(file_path, archivo, excel_engine, cache)
+    if not resumen["cumple"]:
+        resumen.pop("df", None)
+        return resumen
+    conn = None
+    try:
+        conn = mysql.connector.connect(**DB_CONFIG)
+        return write_parsed(conn, resumen, archivo_hash, os.path.getsize(file_path), batch_size)
+    except mysql.connector.Error as e:
+        resumen.pop("df", None)
         resumen["mensaje"] = f"Error crítico: {e}"
         return resumen
     finally:
-        if cursor: cursor.close()
         if conn: conn.close()
 
-def main():
-    # Limpiar la tabla STG_Mantenimientos una sola vez al inicio
+
+def load_file_chunked(conn, source, archivo, archivo_hash, file_size, chunk_size=DEFAULT_CHUNK_SIZE,
+                      batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    """
+    Modo por bloques para libros muy grandes: lee, normaliza y escribe chunk_size filas
+    a la vez, de modo que la memoria máxima no depende del tamaño del archivo. Todo el
+    archivo sigue siendo una sola transacción (incluida cualquier operación pendiente
+    en `conn`). Tras cada bloque se llama on_progress(archivo, filas_leidas, total_estimado);
+    el total puede ser None si el libro no declara sus dimensiones.
+    La caché Parquet no se usa en este modo porque obligaría a materializar el libro.
+    """
+    resumen = _nuevo_resumen(archivo)
+    tiempos = resumen["tiempos"]
+    inicio = time.perf_counter()
+    total = estimate_data_rows(source)
+    leidas = 0
+    fecha_formato = None
+    rechazos = []
+    cursor = conn.cursor()
     try:
-        with mysql.connector.connect(**DB_CONFIG) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("DELETE FROM STG_Mantenimientos")
-                conn.commit()
-                print("Datos anteriores eliminados de la tabla STG_Mantenimientos.")
-    except mysql.connector.Error as err:
-        print(f"Error de MySQL al limpiar la tabla: {err}")
-        return
+        chunks = iter_workbook_chunks(source, chunk_size)
+        while True:
+            t0 = time.perf_counter()
+            chunk = next(chunks, None)
+            tiempos["lectura"] += time.perf_counter() - t0
+            if chunk is None:
+                break
+
+            t0 = time.perf_counter()
+            # El formato de fecha se infiere en el primer bloque y se reutiliza en el resto
+            df, rechazados, fecha_formato = normalize_frame(chunk, fecha_formato)
+            tiempos["normalizacion"] += time.perf_counter() - t0
+            if not rechazados.empty:
+                rechazados.insert(0, "Archivo", archivo)
+                rechazos.append(rechazados)
+
+            t0 = time.perf_counter()
+            rows, repetidas = prepare_rows(df, archivo_hash)
+            insertados, duplicados = insert_rows(cursor, rows, batch_size)
+            resumen["registros"] += insertados
+            resumen["duplicados"] += repetidas + duplicados
+            tiempos["escritura"] += time.perf_counter() - t0
+
+            leidas += len(chunk)
+            if on_progress:
+                on_progress(archivo, leidas, total)
+
+        t0 = time.perf_counter()
+        cursor.execute(INSERT_MANIFIESTO_SQL, (archivo_hash, archivo, file_size, resumen["registros"]))
+        conn.commit()
+        tiempos["escritura"] += time.perf_counter() - t0
+        resumen["cumple"] = True
+    except FormatoArchivoError as e:
+        conn.rollback()
+        resumen["registros"] = 0
+        resumen["mensaje"] = str(e)
+    except Exception as e:
+        conn.rollback()
+        resumen["registros"] = 0
+        resumen["mensaje"] = f"Error al insertar, archivo revertido: {e}"
+    finally:
+        cursor.close()
+        resumen["segundos"] = time.perf_counter() - inicio
+    if rechazos:
+        resumen["rechazados"] = pd.concat(rechazos, ignore_index=True)
+    return resumen
+
+
+def ingest_buffer(conn, data, archivo, batch_size=DEFAULT_BATCH_SIZE, excel_engine=None, chunk_size=None,
+                  on_progress=None):
+    """
+    Carga en staging un libro recibido en memoria (p. ej. desde la página de subida)
+    sin volver a leerlo del disco. `archivo` es la ruta relativa a input_files con la
+    que se registra en el manifiesto, para que la siguiente carga completa lo omita.
+    Si en esa ruta había una versión anterior del libro, sus filas se reemplazan en la
+    misma transacción y, tras confirmarla, se publica Hechos_Analitica una sola vez.
+    Con chunk_size se usa el modo por bloques (ver load_file_chunked).
+    """
+    contenido_hash = hashlib.sha256(data).hexdigest()
+    resumen = None
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT RutaArchivo FROM Ingesta_Manifiesto WHERE HashContenido = %s", (contenido_hash,))
+        existente = cursor.fetchone()
+        if existente:
+            return _resumen_omitido(archivo, f"Ya cargado como {existente[0]}, omitido.")
+
+        if not chunk_size:
+            resumen = parse_file(io.BytesIO(data), archivo, excel_engine)
+            if not resumen["cumple"]:
+                resumen.pop("df", None)
+                return resumen
+
+        cursor.execute("SELECT HashContenido FROM Ingesta_Manifiesto WHERE RutaArchivo = %s", (archivo,))
+        anteriores = [row[0] for row in cursor.fetchall()]
+        if anteriores:
+            purge_hashes(conn, cursor, anteriores, commit=False)
+    finally:
+        cursor.close()
+
+    if chunk_size:
+        resumen = load_file_chunked(conn, io.BytesIO(data), archivo, contenido_hash, len(data), chunk_size,
+                                    batch_size, on_progress)
+    else:
+        resumen = write_parsed(conn, resumen, contenido_hash, len(data), batch_size)
+    if anteriores:
+        refresh_analytics(conn)
+    return resumen
+
+
+def run_chunked_ingestion(por_cargar, get_connection, chunk_size=DEFAULT_CHUNK_SIZE, batch_size=DEFAULT_BATCH_SIZE,
+                          db_writers=DEFAULT_DB_WRITERS, on_progress=None):
+    """Carga los archivos en modo por bloques, db_writers archivos a la vez con conexiones del pool."""
+
+    def _load(item):
+        path, relativa, contenido_hash = item
+        conn = None
+        try:
+            conn = get_connection()
+            return load_file_chunked(conn, path, relativa, contenido_hash, os.path.getsize(path), chunk_size,
+                                     batch_size, on_progress)
+        except Exception as e:
+            resumen = _nuevo_resumen(relativa)
+            resumen["mensaje"] = f"Error crítico: {e}"
+            return resumen
+        finally:
+            if conn: conn.close()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, db_writers)) as executor:
+        results = list(executor.map(_load, por_cargar))
+    for resumen in results:
+        resumen.pop("df", None)
+    return results
+
+
+def print_progress(archivo, leidas, total, salida=None):
+    if total:
+        print(f"  {archivo}: {leidas:,}/{total:,} filas ({min(leidas / total, 1):.0%})", flush=True, file=salida)
+    else:
+        print(f"  {archivo}: {leidas:,} filas", flush=True, file=salida)
+
+
+def create_connection_pool(size, pool_name="carga_stg"):
+    """Pool de conexiones compartido por los hilos escritores."""
+    pool = mysql.connector.pooling.MySQLConnectionPool(pool_name=pool_name, pool_size=size, **DB_CONFIG)
+    return pool.get_connection
+
+
+def run_ingestion(por_cargar, get_connection, batch_size=DEFAULT_BATCH_SIZE, excel_engine=None, cache=None,
+                  parse_workers=None, db_writers=DEFAULT_DB_WRITERS, queue_size=DEFAULT_QUEUE_SIZE, salida=None):
+    """
+    Carga los archivos con un pipeline productor/consumidor:
+
+    - Un pool de procesos lee y normaliza los libros en paralelo (trabajo de pandas
+      limitado por el GIL, que así escala con los núcleos).
+    - Unos pocos hilos escritores insertan en la base de datos usando conexiones
+      obtenidas de `get_connection` (normalmente un pool), sin abrir una por archivo.
+    - Entre ambas etapas hay una cola acotada: si los escritores van atrás, el hilo
+      principal deja de encolar y de enviar nuevos libros a leer (contrapresión), así
+      que en memoria hay como mucho parse_workers + queue_size libros leídos.
+
+    `por_cargar` es una lista de (ruta, ruta_relativa, hash). Devuelve los resúmenes.
+    El avance se escribe en `salida` (por defecto, la salida estándar).
+    """
+    parse_workers = max(1, parse_workers or os.cpu_count() or 1)
+    db_writers = max(1, db_writers)
+    cola = queue.Queue(maxsize=max(1, queue_size))
+    results = []
+
+    def _writer():
+        while True:
+            item = cola.get()
+            try:
+                if item is None:
+                    return
+                resumen, contenido_hash, file_size = item
+                if resumen["cumple"]:
+                    conn = None
+                    try:
+                        conn = get_connection()
+                        write_parsed(conn, resumen, contenido_hash, file_size, batch_size)
+                    except Exception as e:
+                        resumen["mensaje"] = f"Error crítico: {e}"
+                    finally:
+                        if conn: conn.close()
+                resumen.pop("df", None)
+                results.append(resumen)
+            finally:
+                cola.task_done()
+
+    writers = [threading.Thread(target=_writer, name=f"escritor-stg-{i}", daemon=True) for i in range(db_writers)]
+    for writer in writers:
+        writer.start()
+
+    try:
+        pendientes = iter(por_cargar)
+        en_curso = {}
+        with concurrent.futures.ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            while True:
+                while len(en_curso) < parse_workers:
+                    siguiente = next(pendientes, None)
+                    if siguiente is None:
+                        break
+                    path, relativa, contenido_hash = siguiente
+                    print(f"Leyendo archivo: {relativa}", file=salida, flush=True)
+                    future = executor.submit(parse_file, path, relativa, excel_engine, cache)
+                    en_curso[future] = (path, relativa, contenido_hash)
+                if not en_curso:
+                    break
+                listos, _ = concurrent.futures.wait(en_curso, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in listos:
+                    path, relativa, contenido_hash = en_curso.pop(future)
+                    try:
+                        resumen = future.result()
+                    except Exception as e:
+                        resumen = _nuevo_resumen(relativa)
+                        resumen["mensaje"] = f"Error crítico al leer: {e}"
+                    # Bloquea si la cola está llena: contrapresión hacia la etapa de lectura
+                    cola.put((resumen, contenido_hash, os.path.getsize(path)))
+    finally:
+        for _ in writers:
+            cola.put(None)
+        for writer in writers:
+            writer.join()
+
+    return results
+
+
+def _rows_per_second(registros, segundos):
+    return registros / segundos if segundos > 0 else 0.0
+
+
+def plan_ingestion(input_dir, file_paths, manifiesto):
+    """
+    Compara los archivos en disco con el manifiesto de ingesta.
+
+    Devuelve (por_cargar, omitidos, obsoletos):
+      - por_cargar: lista de (ruta, ruta_relativa, hash) con contenido nuevo o modificado.
+      - omitidos: resúmenes de archivos sin cambios o duplicados de otro archivo.
+      - obsoletos: hashes del manifiesto que ya no existen en disco (archivo
+        modificado o eliminado); sus filas deben salir de staging.
+    """
+    por_cargar, omitidos = [], []
+    vistos = {}
+    for path in file_paths:
+        relativa = Path(path).relative_to(input_dir).as_posix()
+        contenido_hash = file_sha256(path)
+        if contenido_hash in vistos:
+            omitidos.append(_resumen_omitido(relativa, f"Duplicado de {vistos[contenido_hash]}, omitido."))
+            continue
+        vistos[contenido_hash] = relativa
+        if contenido_hash in manifiesto:
+            omitidos.append(_resumen_omitido(relativa, "Sin cambios desde la última carga, omitido."))
+        else:
+            por_cargar.append((path, relativa, contenido_hash))
+
+    obsoletos = [h for h in manifiesto if h not in vistos]
+    return por_cargar, omitidos, obsoletos
+
+
+def _resumen_omitido(archivo, mensaje):
+    return {"archivo": archivo, "cumple": True, "omitido": True, "registros": 0, "mensaje": mensaje, "segundos": 0.0,
+            "duplicados": 0, "rechazados": None}
+
+
+def write_reject_report(results, output_dir):
+    """Escribe en un CSV las filas descartadas por la normalización. Devuelve la ruta o None."""
+    rechazos = [res["rechazados"] for res in results if res.get("rechazados") is not None]
+    if not rechazos:
+        return None
+    os.makedirs(output_dir, exist_ok=True)
+    ruta = os.path.join(output_dir, "rechazos_carga.csv")
+    pd.concat(rechazos, ignore_index=True).to_csv(ruta, index=False, encoding="utf-8-sig")
+    return ruta
+
+
+def load_manifest(cursor):
+    """Devuelve {hash: ruta} con los archivos registrados en Ingesta_Manifiesto."""
+    cursor.execute("SELECT HashContenido, RutaArchivo FROM Ingesta_Manifiesto")
+    return {contenido_hash: ruta for contenido_hash, ruta in cursor.fetchall()}
+
+
+def purge_hashes(conn, cursor, hashes, commit=True):
+    """
+    Elimina de hechos, staging y del manifiesto los archivos indicados. Las filas que
+    también trae otro archivo del manifiesto se conservan (ver sp_eliminar_hechos_archivo).
+    No refresca Hechos_Analitica: el llamador lo hace una vez con refresh_analytics.
+    """
+    for contenido_hash in hashes:
+        cursor.callproc("sp_eliminar_hechos_archivo", (contenido_hash,))
+        cursor.execute("DELETE FROM Ingesta_Manifiesto WHERE HashContenido = %s", (contenido_hash,))
+    if commit:
+        conn.commit()
+
+
+def refresh_analytics(conn):
+    """
+    Reconstruye Hechos_Analitica una sola vez tras purgar archivos, en su propia
+    transacción (fuera de la de carga, que puede ser larga).
+    """
+    with conn.cursor() as cursor:
+        cursor.callproc("sp_refrescar_hechos_analitica")
+    conn.commit()
+
+def build_cache(args, input_dir, salida=None):
+    """Crea la caché Parquet según las opciones de línea de comandos, o None si no aplica."""
+    if args.no_cache:
+        return None
+    if not parquet_available():
+        print("pyarrow no está instalado: se omite la caché Parquet de libros.", file=salida)
+        return None
+    cache = WorkbookCache(default_cache_dir(input_dir), max_bytes=args.cache_max_mb * 1024 * 1024)
+    if args.rebuild_cache:
+        cache.clear()
+        print(f"Caché de libros vaciada: {cache.cache_dir}", file=salida)
+    return cache
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Carga los archivos Excel de mantenimientos en STG_Mantenimientos.')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                        help=f'Filas por lote de INSERT (por defecto {DEFAULT_BATCH_SIZE}).')
+    parser.add_argument('--full-reload', action='store_true',
+                        help='Vacía staging y el manifiesto y vuelve a cargar todos los archivos.')
+    parser.add_argument('--excel-engine', choices=('auto',) + ENGINES, default='auto',
+                        help='Motor de lectura de Excel (auto usa calamine si está instalado).')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='No usa ni actualiza la caché Parquet de libros ya leídos.')
+    parser.add_argument('--rebuild-cache', action='store_true',
+                        help='Vacía la caché Parquet antes de cargar y la vuelve a generar.')
+    parser.add_argument('--cache-max-mb', type=int, default=DEFAULT_CACHE_MAX_MB,
+                        help=f'Tamaño máximo de la caché Parquet en MB (por defecto {DEFAULT_CACHE_MAX_MB}).')
+    parser.add_argument('--parse-workers', type=int, default=os.cpu_count() or 1,
+                        help='Procesos que leen y normalizan libros en paralelo (por defecto, uno por núcleo).')
+    parser.add_argument('--db-writers', type=int, default=DEFAULT_DB_WRITERS,
+                        help=f'Hilos escritores y tamaño del pool de conexiones (por defecto {DEFAULT_DB_WRITERS}).')
+    parser.add_argument('--queue-size', type=int, default=DEFAULT_QUEUE_SIZE,
+                        help=f'Libros leídos que pueden esperar a ser escritos (por defecto {DEFAULT_QUEUE_SIZE}).')
+    parser.add_argument('--chunk-size', type=int, default=None,
+                        help='Modo por bloques para libros muy grandes: lee, normaliza y escribe N filas a la vez '
+                             f'con memoria acotada (p. ej. {DEFAULT_CHUNK_SIZE}). Sin caché ni pool de procesos.')
+    parser.add_argument('--lock-timeout', type=int, default=DEFAULT_LOCK_TIMEOUT,
+                        help='Por línea de comandos, segundos que se espera a que termine otra ejecución del '
+                             f'pipeline o de una carga (por defecto {DEFAULT_LOCK_TIMEOUT}).')
+    return parser.parse_args(argv)
+
+
+def main(argv=None, get_connection=None, salida=None, refrescar_analitica=True):
+    """
+    Carga los archivos de input_files en staging e imprime el resumen en `salida`
+    (por defecto, la salida estándar).
+    Si se purgan archivos modificados o retirados, Hechos_Analitica se refresca una vez
+    al final de la purga; con refrescar_analitica=False se deja para la carga de hechos
+    que venga después (el pipeline lo hace cuando también ejecuta el paso de hechos).
+    `get_connection` permite reutilizar un pool externo (p. ej. engine.raw_connection
+    de SQLAlchemy); si no se indica, se crea un pool propio con DB_CONFIG.
+    Devuelve la lista de resúmenes por archivo, o None si la carga no pudo iniciarse.
+    """
+    args = parse_args(argv)
+    batch_size = max(1, args.batch_size)
 
     input_dir = resolve_input_dir()
 
     if not input_dir.exists():
-        print(f"No se encontró el directorio de entrada: {input_dir}")
-        return
+        print(f"No se encontró el directorio de entrada: {input_dir}", file=salida)
+        return None
 
     file_paths = [str(path) for path in sorted(input_dir.rglob('*.xlsx'))]
 
     if not file_paths:
-        print(f"No se encontraron archivos Excel en la ruta: {input_dir}")
-        return
+        print(f"No se encontraron archivos Excel en la ruta: {input_dir}", file=salida)
+        return []
 
-    # Procesar archivos en paralelo
-    print(f"Iniciando carga paralela de {len(file_paths)} archivos...")
-    results = []
-    with concurrent.futures.ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
-        future_to_file = {executor.submit(process_file, path): path for path in file_paths}
-        for future in concurrent.futures.as_completed(future_to_file):
-            results.append(future.result())
+    # Sincronizar staging con el manifiesto: solo se recargan archivos nuevos o modificados
+    try:
+        if get_connection is None:
+            get_connection = create_connection_pool(max(1, args.db_writers))
+        conn = get_connection()
+        try:
+            with conn.cursor() as cursor:
+                if args.full_reload:
+                    # Los hechos se derivan de staging: se vacían junto con el manifiesto que marca lo ya cargado
+                    cursor.execute("DELETE FROM Hechos_Analitica")
+                    cursor.execute("DELETE FROM Resumen_Mensual")
+                    cursor.execute("DELETE FROM Hechos_Mantenimiento")
+                    cursor.execute("DELETE FROM Control_Cargas WHERE Proceso = 'hechos'")
+                    cursor.execute("DELETE FROM STG_Hechos_Pendientes")
+                    cursor.execute("DELETE FROM STG_Archivo_Filas")
+                    cursor.execute("DELETE FROM STG_Mantenimientos")
+                    cursor.execute("DELETE FROM Ingesta_Manifiesto")
+                    conn.commit()
+                    print("Recarga completa: datos anteriores eliminados de hechos, resumen mensual, tabla analítica, STG_Mantenimientos y del manifiesto.", file=salida)
+                else:
+                    # Filas cargadas antes de existir el manifiesto: no se pueden asociar a un archivo
+                    cursor.execute("DELETE FROM STG_Mantenimientos WHERE ArchivoHash IS NULL")
+                    conn.commit()
+                manifiesto = load_manifest(cursor)
+                por_cargar, omitidos, obsoletos = plan_ingestion(input_dir, file_paths, manifiesto)
+                if obsoletos:
+                    purge_hashes(conn, cursor, obsoletos)
+                    if refrescar_analitica:
+                        refresh_analytics(conn)
+                    print(f"Eliminadas de staging las filas de {len(obsoletos)} archivos modificados o retirados.", file=salida)
+        finally:
+            conn.close()
+    except mysql.connector.Error as err:
+        print(f"Error de MySQL al sincronizar el manifiesto de ingesta: {err}", file=salida)
+        return None
+
+    cache = None if args.chunk_size else build_cache(args, input_dir, salida)
+
+    # Procesar archivos: lectura en procesos, escritura en hilos con conexiones del pool
+    print(f"{len(file_paths)} archivos encontrados: {len(por_cargar)} por cargar, {len(omitidos)} omitidos.", file=salida)
+    results = list(omitidos)
+    inicio = time.perf_counter()
+    if args.chunk_size:
+        print(f"Iniciando carga por bloques de {len(por_cargar)} archivos: {args.chunk_size} filas por bloque, "
+              f"{args.db_writers} escritores, lotes de {batch_size} filas...", file=salida)
+        results.extend(run_chunked_ingestion(
+            por_cargar, get_connection, chunk_size=max(1, args.chunk_size), batch_size=batch_size,
+            db_writers=args.db_writers, on_progress=functools.partial(print_progress, salida=salida),
+        ))
+    else:
+        print(f"Iniciando carga de {len(por_cargar)} archivos: {args.parse_workers} procesos de lectura, "
+              f"{args.db_writers} escritores, lotes de {batch_size} filas...", file=salida)
+        results.extend(run_ingestion(
+            por_cargar, get_connection, batch_size=batch_size, excel_engine=args.excel_engine, cache=cache,
+            parse_workers=args.parse_workers, db_writers=args.db_writers, queue_size=args.queue_size,
+            salida=salida,
+        ))
+    segundos_totales = time.perf_counter() - inicio
 
     # Mostrar resumen final
-    print("\n--- Resumen de Carga ---")
+    print("\n--- Resumen de Carga ---", file=salida)
     total_registros = 0
+    total_rechazados = 0
+    total_duplicados = 0
     for res in sorted(results, key=lambda x: x['archivo']):
-        estado = "[OK] Cumple" if res["cumple"] else "[ERROR] No cumple"
-        print(f"{res['archivo']}: {estado}. Registros cargados: {res['registros']}. {res['mensaje']}")
+        if res.get("omitido"):
+            estado = "[--] Omitido"
+        else:
+            estado = "[OK] Cumple" if res["cumple"] else "[ERROR] No cumple"
+        velocidad = _rows_per_second(res['registros'], res['segundos'])
+        rechazados = 0 if res.get('rechazados') is None else len(res['rechazados'])
+        duplicados = res.get('duplicados', 0)
+        print(f"{res['archivo']}: {estado}. Registros cargados: {res['registros']}, duplicados: {duplicados}, "
+              f"rechazados: {rechazados} ({res['segundos']:.2f} s, {velocidad:,.0f} filas/s). {res['mensaje']}", file=salida)
+        if res.get('aviso'):
+            print(f"  Aviso: {res['aviso']}", file=salida)
         total_registros += res['registros']
+        total_rechazados += rechazados
+        total_duplicados += duplicados
     
-    print(f"\nTotal de registros insertados: {total_registros}")
-    print("Proceso de carga finalizado.")
+    print(f"\nTotal de registros insertados: {total_registros}", file=salida)
+    print(f"Total de filas duplicadas omitidas: {total_duplicados}", file=salida)
+    if total_rechazados:
+        ruta_rechazos = write_reject_report(results, str(input_dir.parent / "output"))
+        print(f"Total de filas rechazadas: {total_rechazados}. Detalle en: {ruta_rechazos}", file=salida)
+    print(f"Tiempo total: {segundos_totales:.2f} s. "
+          f"Rendimiento: {_rows_per_second(total_registros, segundos_totales):,.0f} filas/s", file=salida)
+    print("Proceso de carga finalizado.", file=salida)
+    return results
+
+def main_con_bloqueo(argv=None):
+    """
+    Entrada por línea de comandos: ejecuta main reteniendo el bloqueo del pipeline, para
+    no cargar staging mientras otra ejecución carga o lleva staging a hechos. El
+    pipeline llama a main directamente porque ya tiene el bloqueo.
+    """
+    args = parse_args(argv)
+    conn = mysql.connector.connect(**DB_CONFIG)
+    try:
+        if not adquirir_bloqueo(conn, args.lock_timeout):
+            print(f"Otra ejecución del pipeline retuvo el bloqueo más de {args.lock_timeout} s.", file=sys.stderr)
+            sys.exit(1)
+        return main(argv)
+    finally:
+        conn.close()  # al cerrar la sesión se libera también el bloqueo
 
 if __name__ == "__main__":
-    main()
+    main_con_bloqueo()
 
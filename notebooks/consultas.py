@@ -0,0 +1,99 @@
+# Consultas de lectura del tablero y de las predicciones.
+# Se definen en un solo lugar para que explain_check.py pueda verificar su plan de
+# ejecución contra los índices de migrations/.
+
+# Años con hechos cargados (índice idx_hechos_anio), para el selector del historial
+ANIOS_HISTORICO = """
+SELECT DISTINCT Anio
+FROM Hechos_Mantenimiento
+ORDER BY Anio DESC
+"""
+
+# Historial reciente de un año (app.py, show_historical_data); el filtro por Anio
+# limita la lectura a una sola partición de Hechos_Mantenimiento
+HISTORICO_RECIENTE = """
+SELECT h.HechoKey, v.NombreVehiculo, t.IdentificacionTercero, t.NombreTercero,
+       ti.Fecha AS FechaElaboracion, h.TipoMantenimiento, h.Debito
+FROM Hechos_Mantenimiento h
+JOIN Dim_Vehiculos v ON v.VehiculoKey = h.VehiculoKey
+JOIN Dim_Terceros t ON t.TerceroKey = h.TerceroKey
+JOIN Dim_Tiempo ti ON ti.TiempoKey = h.TiempoKey
+WHERE h.Anio = %(anio)s
+ORDER BY h.HechoKey DESC
+LIMIT 1000
+"""
+
+# Tabla analítica Hechos_Analitica (predicciones_script.py y generar_graficas.py): el
+# join en estrella ya resuelto a grano mensual, en el orden de las series vehículo/tipo.
+# La lectura la arma leer_hechos_analitica (notebooks/analitica.py) con las columnas
+# que pide cada consumidor.
+COLUMNAS_ANALITICA = (
+    "NombreVehiculo", "Categoria", "TipoMatricula", "IdentificacionTercero",
+    "TipoMantenimiento", "Mes", "Costo", "CostoPositivo", "Registros",
+)
+
+HECHOS_ANALITICA = """
+SELECT {columnas}
+FROM Hechos_Analitica
+ORDER BY VehiculoKey, TipoMantenimiento, Mes
+"""
+
+# Predicciones por tipo para el análisis comparativo (generar_graficas.py)
+PREDICCIONES_ANALISIS = """
+SELECT TipoMantenimiento, Fecha, Costo, 'Predicción' AS Origen
+FROM Predicciones_Tipo_Mantenimiento
+"""
+
+# Pestaña "Datos de Predicción" (app.py, show_predictions), filtrada por año de la
+# fecha pronosticada para leer solo esa partición. Los años del selector van de la
+# primera a la última fecha de las dos tablas (índice idx_pred_fecha: cada MIN/MAX lee
+# un extremo del índice); ver anios_prediccion
+ANIOS_PREDICCION = """
+SELECT (SELECT MIN(Fecha) FROM Predicciones_Vehiculo_Tipo) AS DesdeVehiculo,
+       (SELECT MAX(Fecha) FROM Predicciones_Vehiculo_Tipo) AS HastaVehiculo,
+       (SELECT MIN(Fecha) FROM Predicciones_Tipo_Mantenimiento) AS DesdeTipo,
+       (SELECT MAX(Fecha) FROM Predicciones_Tipo_Mantenimiento) AS HastaTipo
+"""
+
+PREDICCIONES_VEHICULO = """
+SELECT id, NombreVehiculo, TipoMantenimiento, Fecha, Costo, Origen
+FROM Predicciones_Vehiculo_Tipo
+WHERE Fecha >= %(desde)s AND Fecha < %(hasta)s
+ORDER BY NombreVehiculo, TipoMantenimiento, Fecha
+"""
+
+PREDICCIONES_TIPO = """
+SELECT id, TipoMantenimiento, Fecha, Costo, Origen
+FROM Predicciones_Tipo_Mantenimiento
+WHERE Fecha >= %(desde)s AND Fecha < %(hasta)s
+ORDER BY TipoMantenimiento, Fecha
+"""
+
+def anios_prediccion(fila):
+    """Años entre la primera y la última fecha pronosticada de la fila de ANIOS_PREDICCION."""
+    fechas = [fecha for fecha in fila if fecha is not None and fecha == fecha]  # NaT != NaT
+    if not fechas:
+        return []
+    return list(range(min(fechas).year, max(fechas).year + 1))
+
+def rango_anio(anio):
+    """Parámetros desde/hasta que cubren un año completo de fechas pronosticadas."""
+    return {"desde": f"{int(anio)}-01-01", "hasta": f"{int(anio) + 1}-01-01"}
+
+# Consultas que se verifican con EXPLAIN, por nombre
+CONSULTAS_VERIFICADAS = {
+    "anios_historico": ANIOS_HISTORICO,
+    "historico_reciente": HISTORICO_RECIENTE,
+    "hechos_analitica": HECHOS_ANALITICA.format(columnas=", ".join(COLUMNAS_ANALITICA)),
+    "predicciones_analisis": PREDICCIONES_ANALISIS,
+    "anios_prediccion": ANIOS_PREDICCION,
+    "predicciones_vehiculo": PREDICCIONES_VEHICULO,
+    "predicciones_tipo": PREDICCIONES_TIPO,
+}
+
+# Consultas que leen la tabla entera a propósito (entrenamiento y análisis): en ellas
+# se acepta el recorrido completo de un índice (type = index), pero no el de la tabla
+LECTURAS_COMPLETAS = {"hechos_analitica", "predicciones_analisis"}
+
+# Valores de ejemplo para los parámetros de las consultas al ejecutar EXPLAIN
+PARAMETROS_EXPLAIN = {"anio": 2024, **rango_anio(2025)}
@@ -3,31 +3,47 @@ from sqlalchemy import create_engine
 from pyecharts import options as opts
 from pyecharts.charts import Bar, Pie
 
+try:
+    from notebooks.analitica import leer_hechos_analitica
+    from notebooks.consultas import PREDICCIONES_ANALISIS
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from analitica import leer_hechos_analitica
+    from consultas import PREDICCIONES_ANALISIS
+
+COLUMNAS_PROCESADAS = ['TipoMantenimiento', 'Origen', 'AñoMes', 'Costo']
+
 def _get_db_engine(db_config):
     """Creates a SQLAlchemy engine from a dictionary of credentials."""
     db_url = f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['database']}"
     return create_engine(db_url)
 
 def _get_processed_data(engine):
-    """Fetches and processes historical and prediction data."""
-    query_hist = "SELECT TipoMantenimiento, FechaElaboracion AS Fecha, Debito AS Costo, 'Histórico' AS Origen FROM Hechos_Mantenimiento WHERE Debito > 0"
-    query_pred = "SELECT TipoMantenimiento, Fecha, Costo, 'Predicción' AS Origen FROM Predicciones_Tipo_Mantenimiento"
-    
+    """
+    Fetches and processes historical and prediction data.
+    Returns (monthly costs by type and origin, maintenance types present in the facts or None on error).
+    """
     try:
-        df_hist = pd.read_sql(query_hist, engine)
-        df_pred = pd.read_sql(query_pred, engine)
+        df_analitica = leer_hechos_analitica(engine, ['TipoMantenimiento', 'Mes', 'CostoPositivo'])
+        df_pred = pd.read_sql(PREDICCIONES_ANALISIS, engine)
     except Exception as e:
         print(f"Error al leer datos para gráficos de análisis: {e}")
-        return pd.DataFrame()
+        return pd.DataFrame(columns=COLUMNAS_PROCESADAS), None
+
+    tipos = sorted(df_analitica['TipoMantenimiento'].unique().tolist())
+
+    # Costo mensual por tipo solo con débitos positivos
+    df_hist = (df_analitica.groupby(['TipoMantenimiento', 'Mes'])['CostoPositivo'].sum()
+               .rename('Costo').reset_index().rename(columns={'Mes': 'Fecha'}))
+    df_hist = df_hist[df_hist['Costo'] > 0].assign(Origen='Histórico')
 
     if df_hist.empty and df_pred.empty:
-        return pd.DataFrame()
+        return pd.DataFrame(columns=COLUMNAS_PROCESADAS), tipos
 
     df = pd.concat([df_hist, df_pred], ignore_index=True)
     df['Fecha'] = pd.to_datetime(df['Fecha'])
     df['AñoMes'] = df['Fecha'].dt.to_period('M').astype(str)
     
-    return df.groupby(['TipoMantenimiento', 'Origen', 'AñoMes'])['Costo'].sum().reset_index()
+    return df.groupby(['TipoMantenimiento', 'Origen', 'AñoMes'])['Costo'].sum().reset_index(), tipos
 
 def _create_monthly_comparison_chart(df_tipo, tipo):
     """Creates a comparative bar chart for a given maintenance type."""
@@ -89,20 +105,19 @@ def _create_total_analysis_pie_chart(df_tipo, tipo):
     )
     return pie
 
-def generate_analysis_charts(db_config):
+def generate_analysis_charts(db_config, engine=None):
     """Main function to generate and return all analysis charts."""
-    engine = _get_db_engine(db_config)
+    if engine is None:
+        engine = _get_db_engine(db_config)
     if not engine:
         return {}
 
-    df_processed = _get_processed_data(engine)
+    # Los tipos de mantenimiento salen de la misma lectura de la tabla analítica
+    df_processed, all_tipos = _get_processed_data(engine)
     analysis_charts = {}
 
-    # Obtener todos los tipos de mantenimiento posibles desde la tabla de dimensiones
-    try:
-        all_tipos = pd.read_sql("SELECT DISTINCT TipoMantenimiento FROM Dim_TipoMantenimiento", engine)['TipoMantenimiento'].tolist()
-    except Exception as e:
-        print(f"Advertencia: No se pudo obtener la lista completa de tipos de mantenimiento: {e}")
+    if all_tipos is None:
+        print("Advertencia: No se pudo obtener la lista completa de tipos de mantenimiento")
         all_tipos = ['CORRECTIVO', 'PREVENTIVO'] # Fallback a una lista conocida
 
     # Asegurar que se genere un grupo de gráficos para cada tipo de mantenimiento
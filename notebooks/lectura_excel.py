@@ -0,0 +1,356 @@
+import hashlib
+import importlib.util
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.1
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+# Formato de los libros de mantenimiento: encabezado en la fila 8 y al menos 15 columnas,
+# de las cuales solo se cargan 13 (las columnas de marca CORRECTIVO/PREVENTIVO se omiten).
+HEADER_ROW = 7
+MIN_COLUMNS = 15
+COLUMN_INDICES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 11, 12, 13, 14]
+COLUMN_NAMES = [
+    "Codigo_contable", "NombreVehiculo", "Comprobante", "Secuencia", "FechaElaboracion",
+    "IdentificacionTercero", "NombreTercero", "Descripcion", "Debito", "TipoMantenimiento",
+    "Categoria", "Matricula", "TipoMatricula"
+]
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Columnas de texto que se recortan y cuyo valor vacío se guarda como NULL
+TEXT_COLUMNS = [c for c in COLUMN_NAMES if c not in ("FechaElaboracion", "Debito")]
+
+# Caché de libros ya leídos en formato Parquet (requiere pyarrow)
+CACHE_DIR_NAME = ".cache_input_files"
+DEFAULT_CACHE_MAX_MB = 512
+# Se incrementa cuando cambia el contenido o el tipado del DataFrame cacheado
+CACHE_VERSION = 2
+# Sufijo del Parquet con las filas rechazadas de cada entrada de la caché
+REJECTS_SUFFIX = ".rechazos"
+
+# Motores de lectura: 'calamine' (si está instalado), 'openpyxl' (pandas) y
+# 'stream' (openpyxl en modo solo lectura, por bloques de filas).
+ENGINES = ("calamine", "openpyxl", "stream")
+
+
+class FormatoArchivoError(ValueError):
+    """El libro no tiene la estructura esperada de columnas."""
+
+
+def available_engines():
+    """Motores de lectura utilizables en este entorno, del más rápido al más lento."""
+    engines = []
+    if importlib.util.find_spec("python_calamine") is not None:
+        engines.append("calamine")
+    engines.extend(["stream", "openpyxl"])
+    return engines
+
+
+def resolve_engine(engine=None):
+    if engine in (None, "auto"):
+        return available_engines()[0]
+    if engine not in ENGINES:
+        raise ValueError(f"Motor de lectura desconocido: {engine}")
+    return engine
+
+
+def _select_columns(df):
+    df = df.dropna(how="all")
+    df.columns = COLUMN_NAMES
+    return df.reset_index(drop=True)
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def estimate_data_rows(source):
+    """
+    Filas de datos según las dimensiones declaradas en la hoja, sin recorrerla.
+    Es una cota superior (incluye filas vacías al final) o None si el libro no la declara.
+    """
+    _rewind(source)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        max_row = wb.worksheets[0].max_row
+    finally:
+        wb.close()
+        _rewind(source)
+    if max_row is None:
+        return None
+    return max(0, max_row - HEADER_ROW - 1)
+
+
+def iter_workbook_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Recorre la primera hoja en modo solo lectura y entrega DataFrames de hasta
+    chunk_size filas con únicamente las columnas que se cargan. La memoria queda
+    acotada por el tamaño del bloque, no por el del archivo.
+    """
+    _rewind(source)
+    wb = load_workbook(source, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        header = next(ws.iter_rows(min_row=HEADER_ROW + 1, max_row=HEADER_ROW + 1, values_only=True), ())
+        if len(header) < MIN_COLUMNS:
+            raise FormatoArchivoError("No cumple con la cantidad requerida de columnas.")
+
+        bloque = []
+        for row in ws.iter_rows(min_row=HEADER_ROW + 2, values_only=True):
+            bloque.append([row[i] if i < len(row) else None for i in COLUMN_INDICES])
+            if len(bloque) >= chunk_size:
+                yield _select_columns(pd.DataFrame(bloque, dtype=object))
+                bloque = []
+        if bloque:
+            yield _select_columns(pd.DataFrame(bloque, dtype=object))
+    finally:
+        wb.close()
+
+
+def read_workbook(source, engine=None, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Lee un libro de mantenimientos con solo las 13 columnas que se cargan.
+    `source` puede ser una ruta o un objeto tipo archivo. Los valores se
+    devuelven sin tipar (dtype object); la normalización ocurre después.
+    """
+    engine = resolve_engine(engine)
+    if engine == "stream":
+        chunks = list(iter_workbook_chunks(source, chunk_size))
+        if not chunks:
+            return pd.DataFrame(columns=COLUMN_NAMES, dtype=object)
+        return pd.concat(chunks, ignore_index=True)
+
+    try:
+        df = pd.read_excel(source, header=HEADER_ROW, usecols=COLUMN_INDICES, dtype=object, engine=engine)
+    except ValueError as e:
+        # usecols falla cuando el libro tiene menos columnas de las esperadas
+        raise FormatoArchivoError("No cumple con la cantidad requerida de columnas.") from e
+    if df.shape[1] != len(COLUMN_INDICES):
+        raise FormatoArchivoError("No cumple con la cantidad requerida de columnas.")
+    return _select_columns(df)
+
+
+def _guess_fecha_formato(muestra):
+    # Las fechas ISO (celdas de tipo fecha) no deben interpretarse con el día primero
+    dayfirst = re.match(r"\d{4}-", muestra) is None
+    return guess_datetime_format(muestra, dayfirst=dayfirst)
+
+
+def _parse_fecha_tolerante(valor):
+    try:
+        return pd.to_datetime(valor, dayfirst=re.match(r"\d{4}-", valor) is None)
+    except (ValueError, TypeError):
+        return pd.NaT
+
+
+def normalize_frame(df, fecha_formato=None):
+    """
+    Tipa y limpia por columnas el DataFrame leído de un libro.
+
+    - Texto: se recorta y las cadenas vacías pasan a nulo.
+    - FechaElaboracion: se convierte a fecha con un formato inferido una sola vez
+      (se devuelve para reutilizarlo en los siguientes bloques del mismo archivo);
+      los valores que no encajan se reintentan uno a uno.
+    - Debito: numérico.
+
+    Devuelve (validas, rechazadas, fecha_formato). Las filas rechazadas conservan
+    los valores originales y una columna Motivo.
+    """
+    original = df
+    df = df.copy()
+    for col in TEXT_COLUMNS:
+        df[col] = df[col].astype("string").str.strip().replace("", pd.NA)
+
+    fechas_txt = df["FechaElaboracion"].astype("string").str.strip().replace("", pd.NA)
+    if fecha_formato is None:
+        muestra = fechas_txt.dropna()
+        if not muestra.empty:
+            fecha_formato = _guess_fecha_formato(muestra.iloc[0])
+    fechas = pd.to_datetime(fechas_txt, format=fecha_formato, errors="coerce") if fecha_formato else pd.Series(pd.NaT, index=df.index)
+    pendientes = fechas.isna() & fechas_txt.notna()
+    if pendientes.any():
+        fechas[pendientes] = fechas_txt[pendientes].map(_parse_fecha_tolerante)
+    df["FechaElaboracion"] = pd.to_datetime(fechas).dt.normalize()
+
+    debito_txt = df["Debito"].astype("string").str.strip().replace("", pd.NA)
+    df["Debito"] = pd.to_numeric(debito_txt, errors="coerce")
+
+    motivo = pd.Series(pd.NA, index=df.index, dtype="string")
+    motivo[df["Debito"].isna() & debito_txt.notna()] = "Débito no numérico"
+    motivo[df["FechaElaboracion"].isna() & fechas_txt.notna()] = "Fecha de elaboración inválida"
+    rechazo = motivo.notna()
+
+    rechazadas = original[rechazo].copy()
+    rechazadas["Motivo"] = motivo[rechazo]
+    return df[~rechazo].reset_index(drop=True), rechazadas.reset_index(drop=True), fecha_formato
+
+
+def row_hash(df):
+    """
+    Clave natural de staging: hash de 64 bits (con signo, para BIGINT) de los campos
+    de negocio de cada fila, calculado por columnas. Se hashea la representación en
+    texto de cada campo para que el valor no dependa de la resolución de las fechas
+    ni del tipo numérico que use la versión de pandas instalada. Debito se escribe
+    siempre con dos decimales: to_numeric da Int64 si todos los débitos del bloque
+    son enteros y Float64 si no, y la misma fila debe tener el mismo hash en ambos.
+    """
+    canonico = pd.DataFrame({col: df[col].astype("string") for col in TEXT_COLUMNS}, index=df.index)
+    canonico["FechaElaboracion"] = df["FechaElaboracion"].dt.strftime("%Y-%m-%d").astype("string")
+    debito = df["Debito"].astype("Float64").astype("float64").to_numpy()
+    canonico["Debito"] = pd.Series(np.char.mod("%.2f", np.nan_to_num(debito)), index=df.index,
+                                   dtype="string").mask(np.isnan(debito))
+    hashes = pd.util.hash_pandas_object(canonico[COLUMN_NAMES].fillna(""), index=False)
+    return pd.Series(hashes.to_numpy().view("int64"), index=df.index)
+
+
+def parquet_available():
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def default_cache_dir(input_dir):
+    """Carpeta de caché junto a input_files (no dentro, para que rglob no la recorra)."""
+    return Path(input_dir).parent / CACHE_DIR_NAME
+
+
+class WorkbookCache:
+    """
+    Caché en disco de los libros ya leídos y normalizados: por libro, un Parquet con
+    las filas válidas ya tipadas y otro con las rechazadas, para que un acierto no
+    vuelva a convertir fechas ni números.
+
+    La clave combina ruta absoluta, mtime y tamaño del libro: si el archivo cambia,
+    la entrada anterior deja de usarse y termina saliendo por desalojo. El desalojo
+    es LRU por tamaño total, usando el mtime de cada Parquet como marca del último
+    acceso, por lo que no hace falta un índice compartido entre hilos o procesos.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    # El lock no se puede serializar: cada proceso de lectura crea el suyo
+    def __getstate__(self):
+        return {"cache_dir": self.cache_dir, "max_bytes": self.max_bytes}
+
+    def __setstate__(self, state):
+        self.__init__(state["cache_dir"], state["max_bytes"])
+
+    def _entry_path(self, file_path):
+        stat = os.stat(file_path)
+        raw = f"{Path(file_path).resolve()}|{stat.st_mtime_ns}|{stat.st_size}|{CACHE_VERSION}"
+        return self.cache_dir / f"{hashlib.sha1(raw.encode('utf-8')).hexdigest()}.parquet"
+
+    @staticmethod
+    def _rejects_path(entry):
+        return entry.with_name(f"{entry.stem}{REJECTS_SUFFIX}{entry.suffix}")
+
+    def get(self, file_path):
+        """Devuelve (validas, rechazadas) cacheadas o None si no hay entrada válida."""
+        entry = self._entry_path(file_path)
+        rechazos = self._rejects_path(entry)
+        try:
+            validas = pd.read_parquet(entry)
+            rechazadas = pd.read_parquet(rechazos)
+        except (FileNotFoundError, OSError, ValueError):
+            return None
+        for path in (entry, rechazos):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return validas, rechazadas
+
+    def put(self, file_path, validas, rechazadas):
+        entry = self._entry_path(file_path)
+        # Las rechazadas primero: get solo encuentra la entrada cuando ya están las dos
+        for path, df in ((self._rejects_path(entry), to_cacheable(rechazadas)), (entry, validas)):
+            tmp = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp")
+            df.to_parquet(tmp, index=False)
+            os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        """Elimina las entradas menos usadas (sus dos Parquet) hasta quedar bajo el tamaño máximo."""
+        with self._lock:
+            entries = {}
+            for path in self.cache_dir.glob("*.parquet"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                clave = path.name.split(".")[0]
+                uso, size, paths = entries.get(clave, (0.0, 0, []))
+                entries[clave] = (max(uso, stat.st_mtime), size + stat.st_size, paths + [path])
+            total = sum(size for _, size, _ in entries.values())
+            for _, size, paths in sorted(entries.values(), key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                for path in paths:
+                    try:
+                        path.unlink()
+                    except OSError:
+                        pass
+                total -= size
+
+    def clear(self):
+        with self._lock:
+            for entry in self.cache_dir.glob("*.parquet"):
+                try:
+                    entry.unlink()
+                except OSError:
+                    pass
+
+
+def to_cacheable(df):
+    """
+    Parquet necesita un tipo por columna: las columnas object que mezclan tipos
+    (str, int, fechas) pasan a texto; el resto se guarda con su tipo.
+    """
+    mixtas = [col for col in df.columns
+              if df[col].dtype == object and df[col].dropna().map(type).nunique() > 1]
+    return df.astype({col: "string" for col in mixtas}) if mixtas else df
+
+
+def read_workbook_normalized(source, cache=None, engine=None, tiempos=None):
+    """
+    Lee y normaliza el libro (ver normalize_frame) y devuelve (validas, rechazadas, aviso).
+    Con caché, un acierto devuelve el resultado ya tipado sin leer ni normalizar;
+    si no hay entrada vigente se crea. Si no se puede guardar, la lectura sigue siendo
+    válida y `aviso` trae el motivo (si no, None) para que lo informe el llamador: esta
+    función corre en procesos hijos, cuya salida no llega a la del llamador. En
+    `tiempos` se suman los segundos de "lectura" y "normalizacion".
+    """
+    tiempos = {"lectura": 0.0, "normalizacion": 0.0} if tiempos is None else tiempos
+    inicio = time.perf_counter()
+    if cache is not None:
+        cacheado = cache.get(source)
+        if cacheado is not None:
+            tiempos["lectura"] += time.perf_counter() - inicio
+            return (*cacheado, None)
+    df = read_workbook(source, engine=engine)
+    tiempos["lectura"] += time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    validas, rechazadas, _ = normalize_frame(df)
+    tiempos["normalizacion"] += time.perf_counter() - inicio
+    aviso = None
+    if cache is not None:
+        try:
+            cache.put(source, validas, rechazadas)
+        except Exception as e:
+            aviso = f"No se pudo guardar en caché: {e}"
+    return validas, rechazadas, aviso
@@ -0,0 +1,312 @@
+# Orquestador del proceso completo en un solo proceso:
+# carga de inputs -> dimensiones -> hechos -> predicciones
+import argparse
+import io
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import Future
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+try:
+    from notebooks.bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, PIPELINE_LOCK_NAME
+    from notebooks.carga_archivo_script import main as cargar_inputs
+    from notebooks.predicciones_script import get_prediction_charts_and_update_db
+    from notebooks.update_datos_script import actualizar_hechos, ejecutar_sp
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, PIPELINE_LOCK_NAME
+    from carga_archivo_script import main as cargar_inputs
+    from predicciones_script import get_prediction_charts_and_update_db
+    from update_datos_script import actualizar_hechos, ejecutar_sp
+
+PASOS = ("carga", "dimensiones", "hechos", "predicciones")
+
+# Conexiones del pool compartido: escritores de la carga + una para el resto de pasos
+DEFAULT_POOL_SIZE = 5
+
+INSERT_EJECUCION_SQL = text("""
+INSERT INTO Ejecuciones_Pipeline (EjecucionId, Paso, Inicio, Segundos, Filas, Estado, Mensaje)
+VALUES (:ejecucion, :paso, :inicio, :segundos, :filas, :estado, :mensaje)
+""")
+
+
+def create_db_engine(db_config, pool_size=DEFAULT_POOL_SIZE):
+    """Engine de SQLAlchemy con pool, compartido por todos los pasos (y por la app)."""
+    db_url = (f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}"
+              f"@{db_config['host']}:{db_config['port']}/{db_config['database']}")
+    return create_engine(db_url, pool_size=pool_size, max_overflow=pool_size, pool_pre_ping=True, pool_recycle=3600)
+
+
+def db_config_from_env():
+    return {
+        'host': os.getenv('DB_HOST'),
+        'port': os.getenv('DB_PORT'),
+        'user': os.getenv('DB_USER'),
+        'password': os.getenv('DB_PASSWORD'),
+        'database': os.getenv('DB_NAME'),
+    }
+
+
+# --- Pasos: cada uno recibe el engine y el contexto de la ejecución y devuelve (filas, mensaje) ---
+def paso_carga(engine, contexto):
+    # Si después se cargan los hechos, esa carga ya publica Hechos_Analitica tras la purga
+    resultados = cargar_inputs(contexto.get("argv_carga", []), get_connection=engine.raw_connection,
+                               salida=contexto.get("salida"),
+                               refrescar_analitica="hechos" not in contexto.get("pasos", []))
+    if resultados is None:
+        raise RuntimeError("La carga de inputs no pudo iniciarse.")
+    contexto["carga"] = resultados
+    errores = [res["archivo"] for res in resultados if not res["cumple"]]
+    mensaje = f"{len(resultados)} archivos"
+    if errores:
+        mensaje += f", {len(errores)} con errores"
+    return sum(res["registros"] for res in resultados), mensaje
+
+
+def paso_dimensiones(engine, contexto):
+    conn = engine.raw_connection()
+    try:
+        ejecutar_sp(conn, 'sp_upsert_dimensiones', salida=contexto.get("salida"))
+    finally:
+        conn.close()
+    return None, ""
+
+
+def paso_hechos(engine, contexto):
+    completo = contexto.get("hechos_completo", False)
+    conn = engine.raw_connection()
+    try:
+        insertados, sin_cambios = actualizar_hechos(conn, completo=completo, salida=contexto.get("salida"))
+    finally:
+        conn.close()
+    contexto["hechos"] = {"insertados": insertados, "sin_cambios": sin_cambios}
+    modo = "completa" if completo else "incremental"
+    return insertados, f"Carga {modo}: {insertados} insertados, {sin_cambios} sin cambios"
+
+
+def paso_predicciones(engine, contexto):
+    charts = get_prediction_charts_and_update_db(contexto.get("db_config"), engine=engine,
+                                                 forzar_reentrenamiento=contexto.get("reentrenar", False),
+                                                 salida=contexto.get("salida"))
+    contexto["prediction_charts"] = charts
+    with engine.connect() as connection:
+        filas = sum(connection.execute(text(f"SELECT COUNT(*) FROM {tabla}")).scalar()
+                    for tabla in ("Predicciones_Vehiculo_Tipo", "Predicciones_Tipo_Mantenimiento"))
+    return filas, (f"{len(charts.get('by_vehicle', {}))} gráficos por vehículo, "
+                   f"{len(charts.get('by_type', {}))} por tipo")
+
+
+FUNCIONES_PASO = {
+    "carga": paso_carga,
+    "dimensiones": paso_dimensiones,
+    "hechos": paso_hechos,
+    "predicciones": paso_predicciones,
+}
+
+
+def _registrar_paso(engine, registro, salida=None):
+    """Guarda el resultado del paso en Ejecuciones_Pipeline; un fallo aquí no detiene el pipeline."""
+    try:
+        with engine.begin() as connection:
+            connection.execute(INSERT_EJECUCION_SQL, registro)
+    except Exception as e:
+        print(f"No se pudo registrar el paso {registro['paso']} en Ejecuciones_Pipeline: {e}", file=salida)
+
+
+def _ejecutar_paso(engine, contexto, ejecucion_id, paso, omision=""):
+    """Ejecuta un paso (o lo marca omitido con el motivo indicado) y lo registra."""
+    registro = {"ejecucion": ejecucion_id, "paso": paso, "inicio": datetime.now(),
+                "segundos": 0.0, "filas": None, "estado": "OMITIDO", "mensaje": omision}
+    if not omision:
+        print(f"\n--- Paso: {paso} ---", file=contexto.get("salida"))
+        inicio = time.perf_counter()
+        try:
+            registro["filas"], registro["mensaje"] = FUNCIONES_PASO[paso](engine, contexto)
+            registro["estado"] = "OK"
+        except Exception as e:
+            registro["estado"] = "ERROR"
+            registro["mensaje"] = str(e)
+        registro["segundos"] = round(time.perf_counter() - inicio, 3)
+    _registrar_paso(engine, registro, contexto.get("salida"))
+    return registro
+
+
+def _adquirir_bloqueo(engine, timeout):
+    """Conexión que retiene el bloqueo del pipeline, o None si no se obtuvo a tiempo."""
+    connection = engine.connect()
+    try:
+        obtenido = connection.execute(text("SELECT GET_LOCK(:nombre, :timeout)"),
+                                      {"nombre": PIPELINE_LOCK_NAME, "timeout": timeout}).scalar()
+    except Exception:
+        connection.close()
+        raise
+    if obtenido != 1:
+        connection.close()
+        return None
+    return connection
+
+
+def _liberar_bloqueo(connection):
+    try:
+        connection.execute(text("SELECT RELEASE_LOCK(:nombre)"), {"nombre": PIPELINE_LOCK_NAME})
+    finally:
+        connection.close()
+
+
+def run_pipeline(engine=None, db_config=None, pasos=PASOS, hechos_completo=False, argv_carga=None,
+                 lock_timeout=DEFAULT_LOCK_TIMEOUT, reentrenar=False, salida=None):
+    """
+    Ejecuta los pasos indicados en orden, en este proceso y con un único engine.
+    Antes espera (hasta lock_timeout segundos) el bloqueo GET_LOCK del pipeline;
+    si no lo obtiene, o si un paso falla, los pasos pendientes se marcan como omitidos.
+    Con reentrenar, el paso de predicciones no reutiliza los modelos guardados.
+    Los mensajes de todos los pasos se escriben en salida (stdout si es None).
+
+    Devuelve un diccionario con el id de la ejecución, el registro de cada paso
+    (inicio, segundos, filas, estado, mensaje) y el contexto con los resultados
+    en memoria (resúmenes de carga, gráficos de predicción).
+    """
+    db_config = db_config or db_config_from_env()
+    if engine is None:
+        engine = create_db_engine(db_config)
+    ejecucion_id = uuid.uuid4().hex
+    contexto = {"db_config": db_config, "pasos": list(pasos), "hechos_completo": hechos_completo,
+                "argv_carga": argv_carga or [], "reentrenar": reentrenar, "salida": salida}
+    registros = []
+    fallido = None
+    omision = ""
+
+    print(f"=== Pipeline {ejecucion_id}: {' -> '.join(pasos)} ===", file=salida)
+    bloqueo = _adquirir_bloqueo(engine, lock_timeout)
+    if bloqueo is None:
+        fallido = "bloqueo"
+        omision = f"Otra ejecución del pipeline retuvo el bloqueo más de {lock_timeout} s"
+        print(omision, file=salida)
+    try:
+        for paso in pasos:
+            registros.append(_ejecutar_paso(engine, contexto, ejecucion_id, paso, omision))
+            if registros[-1]["estado"] == "ERROR":
+                fallido = paso
+                omision = f"No se ejecutó porque falló el paso {paso}"
+    finally:
+        if bloqueo is not None:
+            _liberar_bloqueo(bloqueo)
+
+    print("\n--- Resumen del Pipeline ---", file=salida)
+    for registro in registros:
+        filas = "-" if registro["filas"] is None else registro["filas"]
+        print(f"{registro['paso']:<14}{registro['estado']:<10}{registro['segundos']:>9.2f} s  "
+              f"filas: {filas}. {registro['mensaje']}", file=salida)
+    print(f"Tiempo total: {sum(r['segundos'] for r in registros):.2f} s", file=salida)
+    return {"ejecucion": ejecucion_id, "pasos": registros, "contexto": contexto, "ok": fallido is None}
+
+
+# --- Ejecución única dentro del proceso (app): las solicitudes concurrentes se agrupan ---
+_estado_lock = threading.Lock()
+_en_curso = None    # solicitud que se está ejecutando
+_pendiente = None   # única solicitud en cola, que agrupa las que llegan durante _en_curso
+
+
+def _ordenar_pasos(pasos):
+    return [paso for paso in PASOS if paso in set(pasos)]
+
+
+def _nueva_solicitud(engine, db_config, pasos, hechos_completo, argv_carga, capturar_salida, reentrenar):
+    return {"engine": engine, "db_config": db_config, "pasos": _ordenar_pasos(pasos),
+            "hechos_completo": hechos_completo, "argv_carga": argv_carga, "capturar_salida": capturar_salida,
+            "reentrenar": reentrenar, "solicitudes": 1, "future": Future()}
+
+
+def _ejecutar_solicitud(solicitud):
+    global _en_curso, _pendiente
+    try:
+        # Escritor propio de esta ejecución: redirect_stdout cambiaría sys.stdout para todo el proceso
+        salida = io.StringIO() if solicitud["capturar_salida"] else None
+        resultado = run_pipeline(engine=solicitud["engine"], db_config=solicitud["db_config"],
+                                 pasos=solicitud["pasos"], hechos_completo=solicitud["hechos_completo"],
+                                 argv_carga=solicitud["argv_carga"], reentrenar=solicitud["reentrenar"],
+                                 salida=salida)
+        resultado["salida"] = salida.getvalue() if salida is not None else ""
+        resultado["solicitudes"] = solicitud["solicitudes"]
+        solicitud["future"].set_result(resultado)
+    except BaseException as e:
+        solicitud["future"].set_exception(e)
+    finally:
+        with _estado_lock:
+            _en_curso, _pendiente = _pendiente, None
+            siguiente = _en_curso
+        if siguiente is not None:
+            _iniciar(siguiente)
+
+
+def _iniciar(solicitud):
+    threading.Thread(target=_ejecutar_solicitud, args=(solicitud,), name="pipeline", daemon=True).start()
+
+
+def solicitar_pipeline(engine=None, db_config=None, pasos=PASOS, hechos_completo=False, argv_carga=None,
+                       capturar_salida=False, reentrenar=False):
+    """
+    Pide una ejecución del pipeline sin duplicar trabajo entre usuarios concurrentes.
+    Devuelve (future, estado), donde future.result() es el resultado de run_pipeline
+    (con la salida impresa en "salida" si capturar_salida) y estado es:
+    - "iniciada": no había ninguna ejecución y se lanzó esta;
+    - "en_curso": la ejecución actual ya cubre los pasos pedidos y se comparte su resultado;
+    - "encolada": se agregó a la única ejecución en cola, que une los pasos de todas
+      las solicitudes recibidas mientras tanto y empieza al terminar la actual.
+    """
+    global _en_curso, _pendiente
+    with _estado_lock:
+        if _en_curso is None:
+            _en_curso = _nueva_solicitud(engine, db_config, pasos, hechos_completo, argv_carga, capturar_salida,
+                                         reentrenar)
+            solicitud, estado = _en_curso, "iniciada"
+        elif (set(pasos) <= set(_en_curso["pasos"]) and (_en_curso["hechos_completo"] or not hechos_completo)
+              and (_en_curso["reentrenar"] or not reentrenar)):
+            _en_curso["solicitudes"] += 1
+            return _en_curso["future"], "en_curso"
+        else:
+            if _pendiente is None:
+                _pendiente = _nueva_solicitud(engine, db_config, pasos, hechos_completo, argv_carga, capturar_salida,
+                                              reentrenar)
+            else:
+                _pendiente["pasos"] = _ordenar_pasos(set(_pendiente["pasos"]) | set(pasos))
+                _pendiente["hechos_completo"] = _pendiente["hechos_completo"] or hechos_completo
+                _pendiente["reentrenar"] = _pendiente["reentrenar"] or reentrenar
+                _pendiente["solicitudes"] += 1
+            return _pendiente["future"], "encolada"
+    _iniciar(solicitud)
+    return solicitud["future"], estado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ejecuta el proceso completo en un solo proceso.')
+    parser.add_argument('--steps', nargs='+', choices=PASOS, default=list(PASOS),
+                        help='Pasos a ejecutar, en el orden del pipeline.')
+    parser.add_argument('--full-facts', action='store_true',
+                        help='Reconstruye toda la tabla de hechos en lugar de la carga incremental.')
+    parser.add_argument('--force-retrain', action='store_true',
+                        help='Entrena de nuevo todos los modelos de predicción aunque haya modelos guardados.')
+    parser.add_argument('--lock-timeout', type=int, default=DEFAULT_LOCK_TIMEOUT,
+                        help='Segundos a esperar si otra ejecución del pipeline tiene el bloqueo.')
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    db_config = db_config_from_env()
+    if not all(db_config.values()):
+        print("Error: Faltan variables de entorno para la base de datos en el archivo .env", file=sys.stderr)
+        sys.exit(1)
+
+    pasos = [paso for paso in PASOS if paso in args.steps]
+    resultado = run_pipeline(db_config=db_config, pasos=pasos, hechos_completo=args.full_facts,
+                             lock_timeout=args.lock_timeout, reentrenar=args.force_retrain)
+    if not resultado["ok"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
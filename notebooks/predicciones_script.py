@@ -1,8 +1,11 @@
 # generación de predicción por tipo de vehículo y tipo de mantenimiento
+import argparse
+import concurrent.futures
+import time
 import pandas as pd
 import numpy as np
 from sklearn.ensemble import RandomForestRegressor
-from sklearn.metrics import r2_score
+from sklearn.metrics import mean_absolute_error, r2_score
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
@@ -12,40 +15,51 @@ from pyecharts.charts import Bar, Line
 import os
 from dotenv import load_dotenv
 
+try:
+    from notebooks.almacen_modelos import DEFAULT_MODELOS_DIR, DEFAULT_MODELOS_MAX_MB, AlmacenModelos, huella_datos
+    from notebooks.analitica import leer_hechos_analitica
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from almacen_modelos import DEFAULT_MODELOS_DIR, DEFAULT_MODELOS_MAX_MB, AlmacenModelos, huella_datos
+    from analitica import leer_hechos_analitica
+
+# Columnas de Hechos_Analitica que usan los modelos
+COLUMNAS_ENTRENAMIENTO = ['NombreVehiculo', 'Categoria', 'TipoMatricula', 'IdentificacionTercero',
+                          'TipoMantenimiento', 'Mes', 'Costo', 'Registros']
+
 # --- Conexión a la Base de Datos ---
-def get_db_engine(db_config):
+def get_db_engine(db_config, salida=None):
     try:
         engine = create_engine(
             f"mysql+mysqlconnector://{db_config['user']}:{db_config['password']}@{db_config['host']}:{db_config['port']}/{db_config['database']}"
         )
         return engine
     except Exception as e:
-        print(f"Error al crear el motor de base de datos: {e}")
+        print(f"Error al crear el motor de base de datos: {e}", file=salida)
         return None
 
 # --- Creación de Gráficos Pyecharts ---
-def create_pyechart(df, title, r2_score_val):
+def create_pyechart(df, title, r2_score_val, salida=None):
     try:
-        print(f"Creando gráfico para: {title}")
-        print(f"Columnas en DataFrame: {list(df.columns)}")
-        print(f"Muestra de datos:\n{df.head()}")
+        print(f"Creando gráfico para: {title}", file=salida)
+        print(f"Columnas en DataFrame: {list(df.columns)}", file=salida)
+        print(f"Muestra de datos:\n{df.head()}", file=salida)
         
         if 'Fecha' not in df.columns:
-            print("ERROR: Columna 'Fecha' no encontrada en el DataFrame")
+            print("ERROR: Columna 'Fecha' no encontrada en el DataFrame", file=salida)
             return None
             
         if 'Origen' not in df.columns:
-            print("ERROR: Columna 'Origen' no encontrada en el DataFrame")
+            print("ERROR: Columna 'Origen' no encontrada en el DataFrame", file=salida)
             return None
             
         if 'Costo' not in df.columns:
-            print("ERROR: Columna 'Costo' no encontrada en el DataFrame")
+            print("ERROR: Columna 'Costo' no encontrada en el DataFrame", file=salida)
             return None
         
         # Verificar datos para debugging
-        print(f"Tipos de datos en el DataFrame:\n{df.dtypes}")
-        print(f"Valores únicos de 'Origen': {df['Origen'].unique()}")
-        print(f"Rango de fechas en datos: {df['Fecha'].min()} a {df['Fecha'].max()}")
+        print(f"Tipos de datos en el DataFrame:\n{df.dtypes}", file=salida)
+        print(f"Valores únicos de 'Origen': {df['Origen'].unique()}", file=salida)
+        print(f"Rango de fechas en datos: {df['Fecha'].min()} a {df['Fecha'].max()}", file=salida)
         
         # Convertir fechas a datetime si no lo son ya
         df['Fecha'] = pd.to_datetime(df['Fecha'])
@@ -54,12 +68,12 @@ def create_pyechart(df, title, r2_score_val):
         df_hist = df[df['Origen'] == 'Histórico'].sort_values('Fecha')
         df_pred = df[df['Origen'] == 'Predicción'].sort_values('Fecha')
         
-        print(f"  - Histórico: {len(df_hist)} registros, rango: {df_hist['Fecha'].min() if not df_hist.empty else 'N/A'} a {df_hist['Fecha'].max() if not df_hist.empty else 'N/A'}")
-        print(f"  - Predicción: {len(df_pred)} registros, rango: {df_pred['Fecha'].min() if not df_pred.empty else 'N/A'} a {df_pred['Fecha'].max() if not df_pred.empty else 'N/A'}")
+        print(f"  - Histórico: {len(df_hist)} registros, rango: {df_hist['Fecha'].min() if not df_hist.empty else 'N/A'} a {df_hist['Fecha'].max() if not df_hist.empty else 'N/A'}", file=salida)
+        print(f"  - Predicción: {len(df_pred)} registros, rango: {df_pred['Fecha'].min() if not df_pred.empty else 'N/A'} a {df_pred['Fecha'].max() if not df_pred.empty else 'N/A'}", file=salida)
 
         # Si no hay datos ni históricos ni de predicción, devuelve un gráfico vacío con un mensaje.
         if df_hist.empty and df_pred.empty:
-            print("  - No hay datos para graficar")
+            print("  - No hay datos para graficar", file=salida)
             return (
                 Line(init_opts=opts.InitOpts(height="500px", theme="white"))
                 .set_global_opts(
@@ -71,7 +85,7 @@ def create_pyechart(df, title, r2_score_val):
         # Combinar todos los datos en un único DataFrame para el eje X
         all_dates = pd.concat([df_hist['Fecha'], df_pred['Fecha']]).drop_duplicates().sort_values()
         all_dates_formatted = all_dates.dt.strftime('%Y-%m').tolist()
-        print(f"  - Todas las fechas para el eje X: {all_dates_formatted}")
+        print(f"  - Todas las fechas para el eje X: {all_dates_formatted}", file=salida)
         
         # Preparar datos para el gráfico con manejo de excepciones
         df_hist_values = []
@@ -83,7 +97,7 @@ def create_pyechart(df, title, r2_score_val):
                 hist_value = df_hist[df_hist['Fecha'] == date]['Costo'].sum() if date in df_hist['Fecha'].values else None
                 df_hist_values.append(round(hist_value, 2) if hist_value is not None else None)
             except Exception as e:
-                print(f"Error procesando dato histórico para fecha {date}: {e}")
+                print(f"Error procesando dato histórico para fecha {date}: {e}", file=salida)
                 df_hist_values.append(None)
             
             try:
@@ -91,11 +105,11 @@ def create_pyechart(df, title, r2_score_val):
                 pred_value = df_pred[df_pred['Fecha'] == date]['Costo'].sum() if date in df_pred['Fecha'].values else None
                 df_pred_values.append(round(pred_value, 2) if pred_value is not None else None)
             except Exception as e:
-                print(f"Error procesando dato de predicción para fecha {date}: {e}")
+                print(f"Error procesando dato de predicción para fecha {date}: {e}", file=salida)
                 df_pred_values.append(None)
         
         subtitle = f"R² = {r2_score_val:.4f}"
-        print(f"Datos procesados para gráfico:\n - Históricos: {df_hist_values}\n - Predicción: {df_pred_values}")
+        print(f"Datos procesados para gráfico:\n - Históricos: {df_hist_values}\n - Predicción: {df_pred_values}", file=salida)
 
         # Crear el objeto Line chart con manejo de errores
         try:
@@ -130,394 +144,442 @@ def create_pyechart(df, title, r2_score_val):
             )
             return line_chart
         except Exception as e:
-            print(f"Error al crear el objeto PyEcharts: {e}")
+            print(f"Error al crear el objeto PyEcharts: {e}", file=salida)
             import traceback
             traceback.print_exc()
             return None
     except Exception as e:
-        print(f"Error general en create_pyechart: {e}")
+        print(f"Error general en create_pyechart: {e}", file=salida)
         import traceback
         traceback.print_exc()
         return None
 
+# --- Agregación mensual desde Hechos_Analitica ---
+def moda_por_grupo(df, claves, columnas, peso=None):
+    """
+    Valor más frecuente de cada una de `columnas` en cada grupo de `claves`, sin
+    llamar a Series.mode por grupo: se cuentan los valores con un groupby sobre
+    claves + columna y se queda el primero al ordenar. Con `peso` se suman los valores
+    de esa columna (p. ej. Registros) en lugar de contar filas. Los empates se
+    resuelven con el menor valor, igual que Series.mode()[0]. Devuelve un DataFrame
+    indexado por las claves con una columna por atributo.
+    """
+    resultado = {}
+    for columna in columnas:
+        agrupado = df.groupby(claves + [columna], observed=True)
+        conteos = (agrupado[peso].sum() if peso else agrupado.size()).rename('_conteo').reset_index()
+        conteos = conteos.sort_values(claves + ['_conteo', columna],
+                                      ascending=[True] * len(claves) + [False, True])
+        resultado[columna] = conteos.drop_duplicates(claves).set_index(claves)[columna]
+    return pd.DataFrame(resultado)
+
+def resumir_por_mes(df, claves, atributos):
+    """
+    Agrupa filas de Hechos_Analitica por serie (`claves`) y mes en una sola pasada:
+    suma el costo (Debito) y los registros, y toma para cada atributo el valor más
+    frecuente del mes. Devuelve una fila por serie y mes con las claves, AñoMes,
+    FechaElaboracion, Año, Mes, Debito, Registros y los atributos.
+    """
+    grupos = claves + ['Mes']
+    agrupado = df.groupby(grupos, observed=True)[['Costo', 'Registros']].sum().rename(columns={'Costo': 'Debito'})
+    agrupado = agrupado.join(moda_por_grupo(df, grupos, atributos, peso='Registros'))
+    agrupado = agrupado.reset_index()
+    agrupado.insert(len(claves), 'AñoMes', agrupado.pop('Mes').dt.to_period('M'))
+    agrupado['FechaElaboracion'] = agrupado['AñoMes'].dt.to_timestamp()
+    agrupado['Año'] = agrupado['FechaElaboracion'].dt.year
+    agrupado['Mes'] = agrupado['FechaElaboracion'].dt.month
+    return agrupado
+
+def particionar_series(mensual, claves):
+    """
+    Ordena el resumen mensual una vez por las claves y devuelve (clave, filas) por
+    serie. Cada serie es un tramo contiguo, así que se toma con iloc sin copiar datos.
+    """
+    mensual = mensual.sort_values(claves + ['FechaElaboracion'], ignore_index=True)
+    tamanos = mensual.groupby(claves, observed=True, sort=False).size()
+    finales = tamanos.cumsum()
+    for clave, inicio, final in zip(tamanos.index, finales - tamanos, finales):
+        yield clave, mensual.iloc[inicio:final]
+
+# --- Publicación de predicciones con tabla sombra ---
+# Sufijos de la tabla en construcción y de la versión publicada anteriormente
+SUFIJO_NUEVA = "_nueva"
+SUFIJO_ANTERIOR = "_anterior"
+
+def publicar_predicciones(engine, tabla, df):
+    """
+    Escribe df en una tabla sombra con la misma estructura (índices y particiones
+    incluidos) y la publica con un único RENAME TABLE atómico. Mientras se escribe,
+    los lectores siguen viendo la versión completa anterior, que queda en
+    <tabla>_anterior para poder restaurarla al instante.
+    """
+    nueva, anterior = f"{tabla}{SUFIJO_NUEVA}", f"{tabla}{SUFIJO_ANTERIOR}"
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {nueva}"))
+        connection.execute(text(f"CREATE TABLE {nueva} LIKE {tabla}"))
+    try:
+        df.to_sql(nueva, engine, if_exists='append', index=False)
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {anterior}"))
+            connection.execute(text(f"RENAME TABLE {tabla} TO {anterior}, {nueva} TO {tabla}"))
+    except Exception:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {nueva}"))
+        raise
+
+def restaurar_predicciones(engine, tabla):
+    """Intercambia la tabla publicada con <tabla>_anterior (deshace la última publicación)."""
+    anterior, intercambio = f"{tabla}{SUFIJO_ANTERIOR}", f"{tabla}{SUFIJO_NUEVA}"
+    with engine.begin() as connection:
+        connection.execute(text(f"DROP TABLE IF EXISTS {intercambio}"))
+        connection.execute(text(f"RENAME TABLE {tabla} TO {intercambio}, {anterior} TO {tabla}, "
+                                f"{intercambio} TO {anterior}"))
+
+# --- Entrenamiento por serie (se reparte entre procesos) ---
+# Series que se modelan: claves de la serie, atributos (valor más frecuente del mes) y título
+SERIES = {
+    'by_vehicle': (['NombreVehiculo', 'TipoMantenimiento'], ['Categoria', 'TipoMatricula', 'IdentificacionTercero'],
+                   'Vehículo: {NombreVehiculo} - Tipo: {TipoMantenimiento}'),
+    'by_type': (['TipoMantenimiento'], ['Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero'],
+                'Tipo de Mantenimiento: {TipoMantenimiento}'),
+}
+# Mismas características, preprocesador y modelo que el notebook
+FEATURES = ['Año', 'Mes', 'TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']
+CATEGORICAS = ['TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']
+PARAMETROS_MODELO = {'n_estimators': 100, 'random_state': 42}
+# Meses finales de cada serie que se reservan al comparar los modos por serie y global
+DEFAULT_MESES_PRUEBA = 3
+
+def _crear_modelo(categoricas=CATEGORICAS, n_jobs=None):
+    preprocessor = ColumnTransformer([
+        ('num', StandardScaler(), ['Año', 'Mes']),
+        ('cat', OneHotEncoder(handle_unknown='ignore'), categoricas)
+    ])
+    return Pipeline([
+        ('preprocessing', preprocessor),
+        ('regresion', RandomForestRegressor(**PARAMETROS_MODELO, n_jobs=n_jobs))
+    ])
+
+def preparar_serie(historico, fijos):
+    """
+    Arma la tarea de entrenamiento de una serie a partir de su resumen mensual: el
+    histórico y las características de los 12 meses siguientes, que toman de `fijos`
+    las claves de la serie y el valor más frecuente de cada atributo. None si hay
+    menos de 2 meses.
+    """
+    if len(historico) < 2:  # Necesitamos al menos 2 puntos
+        return None
+
+    # Usamos la última fecha REAL de los datos históricos, no la fecha actual del sistema
+    ultima_fecha = historico['FechaElaboracion'].max()
+    fechas_futuras = pd.date_range(start=ultima_fecha + pd.DateOffset(months=1), periods=12, freq='MS')
+    df_futuro = pd.DataFrame({'Año': fechas_futuras.year, 'Mes': fechas_futuras.month, **fijos})
+
+    return {'historico': historico, 'X': historico[FEATURES], 'y': historico['Debito'],
+            'X_futuro': df_futuro[FEATURES], 'fechas_futuras': fechas_futuras}
+
+def entrenar_serie(tarea):
+    """
+    Entrena el modelo de una serie; se ejecuta en un proceso del pool. Devuelve solo
+    datos serializables (y el modelo ajustado si se pidió, para guardarlo en el almacén).
+    """
+    inicio = time.perf_counter()
+    pipeline = _crear_modelo()
+    pipeline.fit(tarea['X'], tarea['y'])
+    y_pred = pipeline.predict(tarea['X'])
+    resultado = {'y_pred': y_pred, 'r2': r2_score(tarea['y'], y_pred),
+                 'future_preds': pipeline.predict(tarea['X_futuro']), 'segundos': time.perf_counter() - inicio}
+    if tarea.get('devolver_modelo'):
+        resultado['modelo'] = pipeline
+    return resultado
+
+def entrenar_series(tareas, workers, devolver_modelo=False):
+    """
+    Entrena todas las series en un pool de `workers` procesos. executor.map conserva
+    el orden de las tareas, así que el resultado es determinista sin importar qué
+    proceso termine antes. Devuelve (resultados, segundos de reloj).
+    """
+    inicio = time.perf_counter()
+    entradas = [{'X': tarea['X'], 'y': tarea['y'], 'X_futuro': tarea['X_futuro'], 'devolver_modelo': devolver_modelo}
+                for tarea in tareas]
+    if workers == 1:
+        resultados = [entrenar_serie(entrada) for entrada in entradas]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            resultados = list(executor.map(entrenar_serie, entradas))
+    return resultados, time.perf_counter() - inicio
+
+def buscar_modelos_guardados(tareas, almacen):
+    """
+    Calcula la huella de cada serie y, si el almacén tiene su modelo, predice los meses
+    futuros con él. Devuelve la lista de resultados (None en las series por entrenar).
+    """
+    resultados = []
+    for tarea in tareas:
+        tarea['huella'] = huella_datos((tarea['X'], tarea['y']), {**PARAMETROS_MODELO, 'features': FEATURES})
+        guardado = almacen.get(tarea['huella']) if almacen is not None else None
+        if guardado is None:
+            resultados.append(None)
+            continue
+        modelo, r2 = guardado
+        resultados.append({'y_pred': modelo.predict(tarea['X']), 'r2': r2,
+                           'future_preds': modelo.predict(tarea['X_futuro']), 'segundos': 0.0, 'en_cache': True})
+    return resultados
+
+def entrenar_global(tareas, n_jobs):
+    """
+    Modo global: un solo modelo para todas las series, entrenado sobre sus históricos
+    concatenados con la identidad de la serie como característica adicional. Los meses
+    a predecir de todas las series salen de un único predict. Devuelve un resultado
+    por serie (mismo formato que entrenar_serie) y los segundos de reloj.
+    """
+    inicio = time.perf_counter()
+    X = pd.concat([tarea['X'].assign(Serie=tarea['titulo']) for tarea in tareas], ignore_index=True)
+    y = pd.concat([tarea['y'] for tarea in tareas], ignore_index=True)
+    X_futuro = pd.concat([tarea['X_futuro'].assign(Serie=tarea['titulo']) for tarea in tareas], ignore_index=True)
+    modelo = _crear_modelo(CATEGORICAS + ['Serie'], n_jobs=n_jobs)
+    modelo.fit(X, y)
+    y_pred = np.split(modelo.predict(X), np.cumsum([len(tarea['X']) for tarea in tareas])[:-1])
+    future_preds = np.split(modelo.predict(X_futuro), np.cumsum([len(tarea['X_futuro']) for tarea in tareas])[:-1])
+    segundos = time.perf_counter() - inicio
+    resultados = [{'y_pred': pred, 'r2': r2_score(tarea['y'], pred), 'future_preds': futuro, 'segundos': 0.0}
+                  for tarea, pred, futuro in zip(tareas, y_pred, future_preds)]
+    return resultados, segundos
+
+def comparar_modos(tareas, meses_prueba, workers, salida=None):
+    """
+    Compara los modos por serie y global fuera de muestra: se reservan los últimos
+    `meses_prueba` meses de cada serie, ambos modos se entrenan desde cero con el resto
+    (sin el almacén de modelos) y se miden R² y MAE sobre los meses reservados. Los
+    tiempos son de reloj en los dos casos, con los mismos núcleos disponibles.
+    """
+    particiones = [{'titulo': tarea['titulo'],
+                    'X': tarea['X'].iloc[:-meses_prueba], 'y': tarea['y'].iloc[:-meses_prueba],
+                    'X_futuro': tarea['X'].iloc[-meses_prueba:], 'y_prueba': tarea['y'].iloc[-meses_prueba:]}
+                   for tarea in tareas if len(tarea['X']) >= meses_prueba + 2]
+    print(f"\n--- Comparación de modos: {len(particiones)} series, últimos {meses_prueba} meses reservados ---", file=salida)
+    if not particiones:
+        print("Ninguna serie tiene meses suficientes para reservar; no se compara.", file=salida)
+        return
+    y_prueba = np.concatenate([particion['y_prueba'].to_numpy() for particion in particiones])
+    procesos = max(1, min(workers, len(particiones)))
+    por_serie, segundos_por_serie = entrenar_series(particiones, procesos)
+    globales, segundos_global = entrenar_global(particiones, workers)
+    for modo, resultados, segundos, detalle in (
+            ('Por serie', por_serie, segundos_por_serie, f"{len(particiones)} modelos con {procesos} procesos"),
+            ('Global', globales, segundos_global, f"1 modelo con {workers} núcleos")):
+        y_pred = np.concatenate([resultado['future_preds'] for resultado in resultados])
+        print(f"{modo:<12}{detalle}: {segundos:.2f} s de reloj, R² {r2_score(y_prueba, y_pred):.4f}, "
+              f"MAE {mean_absolute_error(y_prueba, y_pred):,.0f}", file=salida)
+
+def comparar_con_guardados(tareas, resultados, segundos_global, workers, almacen, salida=None):
+    """
+    Comparación que acompaña por defecto al modo global, sin entrenar modelos por serie:
+    se usan los de las series que ya tienen uno en el almacén para sus datos actuales
+    (de una ejecución por serie anterior) y se miden R² y MAE de ambos modos sobre su
+    histórico. Es una medida en muestra; comparar_modos entrena los dos fuera de muestra.
+    """
+    guardados = buscar_modelos_guardados(tareas, almacen) if almacen is not None else [None] * len(tareas)
+    pares = [(tarea, guardado, resultado) for tarea, guardado, resultado in zip(tareas, guardados, resultados)
+             if guardado is not None]
+    print(f"\n--- Comparación de modos: {len(pares)} de {len(tareas)} series con modelo por serie guardado ---",
+          file=salida)
+    if not pares:
+        motivo = "Almacén de modelos desactivado" if almacen is None else "Sin modelos por serie guardados para estos datos"
+        print(f"{motivo}; --compare-modes los entrena para comparar.", file=salida)
+        return
+    y = np.concatenate([tarea['y'].to_numpy() for tarea, _, _ in pares])
+    segundos = [almacen.indice[tarea['huella']].get('segundos') for tarea, _, _ in pares]
+    detalle_serie = (f"{sum(segundos):.2f} s de entrenamiento acumulado" if None not in segundos
+                     else "tiempo de entrenamiento no registrado")
+    for modo, y_pred, detalle in (
+            ('Por serie', [guardado['y_pred'] for _, guardado, _ in pares], f"{len(pares)} modelos, {detalle_serie}"),
+            ('Global', [resultado['y_pred'] for _, _, resultado in pares],
+             f"1 modelo, {segundos_global:.2f} s de reloj con {workers} núcleos")):
+        y_pred = np.concatenate(y_pred)
+        print(f"{modo:<12}{detalle}: R² {r2_score(y, y_pred):.4f}, MAE {mean_absolute_error(y, y_pred):,.0f}",
+              file=salida)
+    print("Medido sobre el histórico (en muestra); --compare-modes compara fuera de muestra.", file=salida)
+
+def _imprimir_tiempos(tareas, resultados, segundos_reloj, workers, salida=None):
+    print("\n--- Tiempos de entrenamiento por serie ---", file=salida)
+    for tarea, resultado in zip(tareas, resultados):
+        tiempo = "modelo guardado" if resultado.get('en_cache') else f"{resultado['segundos']:.2f} s"
+        print(f"{tarea['titulo']:<80}{tiempo:>16}", file=salida)
+    entrenados = [resultado for resultado in resultados if not resultado.get('en_cache')]
+    if not entrenados:
+        print(f"Las {len(resultados)} series usaron su modelo guardado; no hubo entrenamiento.", file=salida)
+        return
+    segundos_series = sum(resultado['segundos'] for resultado in entrenados)
+    aceleracion = f" (aceleración x{segundos_series / segundos_reloj:.2f})" if segundos_reloj > 0 else ""
+    print(f"{len(entrenados)} series entrenadas ({len(resultados) - len(entrenados)} con modelo guardado): "
+          f"{segundos_series:.2f} s de entrenamiento en {segundos_reloj:.2f} s de reloj "
+          f"con {workers} procesos{aceleracion}", file=salida)
+
 # --- Función Principal de Predicción y Actualización ---
-def get_prediction_charts_and_update_db(db_config):
-    engine = get_db_engine(db_config)
+def get_prediction_charts_and_update_db(db_config, engine=None, workers=None, forzar_reentrenamiento=False,
+                                        modelos_dir=DEFAULT_MODELOS_DIR, modelos_max_mb=DEFAULT_MODELOS_MAX_MB,
+                                        modelo_global=False, comparar=False, meses_prueba=DEFAULT_MESES_PRUEBA,
+                                        salida=None):
+    if engine is None:
+        engine = get_db_engine(db_config, salida)
     if not engine:
         return {}
 
     try:
-        df = pd.read_sql("SELECT * FROM Hechos_Mantenimiento", engine)
-        df['FechaElaboracion'] = pd.to_datetime(df['FechaElaboracion'])
-        df['Debito'] = pd.to_numeric(df['Debito'], errors='coerce')
-        df.dropna(subset=['FechaElaboracion', 'Debito'], inplace=True)
-        df['Año'] = df['FechaElaboracion'].dt.year
+        # Un registro por vehículo, tipo, mes y tercero: el volumen depende de los meses, no de las facturas
+        df = leer_hechos_analitica(engine, COLUMNAS_ENTRENAMIENTO)
+        df.dropna(subset=['Mes', 'Costo'], inplace=True)
     except Exception as e:
-        print(f"Error al cargar datos: {e}")
+        print(f"Error al cargar datos: {e}", file=salida)
         return {}
 
-    # Inicializar diccionario de gráficos
     charts = {'by_vehicle': {}, 'by_type': {}}
-    print(f"\n=== Iniciando generación de gráficos y predicciones ===\nDiccionario charts inicializado: {charts.keys()}")
-    all_preds_vehiculo = []
-
-    # --- 1. Predicciones y Modelos por Vehículo y Tipo ---
-    # Usamos exactamente la misma implementación del notebook
-    for vehiculo in df['NombreVehiculo'].unique():
-        df_vehiculo = df[df['NombreVehiculo'] == vehiculo]
-        for tipo in df_vehiculo['TipoMantenimiento'].unique():
-            df_tipo = df_vehiculo[df_vehiculo['TipoMantenimiento'] == tipo].copy()
-            if len(df_tipo) < 4:  # No entrenar si hay muy pocos datos
-                continue
-
-            # Agrupar por mes exactamente como en el notebook
-            df_tipo['AñoMes'] = df_tipo['FechaElaboracion'].dt.to_period('M')
-            df_hist_grouped = df_tipo.groupby('AñoMes').agg({
-                'Debito': 'sum',
-                'Categoria': lambda x: x.mode()[0] if not x.empty else None,
-                'TipoMatricula': lambda x: x.mode()[0] if not x.empty else None,
-                'IdentificacionTercero': lambda x: x.mode()[0] if not x.empty else None
-            }).reset_index()
-
-            # Convertir periodo a timestamp como en el notebook
-            df_hist_grouped['FechaElaboracion'] = df_hist_grouped['AñoMes'].dt.to_timestamp()
-            df_hist_grouped['Año'] = df_hist_grouped['FechaElaboracion'].dt.year
-            df_hist_grouped['Mes'] = df_hist_grouped['FechaElaboracion'].dt.month
-            df_hist_grouped['TipoMantenimiento'] = tipo
-            df_hist_grouped['NombreVehiculo'] = vehiculo
-
-            if len(df_hist_grouped) < 2:  # Necesitamos al menos 2 puntos
+    print(f"\n=== Iniciando generación de gráficos y predicciones ===", file=salida)
+
+    # --- 1. Preparar las series: por vehículo y tipo, y por tipo de mantenimiento (agregado) ---
+    # Claves categóricas: una sola agrupación mensual por nivel y un corte por serie
+    for columna in ('NombreVehiculo', 'TipoMantenimiento'):
+        df[columna] = df[columna].astype('category')
+    tareas = []
+    for grupo, (claves, atributos, titulo) in SERIES.items():
+        mensual = resumir_por_mes(df, claves, atributos)
+        # Atributos de los meses futuros: el valor más frecuente entre los meses de cada serie
+        frecuentes = moda_por_grupo(mensual, claves, atributos).to_dict('index')
+        for clave, historico in particionar_series(mensual, claves):
+            fijos = dict(zip(claves, clave if isinstance(clave, tuple) else (clave,)))
+            if grupo == 'by_vehicle' and historico['Registros'].sum() < 4:  # No entrenar si hay muy pocos datos
                 continue
-
-            # Usar las mismas características que el notebook
-            X = df_hist_grouped[['Año', 'Mes', 'TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']]
-            y = df_hist_grouped['Debito']
-
-            # Mismo preprocesador que el notebook
-            preprocessor = ColumnTransformer([
-                ('num', StandardScaler(), ['Año', 'Mes']),
-                ('cat', OneHotEncoder(handle_unknown='ignore'), ['TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero'])
-            ])
-
-            # Mismo pipeline que el notebook
-            pipeline = Pipeline([
-                ('preprocessing', preprocessor),
-                ('regresion', RandomForestRegressor(n_estimators=100, random_state=42))
-            ])
-
-            # Entrenamiento y R² igual que el notebook
-            pipeline.fit(X, y)
-            y_pred = pipeline.predict(X)
-            r2 = r2_score(y, y_pred)
-
-            # Generar predicciones para los próximos 12 meses
-            ultima_fecha = df_hist_grouped['FechaElaboracion'].max()
-            print(f"Para {vehiculo} - {tipo}, última fecha histórica: {ultima_fecha}")
-            # Asegurarse de que usamos la última fecha REAL, no la fecha actual del sistema
-            # Generar fechas exactamente como en el notebook original
-            fechas_futuras = pd.date_range(start=ultima_fecha + pd.DateOffset(months=1), periods=12, freq='MS')
-
-            # Valores más frecuentes para predicciones futuras
-            categoria = df_hist_grouped['Categoria'].mode()[0] if not df_hist_grouped['Categoria'].empty else None
-            tipomatricula = df_hist_grouped['TipoMatricula'].mode()[0] if not df_hist_grouped['TipoMatricula'].empty else None
-            tercero = df_hist_grouped['IdentificacionTercero'].mode()[0] if not df_hist_grouped['IdentificacionTercero'].empty else None
-
-            # DataFrame futuro
-            df_futuro = pd.DataFrame({
-                'Año': fechas_futuras.year,
-                'Mes': fechas_futuras.month,
-                'TipoMantenimiento': tipo,
-                'Categoria': categoria,
-                'TipoMatricula': tipomatricula,
-                'NombreVehiculo': vehiculo,
-                'IdentificacionTercero': tercero,
-                'FechaElaboracion': fechas_futuras
-            })
-
-            # Predecir con las mismas características
-            X_futuro = df_futuro[['Año', 'Mes', 'TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']]
-            future_preds = pipeline.predict(X_futuro)
-
-            # DataFrame de resultados para históricos
-            df_hist_result = pd.DataFrame({
-                'NombreVehiculo': vehiculo,
-                'TipoMantenimiento': tipo,
-                'Fecha': df_hist_grouped['FechaElaboracion'],
-                'Costo': df_hist_grouped['Debito'],
-                'Prediccion': y_pred,
-                'R2': r2,
-                'Origen': 'Histórico'
-            })
-            
-            # DataFrame de resultados para predicciones
-            df_pred_result = pd.DataFrame({
-                'NombreVehiculo': vehiculo,
-                'TipoMantenimiento': tipo,
-                'Fecha': fechas_futuras,
-                'Costo': future_preds,
-                'Prediccion': future_preds,
-                'R2': r2,
-                'Origen': 'Predicción'
-            })
-            
-            # Unir resultados históricos y predicciones
-            df_resultado = pd.concat([df_hist_result, df_pred_result])
-            all_preds_vehiculo.append(df_pred_result)
-            
-            # Preparar datos para el gráfico
-            df_plot = df_resultado[['Fecha', 'Costo', 'Origen']]
-            
-            # Crear y guardar gráfico
-            try:
-                # Verificar que el diccionario existe
-                if 'by_vehicle' not in charts:
-                    print(f"Recreando diccionario charts['by_vehicle'] porque no existe")
-                    charts['by_vehicle'] = {}
-                
-                title = f'Vehículo: {vehiculo} - Tipo: {tipo}'
-                print(f"\nCreando gráfico por vehículo para {title}")
-                print(f"Datos para gráfico: {len(df_plot)} filas")
-                print(f"Columnas: {df_plot.columns.tolist()}")
-                print(f"Primeras filas:\n{df_plot.head()}")
-                
-                chart = create_pyechart(df_plot, title, r2)
-                if chart:
-                    # Guardar en el diccionario con un nombre único
-                    key = f'Vehículo: {vehiculo} - Tipo: {tipo}'
-                    charts['by_vehicle'][key] = chart
-                    print(f"Gráfico para '{key}' agregado correctamente")
-                    print(f"Total gráficos por vehículo: {len(charts['by_vehicle'])}")
-                    print(f"Claves actuales: {list(charts['by_vehicle'].keys())}")
-                else:
-                    print(f"ERROR: No se pudo crear el gráfico para {title}")
-            except Exception as e:
-                print(f"Error al crear/guardar gráfico de vehículo {vehiculo} tipo {tipo}: {e}")
-                import traceback
-                traceback.print_exc()
-
-    # --- 2. Almacenar todas las predicciones por vehículo en la BD ---
-    if all_preds_vehiculo:
-        df_pred_vehiculo_db = pd.concat(all_preds_vehiculo, ignore_index=True)
-        # Asegurar que las fechas se guardan en el formato correcto
-        df_pred_vehiculo_db['Fecha'] = df_pred_vehiculo_db['Fecha'].dt.strftime('%Y-%m-%d')
-        df_pred_vehiculo_db['Fecha'] = pd.to_datetime(df_pred_vehiculo_db['Fecha'])
-        print(f"Guardando {len(df_pred_vehiculo_db)} predicciones por vehículo. Rango de fechas: {df_pred_vehiculo_db['Fecha'].min()} a {df_pred_vehiculo_db['Fecha'].max()}")
-        
-        # Asegurarse de que todas las columnas necesarias están presentes
-        columns_to_save = ['NombreVehiculo', 'TipoMantenimiento', 'Fecha', 'Costo', 'Origen']
-        if 'R2' in df_pred_vehiculo_db.columns:
-            columns_to_save.append('R2')
-        
-        with engine.connect() as connection:
-            trans = connection.begin()
-            try:
-                # Mostrar la estructura de la tabla para debugging
-                table_info = pd.read_sql("DESCRIBE Predicciones_Vehiculo_Tipo", connection)
-                print("Estructura de la tabla:")
-                print(table_info)
-                
-                connection.execute(text("TRUNCATE TABLE Predicciones_Vehiculo_Tipo"))
-                df_pred_vehiculo_db[columns_to_save].to_sql('Predicciones_Vehiculo_Tipo', engine, if_exists='append', index=False)
-                trans.commit()
-                print("Predicciones por vehículo guardadas correctamente")
-            except Exception as e:
-                trans.rollback()
-                print(f"Error en la transacción de Vehículo/Tipo: {e}")
-
-    # --- 3. Predicciones y Gráficos por Tipo de Mantenimiento (Agregado) ---
-    print("\n" + "-"*50)
-    print("Generando predicciones por tipo de mantenimiento...")
-    tipos_mantenimiento = df['TipoMantenimiento'].unique()
-    print(f"Tipos de mantenimiento disponibles: {tipos_mantenimiento}")
-    
-    # Asegurar que el diccionario de gráficos tiene la estructura correcta
-    if 'by_type' not in charts:
-        charts['by_type'] = {}
-    
-    print(f"Estructura actual de charts: {list(charts.keys())}")
+            tarea = preparar_serie(historico, {**dict.fromkeys(atributos), **fijos, **frecuentes.get(clave, {})})
+            if tarea:
+                tarea.update(grupo=grupo, fijos=fijos, titulo=titulo.format(**fijos))
+                tareas.append(tarea)
+
+    # --- 2. Reutilizar los modelos de series sin cambios y entrenar el resto en paralelo ---
+    # En modo global las series por vehículo y tipo no tienen modelo propio
+    nucleos = workers or os.cpu_count() or 1
+    globales = [i for i, tarea in enumerate(tareas) if modelo_global and tarea['grupo'] == 'by_vehicle']
+    individuales = [i for i in range(len(tareas)) if i not in set(globales)]
+    resultados = [None] * len(tareas)
+    # modelos_dir=None desactiva el almacén; con forzar_reentrenamiento se entrena todo y se reemplaza
+    almacen = AlmacenModelos(modelos_dir, modelos_max_mb * 1024 * 1024, salida) if modelos_dir else None
+    guardados = buscar_modelos_guardados([tareas[i] for i in individuales], None if forzar_reentrenamiento else almacen)
+    for i, resultado in zip(individuales, guardados):
+        resultados[i] = resultado
+    por_entrenar = [i for i in individuales if resultados[i] is None]
+    # Un proceso por núcleo por defecto, nunca más que series
+    procesos = max(1, min(nucleos, len(por_entrenar) or 1))
+    print(f"Entrenando {len(por_entrenar)} de {len(individuales)} series con {procesos} procesos...", file=salida)
+    entrenados, segundos_reloj = entrenar_series([tareas[i] for i in por_entrenar], procesos,
+                                                 devolver_modelo=almacen is not None)
+    for i, resultado in zip(por_entrenar, entrenados):
+        resultados[i] = resultado
+        if almacen is not None:
+            almacen.put(tareas[i]['huella'], resultado.pop('modelo'), resultado['r2'], tareas[i]['titulo'],
+                        resultado['segundos'])
+    if almacen is not None:
+        eliminados = almacen.guardar()
+        print(f"Almacén de modelos: {len(almacen.indice)} modelos en {almacen.directorio}"
+              + (f" ({eliminados} desalojados por tamaño)" if eliminados else ""), file=salida)
+
+    if globales:
+        print(f"Entrenando un modelo global para {len(globales)} series por vehículo y tipo con {nucleos} núcleos...", file=salida)
+        resultados_globales, segundos_global = entrenar_global([tareas[i] for i in globales], nucleos)
+        for i, resultado in zip(globales, resultados_globales):
+            resultados[i] = resultado
+
+    # --- 3. Resultados y gráficos, en el mismo orden de las series ---
     os.makedirs("graficas_rf_agrupado", exist_ok=True)  # Crear directorio para gráficos
-    
-    all_preds_tipo = []
-    for tipo in df['TipoMantenimiento'].unique():
-        df_tipo = df[df['TipoMantenimiento'] == tipo].copy()
-        if df_tipo.empty:
-            continue
-
-        # Agrupar por mes exactamente como en el notebook
-        df_tipo['AñoMes'] = df_tipo['FechaElaboracion'].dt.to_period('M')
-        df_hist_grouped = df_tipo.groupby('AñoMes').agg({
-            'Debito': 'sum',
-            'Categoria': lambda x: x.mode()[0] if not x.empty else None,
-            'TipoMatricula': lambda x: x.mode()[0] if not x.empty else None,
-            'NombreVehiculo': lambda x: x.mode()[0] if not x.empty else None,
-            'IdentificacionTercero': lambda x: x.mode()[0] if not x.empty else None
-        }).reset_index()
-        
-        # Convertir periodo a timestamp
-        df_hist_grouped['FechaElaboracion'] = df_hist_grouped['AñoMes'].dt.to_timestamp()
-        df_hist_grouped['Año'] = df_hist_grouped['FechaElaboracion'].dt.year
-        df_hist_grouped['Mes'] = df_hist_grouped['FechaElaboracion'].dt.month
-        df_hist_grouped['TipoMantenimiento'] = tipo
-        
-        df_hist_grouped.dropna(subset=['Debito'], inplace=True)
-
-        if len(df_hist_grouped) < 2:
-            continue
-
-        # Entrenamiento del modelo exactamente como en el notebook
-        X = df_hist_grouped[['Año', 'Mes', 'TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']]
-        y = df_hist_grouped['Debito']
+    predicciones = {'by_vehicle': [], 'by_type': []}
+    for tarea, resultado in zip(tareas, resultados):
+        historico, r2 = tarea['historico'], resultado['r2']
+        print(f"{tarea['titulo']}: última fecha histórica {historico['FechaElaboracion'].max()}, R² = {r2:.4f}", file=salida)
 
-        # Mismo preprocesador que el notebook
-        preprocessor = ColumnTransformer([
-            ('num', StandardScaler(), ['Año', 'Mes']),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), ['TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero'])
-        ])
-        
-        pipeline = Pipeline([
-            ('preprocessing', preprocessor),
-            ('regresion', RandomForestRegressor(n_estimators=100, random_state=42))
-        ])
-        
-        pipeline.fit(X, y)
-        y_pred = pipeline.predict(X)
-        r2 = r2_score(y, y_pred)
-
-        # Generar predicciones futuras con el mismo método
-        # Usamos la última fecha real de los datos históricos, no la fecha actual
-        ultima_fecha = df_hist_grouped['FechaElaboracion'].max()
-        print(f"Tipo {tipo} - Última fecha histórica: {ultima_fecha}")
-        # Asegurar que estamos usando la última fecha real de los datos históricos
-        fechas_futuras = pd.date_range(start=ultima_fecha + pd.DateOffset(months=1), periods=12, freq='MS')
-        print(f"Predicciones para {tipo} desde {fechas_futuras[0]} hasta {fechas_futuras[-1]}")
-        
-        # Obtener valores más frecuentes para características
-        categoria = df_hist_grouped['Categoria'].mode()[0] if not df_hist_grouped['Categoria'].empty else None
-        tipomatricula = df_hist_grouped['TipoMatricula'].mode()[0] if not df_hist_grouped['TipoMatricula'].empty else None
-        vehiculo = df_hist_grouped['NombreVehiculo'].mode()[0] if not df_hist_grouped['NombreVehiculo'].empty else None
-        tercero = df_hist_grouped['IdentificacionTercero'].mode()[0] if not df_hist_grouped['IdentificacionTercero'].empty else None
-
-        # DataFrame futuro con predicciones
-        df_futuro = pd.DataFrame({
-            'Año': fechas_futuras.year,
-            'Mes': fechas_futuras.month,
-            'TipoMantenimiento': tipo,
-            'Categoria': categoria,
-            'TipoMatricula': tipomatricula,
-            'NombreVehiculo': vehiculo,
-            'IdentificacionTercero': tercero,
-            'FechaElaboracion': fechas_futuras
-        })
-        
-        # Predecir costos futuros
-        X_futuro = df_futuro[['Año', 'Mes', 'TipoMantenimiento', 'Categoria', 'TipoMatricula', 'NombreVehiculo', 'IdentificacionTercero']]
-        y_futuro = pipeline.predict(X_futuro)
-        df_futuro['Debito'] = y_futuro
-        
-        # Crear DataFrames para histórico y predicción
         df_hist_result = pd.DataFrame({
-            'TipoMantenimiento': tipo,
-            'Fecha': df_hist_grouped['FechaElaboracion'], 
-            'Costo': df_hist_grouped['Debito'],
-            'Prediccion': y_pred,
-            'R2': r2,
+            **tarea['fijos'],
+            'Fecha': historico['FechaElaboracion'],
+            'Costo': historico['Debito'],
             'Origen': 'Histórico'
         })
-        
         df_pred_result = pd.DataFrame({
-            'TipoMantenimiento': tipo,
-            'Fecha': fechas_futuras,
-            'Costo': y_futuro,
-            'Prediccion': y_futuro,
-            'R2': r2,
+            **tarea['fijos'],
+            'Fecha': tarea['fechas_futuras'],
+            'Costo': resultado['future_preds'],
             'Origen': 'Predicción'
         })
-        
-        # Unir resultados
-        df_resultado = pd.concat([df_hist_result, df_pred_result])
-        
-        # Preparar datos para el gráfico
-        df_chart = df_resultado[['Fecha', 'Costo', 'Origen']]
-        
-        # Crear gráfico PyEcharts
+        predicciones[tarea['grupo']].append(df_pred_result)
+
         try:
-            title = f'Tipo de Mantenimiento: {tipo}'
-            print(f"\nCreando gráfico para {title}")
-            print(f"Datos para el gráfico: {len(df_chart)} filas")
-            chart = create_pyechart(df_chart, title, r2)
-            
+            df_plot = pd.concat([df_hist_result, df_pred_result])[['Fecha', 'Costo', 'Origen']]
+            chart = create_pyechart(df_plot, tarea['titulo'], r2, salida)
             if chart:
-                # Verificar que el diccionario existe
-                if 'by_type' not in charts:
-                    print(f"Recreando diccionario charts['by_type'] porque no existe")
-                    charts['by_type'] = {}
-                
-                # Guardar el gráfico en el diccionario
-                charts['by_type'][title] = chart
-                print(f"Gráfico para {title} agregado correctamente")
-                
-                # Imprimir el contenido actual del diccionario para debug
-                tipos = list(charts['by_type'].keys())
-                print(f"Gráficos por tipo guardados hasta ahora: {tipos}")
+                charts[tarea['grupo']][tarea['titulo']] = chart
             else:
-                print(f"ERROR: No se pudo crear el gráfico para {title}")
-                
+                print(f"ERROR: No se pudo crear el gráfico para {tarea['titulo']}", file=salida)
         except Exception as e:
-            print(f"ERROR CRÍTICO al crear/guardar gráfico para {tipo}: {str(e)}")
+            print(f"Error al crear/guardar gráfico {tarea['titulo']}: {e}", file=salida)
             import traceback
             traceback.print_exc()
-        
-        # Verificación de contenido
+
+    # --- 4. Almacenar las predicciones en la BD ---
+    tablas = {
+        'by_vehicle': ('Predicciones_Vehiculo_Tipo', ['NombreVehiculo', 'TipoMantenimiento', 'Fecha', 'Costo', 'Origen']),
+        'by_type': ('Predicciones_Tipo_Mantenimiento', ['TipoMantenimiento', 'Fecha', 'Costo', 'Origen']),
+    }
+    for grupo, (tabla, columns_to_save) in tablas.items():
+        if not predicciones[grupo]:
+            continue
+        df_db = pd.concat(predicciones[grupo], ignore_index=True)
+        df_db['Fecha'] = pd.to_datetime(df_db['Fecha'].dt.strftime('%Y-%m-%d'))
+        print(f"Guardando {len(df_db)} filas en {tabla}. Rango de fechas: {df_db['Fecha'].min()} a {df_db['Fecha'].max()}", file=salida)
         try:
-            print(f"Estado actual de charts['by_type']: {len(charts.get('by_type', {}))} gráficos")
+            publicar_predicciones(engine, tabla, df_db[columns_to_save])
+            print(f"Predicciones guardadas correctamente en {tabla}", file=salida)
         except Exception as e:
-            print(f"Error al verificar charts['by_type']: {e}")
-            charts['by_type'] = {}  # Recrear si hay algún problema
-
-        # Guardar predicciones para la BD
-        all_preds_tipo.append(df_pred_result[['TipoMantenimiento', 'Fecha', 'Costo', 'Origen']])
-
-    # --- 4. Almacenar predicciones por tipo en la BD ---
-    if all_preds_tipo:
-        df_final_preds = pd.concat(all_preds_tipo)
-        # Asegurar que las fechas se guardan en el formato correcto
-        df_final_preds['Fecha'] = df_final_preds['Fecha'].dt.strftime('%Y-%m-%d')
-        df_final_preds['Fecha'] = pd.to_datetime(df_final_preds['Fecha'])
-        print(f"Guardando {len(df_final_preds)} predicciones por tipo. Rango de fechas: {df_final_preds['Fecha'].min()} a {df_final_preds['Fecha'].max()}")
-        
-        # Asegurarse de que las columnas coinciden con la estructura de la tabla
-        columns_to_save = ['TipoMantenimiento', 'Fecha', 'Costo', 'Origen']
-        if 'R2' in df_final_preds.columns:
-            columns_to_save.append('R2')
-            
-        with engine.connect() as connection:
-            trans = connection.begin()
-            try:
-                # Mostrar la estructura de la tabla para debugging
-                table_info = pd.read_sql("DESCRIBE Predicciones_Tipo_Mantenimiento", connection)
-                print("Estructura de la tabla:")
-                print(table_info)
-                
-                connection.execute(text("TRUNCATE TABLE Predicciones_Tipo_Mantenimiento"))
-                df_final_preds[columns_to_save].to_sql('Predicciones_Tipo_Mantenimiento', engine, if_exists='append', index=False)
-                trans.commit()
-                print("Predicciones por tipo guardadas correctamente")
-            except Exception as e:
-                trans.rollback()
-                print(f"Error en la transacción de Tipo Mantenimiento: {e}")
-    
+            print(f"Error al publicar las predicciones en {tabla}: {e}", file=salida)
+
     # Verificar el contenido de los gráficos antes de devolverlos
-    print("\n" + "="*50)
-    print(f"RESUMEN DE GRÁFICOS GENERADOS:")
-    print(f"Gráficos por vehículo: {len(charts.get('by_vehicle', {}))}")
-    print(f"Gráficos por tipo: {len(charts.get('by_type', {}))}")
+    print("\n" + "="*50, file=salida)
+    print(f"RESUMEN DE GRÁFICOS GENERADOS:", file=salida)
+    print(f"Gráficos por vehículo: {len(charts.get('by_vehicle', {}))}", file=salida)
+    print(f"Gráficos por tipo: {len(charts.get('by_type', {}))}", file=salida)
+    if individuales:
+        _imprimir_tiempos([tareas[i] for i in individuales], [resultados[i] for i in individuales],
+                          segundos_reloj, procesos, salida)
+    if globales:
+        print(f"Modelo global: {len(globales)} series en {segundos_global:.2f} s de reloj con {nucleos} núcleos", file=salida)
+    if comparar:
+        comparar_modos([tarea for tarea in tareas if tarea['grupo'] == 'by_vehicle'], meses_prueba, nucleos, salida)
+    elif globales:
+        comparar_con_guardados([tareas[i] for i in globales], [resultados[i] for i in globales], segundos_global,
+                               nucleos, almacen, salida)
     
     if len(charts.get('by_type', {})) == 0:
-        print("ADVERTENCIA: No se generaron gráficos por tipo. Revisar datos y procesos.")
+        print("ADVERTENCIA: No se generaron gráficos por tipo. Revisar datos y procesos.", file=salida)
     
     return charts
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Genera las predicciones y las publica en la base de datos.')
+    parser.add_argument('--restore-previous', action='store_true',
+                        help='No entrena: vuelve a publicar las predicciones de la ejecución anterior.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Procesos que entrenan las series en paralelo (por defecto, uno por núcleo).')
+    parser.add_argument('--global-model', action='store_true',
+                        help='Predice las series por vehículo y tipo con un único modelo para toda la flota y lo '
+                             'compara con los modelos por serie guardados.')
+    parser.add_argument('--compare-modes', action='store_true',
+                        help='Al final entrena ambos modos y compara tiempo y precisión sobre meses reservados.')
+    parser.add_argument('--holdout-months', type=int, default=DEFAULT_MESES_PRUEBA,
+                        help=f'Meses finales de cada serie reservados para la comparación (por defecto {DEFAULT_MESES_PRUEBA}).')
+    parser.add_argument('--force-retrain', action='store_true',
+                        help='Entrena todas las series aunque haya modelos guardados para sus datos.')
+    parser.add_argument('--no-model-cache', action='store_true',
+                        help='No usa ni actualiza el almacén de modelos entrenados.')
+    parser.add_argument('--model-cache-max-mb', type=int, default=DEFAULT_MODELOS_MAX_MB,
+                        help=f'Tamaño máximo del almacén de modelos en MB (por defecto {DEFAULT_MODELOS_MAX_MB}).')
+    args = parser.parse_args()
+
     load_dotenv()
     db_config = {
         'host': os.getenv('DB_HOST'),
@@ -528,7 +590,15 @@ if __name__ == '__main__':
     }
     if not all(db_config.values()):
         print("Error: Faltan variables de entorno para la base de datos. Asegúrate de que .env está configurado.")
+    elif args.restore_previous:
+        engine = get_db_engine(db_config)
+        for tabla in ('Predicciones_Vehiculo_Tipo', 'Predicciones_Tipo_Mantenimiento'):
+            restaurar_predicciones(engine, tabla)
+            print(f"{tabla}: restaurada la publicación anterior.")
     else:
-        charts = get_prediction_charts_and_update_db(db_config)
+        charts = get_prediction_charts_and_update_db(
+            db_config, workers=args.workers, forzar_reentrenamiento=args.force_retrain,
+            modelos_dir=None if args.no_model_cache else DEFAULT_MODELOS_DIR, modelos_max_mb=args.model_cache_max_mb,
+            modelo_global=args.global_model, comparar=args.compare_modes, meses_prueba=args.holdout_months)
         print(f"Generados {len(charts.get('by_vehicle', {}))} gráficos por vehículo.")
         print(f"Generados {len(charts.get('by_type', {}))} gráficos por tipo.")
@@ -1,8 +1,16 @@
-#DIMENSIONALES
+#DIMENSIONALES Y HECHOS
+
+import argparse
+import sys
 
 import mysql.connector
 
-# Configuración de conexión a MySQL
+try:
+    from notebooks.bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, adquirir_bloqueo
+except ImportError:  # ejecutado como script desde la carpeta notebooks
+    from bloqueo_pipeline import DEFAULT_LOCK_TIMEOUT, adquirir_bloqueo
+
+# Configuración de conexión a MySQL (valores por defecto si no se pasan argumentos)
 DB_CONFIG = {
     "host": "roundhouse.proxy.rlwy.net",
     "port": 38517,
@@ -11,67 +19,97 @@ DB_CONFIG = {
     "database": "railway"
 }
 
+
 # Función para ejecutar un procedimiento almacenado
-def ejecutar_sp(sp_name):
+def ejecutar_sp(conn, sp_name, args=(), salida=None):
     """
-    Ejecuta un procedimiento almacenado en MySQL.
+    Ejecuta un procedimiento almacenado en MySQL y confirma los cambios.
     :param sp_name: Nombre del Stored Procedure a ejecutar.
+    :param args: Parámetros del procedimiento (los OUT se pasan como 0).
+    :param salida: Dónde escribir los mensajes (por defecto, la salida estándar).
+    :return: Los parámetros tras la ejecución, con los OUT ya informados.
     """
-    conn = None
+    cursor = conn.cursor()
     try:
-        # Conectar a la base de datos
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        print(f"Ejecutando {sp_name}...")
-        cursor.callproc(sp_name)  # Ejecutar el procedimiento almacenado
+        print(f"Ejecutando {sp_name}...", file=salida)
+        resultado = cursor.callproc(sp_name, args)  # Ejecutar el procedimiento almacenado
         conn.commit()  # Confirmar cambios en la base de datos
-
-        print(f"{sp_name} ejecutado con éxito.")
-
-    except mysql.connector.Error as err:
-        print(f"Error al ejecutar {sp_name}: {err}")
-
+        print(f"{sp_name} ejecutado con éxito.", file=salida)
+        return resultado
     finally:
-        if cursor:
-            cursor.close()
-        if conn:
-            conn.close()
-
-# Ejecutar el SP de dimensiones
-ejecutar_sp('sp_upsert_dimensionales')
+        cursor.close()
 
-print("Proceso de carga de dimensiones finalizado.")
 
-
-# Función para ejecutar un procedimiento almacenado
-def ejecutar_sp(sp_name):
+def actualizar_hechos(conn, completo=False, anio=None, salida=None):
     """
-    Ejecuta un procedimiento almacenado en MySQL.
-    :param sp_name: Nombre del Stored Procedure a ejecutar.
+    Carga la tabla de hechos. Por defecto solo procesa las filas de staging nuevas
+    desde la última ejecución; con completo=True la reconstruye desde cero y con
+    anio recarga solo la partición de ese año.
+    Devuelve (insertados, sin_cambios).
     """
+    if anio is not None:
+        _, insertados = ejecutar_sp(conn, 'sp_recargar_hechos_anio', (anio, 0), salida)
+        return insertados, 0
+    if completo:
+        ejecutar_sp(conn, 'sp_insert_hechos', salida=salida)
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SELECT Insertados FROM Control_Cargas WHERE Proceso = 'hechos'")
+            fila = cursor.fetchone()
+        finally:
+            cursor.close()
+        return (fila[0] if fila else 0), 0
+    insertados, sin_cambios = ejecutar_sp(conn, 'sp_insert_hechos_incremental', (0, 0), salida)
+    return insertados, sin_cambios
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Actualiza dimensiones y hechos desde staging.')
+    parser.add_argument('--db-host', default=DB_CONFIG["host"])
+    parser.add_argument('--db-port', type=int, default=DB_CONFIG["port"])
+    parser.add_argument('--db-user', default=DB_CONFIG["user"])
+    parser.add_argument('--db-password', default=DB_CONFIG["password"])
+    parser.add_argument('--db-name', default=DB_CONFIG["database"])
+    parser.add_argument('--full', action='store_true',
+                        help='Reconstruye toda la tabla de hechos en lugar de la carga incremental.')
+    parser.add_argument('--year', type=int, default=None,
+                        help='Recarga solo los hechos de este año (una partición) desde staging.')
+    parser.add_argument('--lock-timeout', type=int, default=DEFAULT_LOCK_TIMEOUT,
+                        help='Segundos que se espera a que termine otra ejecución del pipeline o de una carga '
+                             f'(por defecto {DEFAULT_LOCK_TIMEOUT}).')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     conn = None
     try:
-        # Conectar a la base de datos
-        conn = mysql.connector.connect(**DB_CONFIG)
-        cursor = conn.cursor()
-
-        print(f"Ejecutando {sp_name}...")
-        cursor.callproc(sp_name)  # Ejecutar el procedimiento almacenado
-        conn.commit()  # Confirmar cambios en la base de datos
-
-        print(f"{sp_name} ejecutado con éxito.")
-
+        conn = mysql.connector.connect(host=args.db_host, port=args.db_port, user=args.db_user,
+                                       password=args.db_password, database=args.db_name)
+        # Mismo bloqueo que el pipeline: no se actualizan los hechos mientras otra ejecución carga
+        if not adquirir_bloqueo(conn, args.lock_timeout):
+            print(f"Otra ejecución del pipeline retuvo el bloqueo más de {args.lock_timeout} s.", file=sys.stderr)
+            sys.exit(1)
+
+        # Ejecutar el SP de dimensiones
+        ejecutar_sp(conn, 'sp_upsert_dimensiones')
+        print("Proceso de carga de dimensiones finalizado.")
+
+        # Ejecutar el SP de hechos
+        insertados, sin_cambios = actualizar_hechos(conn, completo=args.full, anio=args.year)
+        if args.year is not None:
+            modo = f"del año {args.year}"
+        else:
+            modo = "completa" if args.full else "incremental"
+        print(f"Carga {modo} de hechos: {insertados} insertados, {sin_cambios} sin cambios.")
+        print("Proceso de carga de hechos finalizado.")
     except mysql.connector.Error as err:
-        print(f"Error al ejecutar {sp_name}: {err}")
-
+        print(f"Error al actualizar los datos: {err}", file=sys.stderr)
+        sys.exit(1)
     finally:
-        if cursor:
-            cursor.close()
         if conn:
-            conn.close()
+            conn.close()  # al cerrar la sesión se libera también el bloqueo
 
-# Ejecutar el SP de hechos
-ejecutar_sp('sp_upsert_hechos')
 
-print("Proceso de carga de hechos finalizado.")
+if __name__ == "__main__":
+    main()
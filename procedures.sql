@@ -0,0 +1,415 @@
+-- =====================================================================
+-- PROCEDIMIENTOS ALMACENADOS
+-- =====================================================================
+-- Se ejecuta después de schema.sql (init_db.py) y en cada migrate_schema.py:
+-- los procedimientos se eliminan y se vuelven a crear, por lo que este archivo
+-- es idempotente y siempre refleja la versión vigente.
+-- Se eliminan los procedimientos si ya existen para evitar errores en la recreación.
+DROP PROCEDURE IF EXISTS `sp_upsert_dimensiones`;
+DROP PROCEDURE IF EXISTS `sp_insert_hechos`;
+DROP PROCEDURE IF EXISTS `sp_insert_hechos_incremental`;
+DROP PROCEDURE IF EXISTS `sp_eliminar_hechos_archivo`;
+DROP PROCEDURE IF EXISTS `sp_preparar_grupos_resumen`;
+DROP PROCEDURE IF EXISTS `sp_refrescar_resumen_mensual`;
+DROP PROCEDURE IF EXISTS `sp_recargar_hechos_anio`;
+DROP PROCEDURE IF EXISTS `sp_generar_calendario`;
+DROP PROCEDURE IF EXISTS `sp_extender_calendario`;
+DROP PROCEDURE IF EXISTS `sp_refrescar_hechos_analitica`;
+DROP PROCEDURE IF EXISTS `sp_registrar_hechos_pendientes`;
+DROP PROCEDURE IF EXISTS `sp_preparar_filas_hechos`;
+DROP PROCEDURE IF EXISTS `sp_marcar_manifiestos_cargados`;
+
+DELIMITER //
+
+-- Genera en Dim_Tiempo todos los días entre p_desde y p_hasta (ambos incluidos).
+-- TiempoKey es la fecha como entero AAAAMMDD, así que los hechos la calculan sin
+-- unir con la dimensión. Los días que ya existen se conservan.
+CREATE PROCEDURE `sp_generar_calendario`(IN p_desde DATE, IN p_hasta DATE)
+BEGIN
+    IF p_desde IS NOT NULL AND p_hasta >= p_desde THEN
+        SET SESSION cte_max_recursion_depth = GREATEST(@@cte_max_recursion_depth, DATEDIFF(p_hasta, p_desde) + 1);
+        INSERT IGNORE INTO Dim_Tiempo (TiempoKey, Fecha, Anio, Mes, Dia)
+        WITH RECURSIVE dias (Fecha) AS (
+            SELECT p_desde
+            UNION ALL
+            SELECT Fecha + INTERVAL 1 DAY FROM dias WHERE Fecha < p_hasta
+        )
+        SELECT YEAR(Fecha) * 10000 + MONTH(Fecha) * 100 + DAY(Fecha), Fecha, YEAR(Fecha), MONTH(Fecha), DAY(Fecha)
+        FROM dias;
+    END IF;
+END//
+
+-- Extiende el calendario por años completos cuando staging tiene fechas anteriores
+-- o posteriores a su rango. MIN/MAX se resuelven con los índices de FechaDia y Fecha.
+CREATE PROCEDURE `sp_extender_calendario`()
+BEGIN
+    DECLARE v_stg_desde DATE;
+    DECLARE v_stg_hasta DATE;
+    DECLARE v_cal_desde DATE;
+    DECLARE v_cal_hasta DATE;
+
+    SELECT MIN(FechaDia), MAX(FechaDia) INTO v_stg_desde, v_stg_hasta FROM STG_Mantenimientos;
+    SELECT MIN(Fecha), MAX(Fecha) INTO v_cal_desde, v_cal_hasta FROM Dim_Tiempo;
+
+    IF v_stg_desde IS NOT NULL THEN
+        IF v_cal_desde IS NULL THEN
+            CALL sp_generar_calendario(MAKEDATE(YEAR(v_stg_desde), 1), MAKEDATE(YEAR(v_stg_hasta) + 1, 1) - INTERVAL 1 DAY);
+        ELSE
+            IF v_stg_desde < v_cal_desde THEN
+                CALL sp_generar_calendario(MAKEDATE(YEAR(v_stg_desde), 1), v_cal_desde - INTERVAL 1 DAY);
+            END IF;
+            IF v_stg_hasta > v_cal_hasta THEN
+                CALL sp_generar_calendario(v_cal_hasta + INTERVAL 1 DAY, MAKEDATE(YEAR(v_stg_hasta) + 1, 1) - INTERVAL 1 DAY);
+            END IF;
+        END IF;
+    END IF;
+END//
+
+-- Procedimiento para poblar las dimensiones desde la tabla de staging
+CREATE PROCEDURE `sp_upsert_dimensiones`()
+BEGIN
+    -- Upsert para Dim_Vehiculos
+    INSERT INTO Dim_Vehiculos (NombreVehiculo, TipoMatricula, Categoria)
+    SELECT DISTINCT NombreVehiculo, TipoMatricula, Categoria
+    FROM STG_Mantenimientos stg
+    WHERE stg.NombreVehiculo IS NOT NULL
+    ON DUPLICATE KEY UPDATE
+        TipoMatricula = VALUES(TipoMatricula),
+        Categoria = VALUES(Categoria);
+
+    -- Upsert para Dim_Terceros
+    INSERT INTO Dim_Terceros (IdentificacionTercero, NombreTercero)
+    SELECT DISTINCT IdentificacionTercero, NombreTercero
+    FROM STG_Mantenimientos stg
+    WHERE stg.IdentificacionTercero IS NOT NULL
+    ON DUPLICATE KEY UPDATE
+        NombreTercero = VALUES(NombreTercero);
+
+    -- Dim_Tiempo es un calendario pregenerado: solo se extiende si staging trae
+    -- fechas fuera de su rango (sin recorrer staging con DISTINCT)
+    CALL sp_extender_calendario();
+END//
+
+-- Crea (vacía) la tabla temporal con los grupos de Resumen_Mensual que hay que recalcular.
+CREATE PROCEDURE `sp_preparar_grupos_resumen`()
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_resumen_grupos;
+    CREATE TEMPORARY TABLE tmp_resumen_grupos (
+        VehiculoKey INT NOT NULL,
+        TipoMantenimiento VARCHAR(255) NOT NULL,
+        Mes DATE NOT NULL,
+        TerceroKey INT NOT NULL,
+        PRIMARY KEY (VehiculoKey, TipoMantenimiento, Mes, TerceroKey)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+END//
+
+-- Recalcula desde los hechos solo los grupos listados en tmp_resumen_grupos.
+CREATE PROCEDURE `sp_refrescar_resumen_mensual`()
+BEGIN
+    DELETE r
+    FROM Resumen_Mensual r
+    JOIN tmp_resumen_grupos g
+      ON g.VehiculoKey = r.VehiculoKey AND g.TipoMantenimiento = r.TipoMantenimiento
+     AND g.Mes = r.Mes AND g.TerceroKey = r.TerceroKey;
+
+    INSERT INTO Resumen_Mensual (VehiculoKey, TipoMantenimiento, Mes, TerceroKey, Costo, CostoPositivo, Registros)
+    SELECT g.VehiculoKey, g.TipoMantenimiento, g.Mes, g.TerceroKey,
+           SUM(h.Debito), SUM(CASE WHEN h.Debito > 0 THEN h.Debito ELSE 0 END), COUNT(*)
+    FROM tmp_resumen_grupos g
+    JOIN Dim_Tiempo ti ON ti.Fecha >= g.Mes AND ti.Fecha < g.Mes + INTERVAL 1 MONTH
+    JOIN Hechos_Mantenimiento h
+      ON h.VehiculoKey = g.VehiculoKey AND h.TipoMantenimiento = g.TipoMantenimiento
+     AND h.TiempoKey = ti.TiempoKey AND h.TerceroKey = g.TerceroKey
+     AND h.Anio = YEAR(g.Mes)
+    WHERE h.Debito IS NOT NULL
+    GROUP BY g.VehiculoKey, g.TipoMantenimiento, g.Mes, g.TerceroKey;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_resumen_grupos;
+END//
+
+-- Reconstruye Hechos_Analitica desde Resumen_Mensual con los atributos de las
+-- dimensiones ya resueltos. Es de grano mensual, así que se regenera completa; al
+-- hacerse con DELETE + INSERT dentro de la transacción de la carga, los lectores
+-- ven la versión anterior hasta el commit.
+CREATE PROCEDURE `sp_refrescar_hechos_analitica`()
+BEGIN
+    DELETE FROM Hechos_Analitica;
+    INSERT INTO Hechos_Analitica (VehiculoKey, TerceroKey, NombreVehiculo, Categoria, TipoMatricula,
+                                  IdentificacionTercero, TipoMantenimiento, Mes, Costo, CostoPositivo, Registros)
+    SELECT r.VehiculoKey, r.TerceroKey, v.NombreVehiculo, v.Categoria, v.TipoMatricula,
+           t.IdentificacionTercero, r.TipoMantenimiento, r.Mes, r.Costo, r.CostoPositivo, r.Registros
+    FROM Resumen_Mensual r
+    JOIN Dim_Vehiculos v ON v.VehiculoKey = r.VehiculoKey
+    JOIN Dim_Terceros t ON t.TerceroKey = r.TerceroKey;
+END//
+
+-- Crea tmp_manifiestos con los archivos del manifiesto a llevar a hechos (todos, o
+-- solo los que aún no se cargaron) y tmp_filas_stg con los id de staging de sus filas.
+-- Un archivo aparece en Ingesta_Manifiesto en la misma transacción que sus filas y
+-- sus vínculos en STG_Archivo_Filas: si su registro es visible, sus filas también.
+-- Por eso no se usa el id máximo de staging como marca de agua: los AUTO_INCREMENT se
+-- reparten al insertar y una carga aún abierta dejaría ids menores sin confirmar.
+CREATE PROCEDURE `sp_preparar_filas_hechos`(IN p_todos TINYINT)
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_manifiestos;
+    CREATE TEMPORARY TABLE tmp_manifiestos (HashContenido CHAR(64) PRIMARY KEY) ENGINE=InnoDB;
+    INSERT INTO tmp_manifiestos (HashContenido)
+    SELECT HashContenido FROM Ingesta_Manifiesto WHERE p_todos = 1 OR HechosCargados = 0;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_filas_stg;
+    CREATE TEMPORARY TABLE tmp_filas_stg (StgId INT PRIMARY KEY) ENGINE=InnoDB;
+    INSERT IGNORE INTO tmp_filas_stg (StgId)
+    SELECT stg.id
+    FROM tmp_manifiestos m
+    JOIN STG_Archivo_Filas af ON af.ArchivoHash = m.HashContenido
+    JOIN STG_Mantenimientos stg ON stg.HashFila = af.HashFila;
+END//
+
+-- Marca como cargados en hechos los archivos de tmp_manifiestos.
+CREATE PROCEDURE `sp_marcar_manifiestos_cargados`()
+BEGIN
+    UPDATE Ingesta_Manifiesto im
+    JOIN tmp_manifiestos m ON m.HashContenido = im.HashContenido
+    SET im.HechosCargados = 1;
+    DROP TEMPORARY TABLE IF EXISTS tmp_manifiestos;
+    DROP TEMPORARY TABLE IF EXISTS tmp_filas_stg;
+END//
+
+-- Rehace STG_Hechos_Pendientes con las filas de tmp_filas_stg que tienen vehículo,
+-- tercero y fecha pero no cruzan con Dim_Vehiculos o Dim_Terceros. Las filas con
+-- alguna de esas columnas en NULL nunca cruzarían y no se guardan.
+CREATE PROCEDURE `sp_registrar_hechos_pendientes`()
+BEGIN
+    DELETE FROM STG_Hechos_Pendientes;
+    INSERT INTO STG_Hechos_Pendientes (StgId)
+    SELECT stg.id
+    FROM tmp_filas_stg f
+    JOIN STG_Mantenimientos stg ON stg.id = f.StgId
+    LEFT JOIN Dim_Vehiculos v ON v.NombreVehiculo = stg.NombreVehiculo
+    LEFT JOIN Dim_Terceros t ON t.IdentificacionTercero = stg.IdentificacionTercero
+    WHERE stg.FechaDia IS NOT NULL
+      AND stg.NombreVehiculo IS NOT NULL AND stg.IdentificacionTercero IS NOT NULL
+      AND (v.VehiculoKey IS NULL OR t.TerceroKey IS NULL);
+END//
+
+-- Procedimiento para reconstruir por completo la tabla de hechos con las filas de
+-- los archivos del manifiesto, que quedan marcados como cargados.
+CREATE PROCEDURE `sp_insert_hechos`()
+BEGIN
+    DECLARE v_insertados INT;
+    -- TiempoKey se calcula desde FechaDia: el calendario debe cubrir esas fechas
+    CALL sp_extender_calendario();
+    CALL sp_preparar_filas_hechos(1);
+
+    TRUNCATE TABLE Hechos_Mantenimiento;
+    INSERT INTO Hechos_Mantenimiento (VehiculoKey, TerceroKey, TiempoKey, Anio, TipoMantenimiento, Debito, HashFila)
+    SELECT 
+        v.VehiculoKey,
+        t.TerceroKey,
+        YEAR(stg.FechaDia) * 10000 + MONTH(stg.FechaDia) * 100 + DAY(stg.FechaDia) AS TiempoKey,
+        YEAR(stg.FechaDia) AS Anio,
+        stg.TipoMantenimiento,
+        stg.Debito,
+        stg.HashFila
+    FROM tmp_filas_stg f
+    JOIN STG_Mantenimientos stg ON stg.id = f.StgId
+    JOIN Dim_Vehiculos v ON stg.NombreVehiculo = v.NombreVehiculo
+    JOIN Dim_Terceros t ON stg.IdentificacionTercero = t.IdentificacionTercero
+    WHERE stg.FechaDia IS NOT NULL;
+    SET v_insertados = ROW_COUNT();
+
+    TRUNCATE TABLE Resumen_Mensual;
+    INSERT INTO Resumen_Mensual (VehiculoKey, TipoMantenimiento, Mes, TerceroKey, Costo, CostoPositivo, Registros)
+    SELECT h.VehiculoKey, h.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), h.TerceroKey,
+           SUM(h.Debito), SUM(CASE WHEN h.Debito > 0 THEN h.Debito ELSE 0 END), COUNT(*)
+    FROM Hechos_Mantenimiento h
+    JOIN Dim_Tiempo ti ON ti.TiempoKey = h.TiempoKey
+    WHERE h.TipoMantenimiento IS NOT NULL AND h.Debito IS NOT NULL
+    GROUP BY h.VehiculoKey, h.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), h.TerceroKey;
+
+    -- Las filas sin dimensión quedan pendientes para la siguiente carga incremental
+    CALL sp_registrar_hechos_pendientes();
+    CALL sp_marcar_manifiestos_cargados();
+
+    INSERT INTO Control_Cargas (Proceso, Insertados, SinCambios, FechaEjecucion)
+    VALUES ('hechos', v_insertados, 0, NOW())
+    ON DUPLICATE KEY UPDATE
+        Insertados = VALUES(Insertados),
+        SinCambios = 0,
+        FechaEjecucion = VALUES(FechaEjecucion);
+
+    -- Último paso de la carga: publicar la tabla analítica
+    CALL sp_refrescar_hechos_analitica();
+END//
+
+-- Carga incremental de hechos: procesa las filas de los archivos del manifiesto aún
+-- no cargados (ver sp_preparar_filas_hechos) y las que quedaron pendientes por no
+-- cruzar con una dimensión (STG_Hechos_Pendientes). El costo depende del volumen
+-- nuevo, no del histórico. Una fila con el mismo HashFila trae los mismos valores,
+-- así que las que ya están en hechos solo se cuentan como sin cambios.
+CREATE PROCEDURE `sp_insert_hechos_incremental`(
+    OUT p_insertados INT,
+    OUT p_sin_cambios INT
+)
+BEGIN
+    DECLARE v_filas INT;
+
+    CALL sp_extender_calendario();
+    CALL sp_preparar_filas_hechos(0);
+    INSERT IGNORE INTO tmp_filas_stg (StgId)
+    SELECT stg.id
+    FROM STG_Hechos_Pendientes p
+    JOIN STG_Mantenimientos stg ON stg.id = p.StgId;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_hechos_nuevos;
+    CREATE TEMPORARY TABLE tmp_hechos_nuevos (PRIMARY KEY (StgId)) AS
+    SELECT 
+        stg.id AS StgId,
+        v.VehiculoKey,
+        t.TerceroKey,
+        YEAR(stg.FechaDia) * 10000 + MONTH(stg.FechaDia) * 100 + DAY(stg.FechaDia) AS TiempoKey,
+        YEAR(stg.FechaDia) AS Anio,
+        stg.TipoMantenimiento,
+        stg.Debito,
+        stg.HashFila
+    FROM tmp_filas_stg f
+    JOIN STG_Mantenimientos stg ON stg.id = f.StgId
+    JOIN Dim_Vehiculos v ON stg.NombreVehiculo = v.NombreVehiculo
+    JOIN Dim_Terceros t ON stg.IdentificacionTercero = t.IdentificacionTercero
+    WHERE stg.FechaDia IS NOT NULL;
+    SELECT COUNT(*) INTO v_filas FROM tmp_hechos_nuevos;
+
+    -- Los pendientes se recalculan sobre todas las filas revisadas: salen los que ya
+    -- cruzan y los purgados de staging, entran los nuevos sin dimensión
+    CALL sp_registrar_hechos_pendientes();
+
+    -- Filas que ya están en hechos (p. ej. tras recargar su año): no cambian nada
+    DELETE n
+    FROM tmp_hechos_nuevos n
+    JOIN Hechos_Mantenimiento h ON h.HashFila = n.HashFila;
+    SELECT COUNT(*) INTO p_insertados FROM tmp_hechos_nuevos;
+    SET p_sin_cambios = v_filas - p_insertados;
+
+    -- Grupos del resumen afectados: los de las filas nuevas
+    CALL sp_preparar_grupos_resumen();
+    INSERT IGNORE INTO tmp_resumen_grupos (VehiculoKey, TipoMantenimiento, Mes, TerceroKey)
+    SELECT n.VehiculoKey, n.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), n.TerceroKey
+    FROM tmp_hechos_nuevos n
+    JOIN Dim_Tiempo ti ON ti.TiempoKey = n.TiempoKey
+    WHERE n.TipoMantenimiento IS NOT NULL;
+
+    INSERT INTO Hechos_Mantenimiento (VehiculoKey, TerceroKey, TiempoKey, Anio, TipoMantenimiento, Debito, HashFila)
+    SELECT VehiculoKey, TerceroKey, TiempoKey, Anio, TipoMantenimiento, Debito, HashFila
+    FROM tmp_hechos_nuevos;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_hechos_nuevos;
+    CALL sp_refrescar_resumen_mensual();
+    CALL sp_marcar_manifiestos_cargados();
+
+    INSERT INTO Control_Cargas (Proceso, Insertados, SinCambios, FechaEjecucion)
+    VALUES ('hechos', p_insertados, p_sin_cambios, NOW())
+    ON DUPLICATE KEY UPDATE
+        Insertados = VALUES(Insertados),
+        SinCambios = VALUES(SinCambios),
+        FechaEjecucion = VALUES(FechaEjecucion);
+
+    -- Último paso de la carga: publicar la tabla analítica
+    CALL sp_refrescar_hechos_analitica();
+END//
+
+-- Recarga los hechos de un solo año. Si el año tiene partición propia (pAAAA) se
+-- vacía solo esa partición con TRUNCATE PARTITION; si cae en p_anterior o p_futuro,
+-- que agrupan varios años, se borran sus filas con DELETE (sigue podando particiones).
+-- También recalcula ese año en Resumen_Mensual. No marca archivos del manifiesto como cargados.
+CREATE PROCEDURE `sp_recargar_hechos_anio`(IN p_anio INT, OUT p_insertados INT)
+BEGIN
+    DECLARE v_particion VARCHAR(64) DEFAULT NULL;
+
+    CALL sp_extender_calendario();
+
+    SELECT PARTITION_NAME INTO v_particion
+    FROM INFORMATION_SCHEMA.PARTITIONS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'Hechos_Mantenimiento'
+      AND PARTITION_NAME = CONCAT('p', p_anio);
+
+    IF v_particion IS NOT NULL THEN
+        SET @sql_truncar = CONCAT('ALTER TABLE Hechos_Mantenimiento TRUNCATE PARTITION ', v_particion);
+        PREPARE stmt FROM @sql_truncar;
+        EXECUTE stmt;
+        DEALLOCATE PREPARE stmt;
+    ELSE
+        DELETE FROM Hechos_Mantenimiento WHERE Anio = p_anio;
+    END IF;
+
+    INSERT INTO Hechos_Mantenimiento (VehiculoKey, TerceroKey, TiempoKey, Anio, TipoMantenimiento, Debito, HashFila)
+    SELECT 
+        v.VehiculoKey,
+        t.TerceroKey,
+        YEAR(stg.FechaDia) * 10000 + MONTH(stg.FechaDia) * 100 + DAY(stg.FechaDia) AS TiempoKey,
+        YEAR(stg.FechaDia) AS Anio,
+        stg.TipoMantenimiento,
+        stg.Debito,
+        stg.HashFila
+    FROM STG_Mantenimientos stg
+    JOIN Dim_Vehiculos v ON stg.NombreVehiculo = v.NombreVehiculo
+    JOIN Dim_Terceros t ON stg.IdentificacionTercero = t.IdentificacionTercero
+    WHERE stg.FechaDia >= MAKEDATE(p_anio, 1)
+      AND stg.FechaDia < MAKEDATE(p_anio + 1, 1);
+    SET p_insertados = ROW_COUNT();
+
+    DELETE FROM Resumen_Mensual WHERE Mes >= MAKEDATE(p_anio, 1) AND Mes < MAKEDATE(p_anio + 1, 1);
+    INSERT INTO Resumen_Mensual (VehiculoKey, TipoMantenimiento, Mes, TerceroKey, Costo, CostoPositivo, Registros)
+    SELECT h.VehiculoKey, h.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), h.TerceroKey,
+           SUM(h.Debito), SUM(CASE WHEN h.Debito > 0 THEN h.Debito ELSE 0 END), COUNT(*)
+    FROM Hechos_Mantenimiento h
+    JOIN Dim_Tiempo ti ON ti.TiempoKey = h.TiempoKey
+    WHERE h.Anio = p_anio AND h.TipoMantenimiento IS NOT NULL AND h.Debito IS NOT NULL
+    GROUP BY h.VehiculoKey, h.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), h.TerceroKey;
+
+    -- Último paso de la carga: publicar la tabla analítica
+    CALL sp_refrescar_hechos_analitica();
+END//
+
+-- Quita un archivo de hechos y de staging (archivo reemplazado o eliminado de
+-- input_files). Una fila puede venir en varios archivos (STG_Archivo_Filas): solo se
+-- eliminan las que no sigan en otro archivo del manifiesto, para que la carga
+-- incremental no deje hechos huérfanos ni pierda filas compartidas.
+-- No publica Hechos_Analitica: reconstruirla por cada archivo purgado la regeneraría
+-- k veces; el llamador la refresca una sola vez al terminar (ver refresh_analytics).
+CREATE PROCEDURE `sp_eliminar_hechos_archivo`(IN p_archivo_hash CHAR(64))
+BEGIN
+    DROP TEMPORARY TABLE IF EXISTS tmp_filas_purgadas;
+    CREATE TEMPORARY TABLE tmp_filas_purgadas (HashFila BIGINT PRIMARY KEY) ENGINE=InnoDB;
+
+    INSERT INTO tmp_filas_purgadas (HashFila)
+    SELECT HashFila FROM STG_Archivo_Filas WHERE ArchivoHash = p_archivo_hash;
+
+    DELETE FROM STG_Archivo_Filas WHERE ArchivoHash = p_archivo_hash;
+
+    -- Filas que otro archivo todavía contiene: se conservan
+    DELETE t
+    FROM tmp_filas_purgadas t
+    JOIN STG_Archivo_Filas af ON af.HashFila = t.HashFila;
+
+    CALL sp_preparar_grupos_resumen();
+    INSERT IGNORE INTO tmp_resumen_grupos (VehiculoKey, TipoMantenimiento, Mes, TerceroKey)
+    SELECT h.VehiculoKey, h.TipoMantenimiento, DATE_FORMAT(ti.Fecha, '%Y-%m-01'), h.TerceroKey
+    FROM Hechos_Mantenimiento h
+    JOIN tmp_filas_purgadas t ON t.HashFila = h.HashFila
+    JOIN Dim_Tiempo ti ON ti.TiempoKey = h.TiempoKey
+    WHERE h.TipoMantenimiento IS NOT NULL;
+
+    DELETE h
+    FROM Hechos_Mantenimiento h
+    JOIN tmp_filas_purgadas t ON t.HashFila = h.HashFila;
+
+    DELETE stg
+    FROM STG_Mantenimientos stg
+    JOIN tmp_filas_purgadas t ON t.HashFila = stg.HashFila;
+
+    DROP TEMPORARY TABLE IF EXISTS tmp_filas_purgadas;
+
+    CALL sp_refrescar_resumen_mensual();
+END//
+
+DELIMITER ;
@@ -5,13 +5,27 @@ SET FOREIGN_KEY_CHECKS=0;
 -- =====================================================================
 -- Se eliminan todas las tablas en el orden correcto para evitar problemas de dependencias.
 
+DROP TABLE IF EXISTS `Hechos_Analitica`;
+DROP TABLE IF EXISTS `Resumen_Mensual`;
 DROP TABLE IF EXISTS `Hechos_Mantenimiento`;
 DROP TABLE IF EXISTS `Predicciones_Vehiculo_Tipo`;
 DROP TABLE IF EXISTS `Predicciones_Tipo_Mantenimiento`;
+-- Tablas sombra y versión anterior de la publicación de predicciones (predicciones_script.py)
+DROP TABLE IF EXISTS `Predicciones_Vehiculo_Tipo_nueva`;
+DROP TABLE IF EXISTS `Predicciones_Vehiculo_Tipo_anterior`;
+DROP TABLE IF EXISTS `Predicciones_Tipo_Mantenimiento_nueva`;
+DROP TABLE IF EXISTS `Predicciones_Tipo_Mantenimiento_anterior`;
 DROP TABLE IF EXISTS `Dim_Tiempo`;
 DROP TABLE IF EXISTS `Dim_Terceros`;
 DROP TABLE IF EXISTS `Dim_Vehiculos`;
+DROP TABLE IF EXISTS `STG_Archivo_Filas`;
 DROP TABLE IF EXISTS `STG_Mantenimientos`;
+DROP TABLE IF EXISTS `Ingesta_Manifiesto`;
+DROP TABLE IF EXISTS `Control_Cargas`;
+DROP TABLE IF EXISTS `STG_Hechos_Pendientes`;
+DROP TABLE IF EXISTS `Ejecuciones_Pipeline`;
+-- Este archivo ya incluye todas las migraciones: init_db.py las registra como aplicadas
+DROP TABLE IF EXISTS `Schema_Migraciones`;
 DROP TABLE IF EXISTS `users`;
 
 -- =====================================================================
@@ -29,7 +43,12 @@ CREATE TABLE `users` (
 -- Tabla de Staging para la carga inicial de datos
 CREATE TABLE `STG_Mantenimientos` (
     `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `Codigo_contable` VARCHAR(50),
     `NombreVehiculo` VARCHAR(255),
+    `Comprobante` VARCHAR(50),
+    `Secuencia` VARCHAR(50),
+    `Descripcion` TEXT,
+    `Matricula` VARCHAR(50),
     `TipoMatricula` VARCHAR(255),
     `Categoria` VARCHAR(255),
     `IdentificacionTercero` VARCHAR(255),
@@ -37,7 +56,66 @@ CREATE TABLE `STG_Mantenimientos` (
     `TipoMantenimiento` VARCHAR(255),
     `Debito` DECIMAL(18, 2),
     `FechaElaboracion` DATETIME,
-    `FechaCarga` DATETIME
+    `FechaCarga` DATETIME,
+    `ArchivoHash` CHAR(64),
+    -- Clave natural: hash de 64 bits de los campos de negocio (ver row_hash en notebooks/lectura_excel.py)
+    `HashFila` BIGINT NOT NULL,
+    -- Fecha de elaboración sin hora, calculada en la carga: une con Dim_Tiempo.Fecha sin DATE()
+    `FechaDia` DATE,
+    UNIQUE KEY `uq_stg_hash_fila` (`HashFila`),
+    KEY `idx_stg_archivo_hash` (`ArchivoHash`),
+    KEY `idx_stg_fecha_dia` (`FechaDia`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Archivos que contienen cada fila de staging. Staging guarda la fila una sola vez
+-- (uq_stg_hash_fila); al purgar un archivo solo se eliminan las filas que no sigan
+-- en otro archivo del manifiesto.
+CREATE TABLE `STG_Archivo_Filas` (
+    `ArchivoHash` CHAR(64) NOT NULL,
+    `HashFila` BIGINT NOT NULL,
+    PRIMARY KEY (`ArchivoHash`, `HashFila`),
+    KEY `idx_archivo_filas_hash_fila` (`HashFila`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Manifiesto de ingesta: un registro por contenido de archivo Excel cargado en staging.
+-- Permite omitir archivos sin cambios y detectar copias idénticas en distintas carpetas.
+CREATE TABLE `Ingesta_Manifiesto` (
+    `HashContenido` CHAR(64) PRIMARY KEY,
+    `RutaArchivo` VARCHAR(512) NOT NULL,
+    `TamanoBytes` BIGINT,
+    `Registros` INT,
+    `FechaCarga` DATETIME,
+    -- 1 cuando las filas del archivo ya pasaron a hechos (sp_insert_hechos*)
+    `HechosCargados` TINYINT(1) NOT NULL DEFAULT 0,
+    KEY `idx_manifiesto_hechos_cargados` (`HechosCargados`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Conteos de la última ejecución de cada proceso de carga.
+CREATE TABLE `Control_Cargas` (
+    `Proceso` VARCHAR(50) PRIMARY KEY,
+    `Insertados` INT,
+    `SinCambios` INT,
+    `FechaEjecucion` DATETIME
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Filas de archivos ya cargados en hechos que no cruzaron con una
+-- dimensión (vehículo o tercero aún sin cargar): la carga incremental las reintenta
+-- en cada ejecución hasta que entran en hechos o se purgan de staging.
+CREATE TABLE `STG_Hechos_Pendientes` (
+    `StgId` INT PRIMARY KEY
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Registro de ejecuciones del pipeline (notebooks/pipeline.py): una fila por paso
+CREATE TABLE `Ejecuciones_Pipeline` (
+    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `EjecucionId` CHAR(32) NOT NULL,
+    `Paso` VARCHAR(50) NOT NULL,
+    `Inicio` DATETIME NOT NULL,
+    `Segundos` DECIMAL(10, 3),
+    `Filas` INT,
+    `Estado` VARCHAR(20) NOT NULL,
+    `Mensaje` TEXT,
+    KEY `idx_ejecuciones_ejecucion` (`EjecucionId`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Dimension: Vehículos
@@ -56,8 +134,9 @@ CREATE TABLE `Dim_Terceros` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Dimension: Tiempo
+-- Calendario pregenerado (sp_generar_calendario): TiempoKey es la fecha como entero AAAAMMDD
 CREATE TABLE `Dim_Tiempo` (
-    `TiempoKey` INT AUTO_INCREMENT PRIMARY KEY,
+    `TiempoKey` INT PRIMARY KEY,
     `Fecha` DATE UNIQUE,
     `Anio` INT,
     `Mes` INT,
@@ -65,98 +144,134 @@ CREATE TABLE `Dim_Tiempo` (
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Tabla de Hechos: Mantenimientos
+-- Particionada por año (RANGE sobre Anio, una partición por año). MySQL no admite
+-- claves foráneas en tablas particionadas ni claves únicas que no incluyan la
+-- columna de partición: la integridad con las dimensiones la garantizan los
+-- procedimientos de carga (solo insertan filas que cruzan con cada dimensión).
+-- Para agregar años: python migrate_schema.py --partitions-through AAAA
 CREATE TABLE `Hechos_Mantenimiento` (
-    `HechoKey` INT AUTO_INCREMENT PRIMARY KEY,
+    `HechoKey` INT AUTO_INCREMENT,
     `VehiculoKey` INT,
     `TerceroKey` INT,
     `TiempoKey` INT,
+    `Anio` SMALLINT NOT NULL,
     `TipoMantenimiento` VARCHAR(255),
     `Debito` DECIMAL(18, 2),
-    FOREIGN KEY (`VehiculoKey`) REFERENCES `Dim_Vehiculos`(`VehiculoKey`),
-    FOREIGN KEY (`TerceroKey`) REFERENCES `Dim_Terceros`(`TerceroKey`),
-    FOREIGN KEY (`TiempoKey`) REFERENCES `Dim_Tiempo`(`TiempoKey`)
+    -- Misma clave natural que la fila de staging de la que proviene
+    `HashFila` BIGINT NOT NULL,
+    PRIMARY KEY (`HechoKey`, `Anio`),
+    UNIQUE KEY `uq_hechos_hash_fila` (`HashFila`, `Anio`),
+    KEY `idx_hechos_anio` (`Anio`),
+    -- Cubre el join por grupo de sp_refrescar_resumen_mensual (vehículo, tipo, día, tercero)
+    KEY `idx_hechos_serie` (`VehiculoKey`, `TipoMantenimiento`, `TiempoKey`, `TerceroKey`, `Debito`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE (`Anio`) (
+    PARTITION `p_anterior` VALUES LESS THAN (2020),
+    PARTITION `p2020` VALUES LESS THAN (2021),
+    PARTITION `p2021` VALUES LESS THAN (2022),
+    PARTITION `p2022` VALUES LESS THAN (2023),
+    PARTITION `p2023` VALUES LESS THAN (2024),
+    PARTITION `p2024` VALUES LESS THAN (2025),
+    PARTITION `p2025` VALUES LESS THAN (2026),
+    PARTITION `p2026` VALUES LESS THAN (2027),
+    PARTITION `p2027` VALUES LESS THAN (2028),
+    PARTITION `p2028` VALUES LESS THAN (2029),
+    PARTITION `p2029` VALUES LESS THAN (2030),
+    PARTITION `p2030` VALUES LESS THAN (2031),
+    PARTITION `p_futuro` VALUES LESS THAN MAXVALUE
+);
+
+-- Resumen mensual de hechos por vehículo, tipo de mantenimiento y tercero.
+-- Lo mantienen los procedimientos de carga de hechos; el tablero y el
+-- entrenamiento leen de aquí en lugar de recorrer cada factura.
+CREATE TABLE `Resumen_Mensual` (
+    `VehiculoKey` INT NOT NULL,
+    `TipoMantenimiento` VARCHAR(255) NOT NULL,
+    `Mes` DATE NOT NULL,
+    `TerceroKey` INT NOT NULL,
+    `Costo` DECIMAL(18, 2) NOT NULL,
+    -- Suma solo de los débitos positivos (análisis comparativo)
+    `CostoPositivo` DECIMAL(18, 2) NOT NULL,
+    `Registros` INT NOT NULL,
+    PRIMARY KEY (`VehiculoKey`, `TipoMantenimiento`, `Mes`, `TerceroKey`),
+    KEY `idx_resumen_tipo_mes` (`TipoMantenimiento`, `Mes`, `CostoPositivo`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
--- Tabla para Predicciones por Vehículo y Tipo
+-- Tabla analítica: Resumen_Mensual con los atributos de las dimensiones ya resueltos,
+-- solo con las columnas que usan los modelos y los gráficos. La regenera
+-- sp_refrescar_hechos_analitica como último paso de cada carga de hechos y se lee
+-- con leer_hechos_analitica (notebooks/analitica.py).
+CREATE TABLE `Hechos_Analitica` (
+    `VehiculoKey` INT NOT NULL,
+    `TerceroKey` INT NOT NULL,
+    `NombreVehiculo` VARCHAR(255) NOT NULL,
+    `Categoria` VARCHAR(255),
+    `TipoMatricula` VARCHAR(255),
+    `IdentificacionTercero` VARCHAR(255) NOT NULL,
+    `TipoMantenimiento` VARCHAR(255) NOT NULL,
+    `Mes` DATE NOT NULL,
+    `Costo` DECIMAL(18, 2) NOT NULL,
+    `CostoPositivo` DECIMAL(18, 2) NOT NULL,
+    `Registros` INT NOT NULL,
+    PRIMARY KEY (`VehiculoKey`, `TipoMantenimiento`, `Mes`, `TerceroKey`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Tabla para Predicciones por Vehículo y Tipo (particionada por año de la fecha pronosticada)
 CREATE TABLE `Predicciones_Vehiculo_Tipo` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `id` INT AUTO_INCREMENT,
     `NombreVehiculo` VARCHAR(255) NOT NULL,
     `TipoMantenimiento` VARCHAR(255) NOT NULL,
     `Fecha` DATETIME NOT NULL,
     `Costo` DECIMAL(18, 2) NOT NULL,
-    `Origen` VARCHAR(50)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+    `Origen` VARCHAR(50),
+    PRIMARY KEY (`id`, `Fecha`),
+    KEY `idx_pred_vehiculo_tipo_fecha` (`NombreVehiculo`, `TipoMantenimiento`, `Fecha`, `Costo`, `Origen`),
+    KEY `idx_pred_fecha` (`Fecha`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE COLUMNS (`Fecha`) (
+    PARTITION `p_anterior` VALUES LESS THAN ('2020-01-01'),
+    PARTITION `p2020` VALUES LESS THAN ('2021-01-01'),
+    PARTITION `p2021` VALUES LESS THAN ('2022-01-01'),
+    PARTITION `p2022` VALUES LESS THAN ('2023-01-01'),
+    PARTITION `p2023` VALUES LESS THAN ('2024-01-01'),
+    PARTITION `p2024` VALUES LESS THAN ('2025-01-01'),
+    PARTITION `p2025` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p2026` VALUES LESS THAN ('2027-01-01'),
+    PARTITION `p2027` VALUES LESS THAN ('2028-01-01'),
+    PARTITION `p2028` VALUES LESS THAN ('2029-01-01'),
+    PARTITION `p2029` VALUES LESS THAN ('2030-01-01'),
+    PARTITION `p2030` VALUES LESS THAN ('2031-01-01'),
+    PARTITION `p_futuro` VALUES LESS THAN (MAXVALUE)
+);
 
--- Tabla para Predicciones por Tipo de Mantenimiento General
+-- Tabla para Predicciones por Tipo de Mantenimiento General (particionada por año de la fecha pronosticada)
 CREATE TABLE `Predicciones_Tipo_Mantenimiento` (
-    `id` INT AUTO_INCREMENT PRIMARY KEY,
+    `id` INT AUTO_INCREMENT,
     `TipoMantenimiento` VARCHAR(255) NOT NULL,
     `Fecha` DATETIME NOT NULL,
     `Costo` DECIMAL(18, 2) NOT NULL,
-    `Origen` VARCHAR(50)
-) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-
-
--- =====================================================================
--- 3. PROCEDIMIENTOS ALMACENADOS
--- =====================================================================
--- Se eliminan los procedimientos si ya existen para evitar errores en la recreación.
-DROP PROCEDURE IF EXISTS `sp_upsert_dimensiones`;
-DROP PROCEDURE IF EXISTS `sp_insert_hechos`;
-
-DELIMITER //
-
--- Procedimiento para poblar las dimensiones desde la tabla de staging
-CREATE PROCEDURE `sp_upsert_dimensiones`()
-BEGIN
-    -- Upsert para Dim_Vehiculos
-    INSERT INTO Dim_Vehiculos (NombreVehiculo, TipoMatricula, Categoria)
-    SELECT DISTINCT NombreVehiculo, TipoMatricula, Categoria
-    FROM STG_Mantenimientos stg
-    WHERE stg.NombreVehiculo IS NOT NULL
-    ON DUPLICATE KEY UPDATE
-        TipoMatricula = VALUES(TipoMatricula),
-        Categoria = VALUES(Categoria);
-
-    -- Upsert para Dim_Terceros
-    INSERT INTO Dim_Terceros (IdentificacionTercero, NombreTercero)
-    SELECT DISTINCT IdentificacionTercero, NombreTercero
-    FROM STG_Mantenimientos stg
-    WHERE stg.IdentificacionTercero IS NOT NULL
-    ON DUPLICATE KEY UPDATE
-        NombreTercero = VALUES(NombreTercero);
-
-    -- Upsert para Dim_Tiempo
-    INSERT INTO Dim_Tiempo (Fecha, Anio, Mes, Dia)
-    SELECT DISTINCT DATE(FechaElaboracion), YEAR(FechaElaboracion), MONTH(FechaElaboracion), DAY(FechaElaboracion)
-    FROM STG_Mantenimientos stg
-    WHERE stg.FechaElaboracion IS NOT NULL
-    ON DUPLICATE KEY UPDATE
-        Anio = VALUES(Anio),
-        Mes = VALUES(Mes),
-        Dia = VALUES(Dia);
-END//
-
--- Procedimiento para poblar la tabla de hechos
-CREATE PROCEDURE `sp_insert_hechos`()
-BEGIN
-    TRUNCATE TABLE Hechos_Mantenimiento;
-    INSERT INTO Hechos_Mantenimiento (VehiculoKey, TerceroKey, TiempoKey, TipoMantenimiento, Debito)
-    SELECT 
-        v.VehiculoKey,
-        t.TerceroKey,
-        ti.TiempoKey,
-        stg.TipoMantenimiento,
-        stg.Debito
-    FROM STG_Mantenimientos stg
-    JOIN Dim_Vehiculos v ON stg.NombreVehiculo = v.NombreVehiculo
-    JOIN Dim_Terceros t ON stg.IdentificacionTercero = t.IdentificacionTercero
-    JOIN Dim_Tiempo ti ON DATE(stg.FechaElaboracion) = ti.Fecha;
-END//
-
-DELIMITER ;
+    `Origen` VARCHAR(50),
+    PRIMARY KEY (`id`, `Fecha`),
+    KEY `idx_pred_tipo_fecha` (`TipoMantenimiento`, `Fecha`, `Costo`, `Origen`),
+    KEY `idx_pred_fecha` (`Fecha`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+PARTITION BY RANGE COLUMNS (`Fecha`) (
+    PARTITION `p_anterior` VALUES LESS THAN ('2020-01-01'),
+    PARTITION `p2020` VALUES LESS THAN ('2021-01-01'),
+    PARTITION `p2021` VALUES LESS THAN ('2022-01-01'),
+    PARTITION `p2022` VALUES LESS THAN ('2023-01-01'),
+    PARTITION `p2023` VALUES LESS THAN ('2024-01-01'),
+    PARTITION `p2024` VALUES LESS THAN ('2025-01-01'),
+    PARTITION `p2025` VALUES LESS THAN ('2026-01-01'),
+    PARTITION `p2026` VALUES LESS THAN ('2027-01-01'),
+    PARTITION `p2027` VALUES LESS THAN ('2028-01-01'),
+    PARTITION `p2028` VALUES LESS THAN ('2029-01-01'),
+    PARTITION `p2029` VALUES LESS THAN ('2030-01-01'),
+    PARTITION `p2030` VALUES LESS THAN ('2031-01-01'),
+    PARTITION `p_futuro` VALUES LESS THAN (MAXVALUE)
+);
 
 -- Reactivar la verificación de claves foráneas
 SET FOREIGN_KEY_CHECKS=1;
 
-SELECT 'Estructura de la base de datos y procedimientos creados con éxito.' AS `Estado`;
+SELECT 'Estructura de la base de datos creada con éxito (procedimientos en procedures.sql).' AS `Estado`;
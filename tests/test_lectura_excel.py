@@ -0,0 +1,23 @@
+import pandas as pd
+
+from notebooks.lectura_excel import COLUMN_NAMES, normalize_frame, row_hash
+
+
+def _libro(debitos):
+    filas = [["52450207", "VEHICULO A", f"DS-1-{i}", "1", "05/01/2024", "900123", "TERCERO", "Repuesto",
+              debito, "CORRECTIVO", "TRANSPORTE", "ABC123", "PLACA"] for i, debito in enumerate(debitos)]
+    return pd.DataFrame(filas, columns=COLUMN_NAMES, dtype=object)
+
+
+def test_row_hash_no_depende_del_tipo_de_debito():
+    # Solo enteros -> Debito Int64; con un decimal en el bloque -> Float64
+    enteros, _, _ = normalize_frame(_libro(["150000", "20000"]))
+    mixtos, _, _ = normalize_frame(_libro(["150000", "20000.5"]))
+    assert str(enteros["Debito"].dtype) != str(mixtos["Debito"].dtype)
+    assert row_hash(enteros).iloc[0] == row_hash(mixtos).iloc[0]
+    assert row_hash(enteros).iloc[1] != row_hash(mixtos).iloc[1]
+
+
+def test_row_hash_debito_nulo():
+    df, _, _ = normalize_frame(_libro([None, "150000"]))
+    assert row_hash(df).notna().all()